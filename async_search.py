@@ -0,0 +1,200 @@
+"""Asyncio-native web and document search.
+
+The week3 executors run on an event loop, but ``real_web_search`` and
+``real_document_search`` block it for the whole network call. These
+coroutines do the same work on async clients so many searches can share one
+loop (workflows, eval runs, a future server):
+
+- get_async_http_client: one ``httpx.AsyncClient`` per event loop (pooled,
+  keep-alive)
+- async_search_google_cse / async_search_google_cse_pages: CSE search with
+  429/5xx retries honoring ``Retry-After`` (capped like the sync session); pages
+  are fetched with ``gather``
+- async_fetch_web_results: cache-first search sharing ``web_search``'s cache
+  and the CSE quota scheduler
+- async_embed_query: query embedding with ``AsyncOpenAI``
+- async_query_pinecone: Pinecone query with ``PineconeAsyncio`` (falls back
+  to the sync client in a worker thread when the asyncio extra is missing)
+
+Results use the same structures as ``web_search`` so ``format_web_results``
+renders them unchanged.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import weakref
+from typing import Optional, Dict, Any, List
+
+import httpx
+
+import web_search
+from cse_scheduler import get_cse_scheduler
+from web_search import CSE_MAX_RESULTS, CSE_PAGE_SIZE
+
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_pinecone_hosts: Dict[str, str] = {}
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled async HTTP client for the running event loop.
+
+    httpx clients are bound to the loop they were first used on, so each loop
+    (e.g. each ``asyncio.run`` in a Streamlit rerun) gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv('WEB_SEARCH_POOL_MAXSIZE', '20')),
+                max_keepalive_connections=int(os.getenv('WEB_SEARCH_POOL_CONNECTIONS', '10')),
+            ),
+            headers={'User-Agent': 'yes-dear-agent/1.0'},
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_async_clients():
+    """Close the clients owned by the running loop (call before the loop ends)."""
+    loop = asyncio.get_running_loop()
+    client = _http_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    openai_client = _openai_clients.pop(loop, None)
+    if openai_client is not None:
+        await openai_client.close()
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float:
+    # same parsing and WEB_SEARCH_MAX_RETRY_AFTER cap as the sync session's CappedRetry
+    retry_after = web_search.parse_retry_after(response.headers.get('Retry-After'))
+    if retry_after is not None:
+        return retry_after
+    return float(os.getenv('WEB_SEARCH_BACKOFF', '0.5')) * (2 ** attempt)
+
+
+async def async_search_google_cse(query: str, num: int = 5, api_key: Optional[str] = None,
+                                  cse_id: Optional[str] = None, timeout: Optional[float] = None,
+                                  start: int = 1) -> List[Dict[str, str]]:
+    """Async twin of ``web_search.search_google_cse``.
+
+    Raises ``httpx.HTTPStatusError`` once retries are exhausted.
+    """
+    params = {
+        'key': api_key or os.environ.get('GOOGLE_API_KEY'),
+        'cx': cse_id or os.environ.get('GOOGLE_CSE_ID'),
+        'q': query,
+        'num': min(num, CSE_PAGE_SIZE),
+    }
+    if start > 1:
+        params['start'] = start
+    timeout = timeout if timeout is not None else float(os.getenv('WEB_SEARCH_TIMEOUT', '10'))
+    max_retries = int(os.getenv('WEB_SEARCH_MAX_RETRIES', '3'))
+
+    client = get_async_http_client()
+    for attempt in range(max_retries + 1):
+        response = await client.get(web_search.get_cse_url(), params=params, timeout=timeout)
+        if response.status_code not in _RETRY_STATUSES or attempt == max_retries:
+            break
+        await asyncio.sleep(_retry_delay(response, attempt))
+    response.raise_for_status()
+    data = response.json()
+    return [
+        {
+            'title': item.get('title', ''),
+            'snippet': item.get('snippet', ''),
+            'link': item.get('link', ''),
+        }
+        for item in data.get('items', [])
+    ]
+
+
+async def async_search_google_cse_pages(query: str, num: int, api_key: Optional[str] = None,
+                                        cse_id: Optional[str] = None,
+                                        timeout: Optional[float] = None) -> List[Dict[str, str]]:
+    """Async twin of ``web_search.search_google_cse_pages``."""
+    num = max(0, min(num, CSE_MAX_RESULTS))
+    starts = list(range(1, num + 1, CSE_PAGE_SIZE))
+    pages = await asyncio.gather(*(
+        async_search_google_cse(query, num=min(CSE_PAGE_SIZE, num - start + 1), api_key=api_key,
+                                cse_id=cse_id, timeout=timeout, start=start)
+        for start in starts
+    ))
+
+    merged: List[Dict[str, str]] = []
+    seen = set()
+    for start, page in zip(starts, pages):
+        for item in page:
+            if item['link'] in seen:
+                continue
+            seen.add(item['link'])
+            merged.append(item)
+        if len(page) < min(CSE_PAGE_SIZE, num - start + 1):
+            break
+    return merged[:num]
+
+
+async def async_fetch_web_results(query: str, num: int = 5, api_key: Optional[str] = None,
+                                  cse_id: Optional[str] = None, use_cache: bool = True) -> List[Dict[str, str]]:
+    """Async twin of ``web_search.fetch_web_results`` (same cache and quota scheduler)."""
+    if not use_cache:
+        return await async_search_google_cse_pages(query, num=num, api_key=api_key, cse_id=cse_id)
+    return await get_cse_scheduler().asearch(query, num, async_search_google_cse_pages,
+                                             api_key=api_key, cse_id=cse_id)
+
+
+def _get_async_openai(api_key: Optional[str] = None):
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(api_key=api_key or os.environ.get('OPENAI_API_KEY'))
+        _openai_clients[loop] = client
+    return client
+
+
+async def async_embed_query(query: str, model: str = 'text-embedding-ada-002',
+                            api_key: Optional[str] = None):
+    """Embed ``query`` with ``AsyncOpenAI``; returns the full embeddings response."""
+    client = _get_async_openai(api_key)
+    return await client.embeddings.create(input=query, model=model)
+
+
+async def async_query_pinecone(vector: List[float], index_name: str = 'documents', top_k: int = 5,
+                               api_key: Optional[str] = None):
+    """Query a Pinecone index without blocking the loop.
+
+    Uses ``PineconeAsyncio`` (``pip install "pinecone[asyncio]"``); the index
+    host is looked up once per process. Returns ``None`` if the index doesn't
+    exist.
+    """
+    api_key = api_key or os.environ.get('PINECONE_API_KEY')
+    try:
+        from pinecone import PineconeAsyncio
+    except ImportError:
+        return await asyncio.to_thread(_query_pinecone_sync, vector, index_name, top_k, api_key)
+
+    async with PineconeAsyncio(api_key=api_key) as pc:
+        host = _pinecone_hosts.get(index_name)
+        if host is None:
+            indexes = await pc.list_indexes()
+            if index_name not in [idx.name for idx in indexes]:
+                return None
+            host = (await pc.describe_index(index_name)).host
+            _pinecone_hosts[index_name] = host
+        async with pc.IndexAsyncio(host=host) as index:
+            return await index.query(vector=vector, top_k=top_k, include_metadata=True)
+
+
+def _query_pinecone_sync(vector: List[float], index_name: str, top_k: int, api_key: Optional[str]):
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=api_key)
+    if index_name not in [idx.name for idx in pc.list_indexes()]:
+        return None
+    return pc.Index(index_name).query(vector=vector, top_k=top_k, include_metadata=True)
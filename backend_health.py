@@ -0,0 +1,213 @@
+"""Negative caching of search backend failures.
+
+When Google CSE or Pinecone fails, every following query used to repeat the
+same slow failing call (often a full timeout) before falling back to mock
+data. Failures are now remembered per backend, with a cooldown that depends
+on the error class:
+
+- classify_error: map an exception to ``auth``, ``quota``, ``rate_limit``,
+  ``not_found``, ``timeout``, ``connection``, ``server`` or ``other``
+- NegativeCache: skip a known-bad backend until its cooldown ends, then let a
+  single caller probe it again (others keep skipping until the probe reports)
+- BackendUnavailableError: raised instead of calling a backend in cooldown
+
+This only covers search backends; LLM calls keep using the circuit breaker in
+``ProductionErrorHandler``. Cooldowns can be overridden with
+``BACKEND_COOLDOWNS`` (e.g. ``auth=600,rate_limit=10``).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Callable
+
+DEFAULT_COOLDOWNS = {
+    'auth': 300.0,        # bad key / permissions won't fix themselves quickly
+    'not_found': 300.0,   # missing index
+    'quota': 3600.0,
+    'rate_limit': 30.0,   # or the server's Retry-After
+    'timeout': 30.0,
+    'connection': 30.0,
+    'server': 15.0,
+    'other': 10.0,
+}
+PROBE_TIMEOUT = 60.0  # a probe that never reports frees the slot after this long
+
+
+class BackendUnavailableError(RuntimeError):
+    """A backend is in its failure cooldown and was not called."""
+
+    def __init__(self, backend: str, error_class: str, message: str, retry_in: float):
+        self.backend = backend
+        self.error_class = error_class
+        self.retry_in = retry_in
+        super().__init__(f"{backend} unavailable ({error_class}: {message}); retrying in {retry_in:.0f}s")
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    response = getattr(exc, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        status = getattr(exc, 'status_code', None) or getattr(exc, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(exc: BaseException) -> str:
+    """Map an exception from any search backend to an error class."""
+    declared = getattr(exc, 'error_class', None)
+    if isinstance(declared, str):
+        return declared
+    status = _status_of(exc)
+    text = str(exc).lower()
+    names = ' '.join(cls.__name__ for cls in type(exc).__mro__).lower()
+    try:
+        body = exc.response.text.lower() if getattr(exc, 'response', None) is not None else ''
+    except Exception:
+        body = ''
+
+    if 'dailylimitexceeded' in body or 'quotaexceeded' in body or 'quota exhausted' in text:
+        return 'quota'
+    if status == 429 or 'rate limit' in text or 'too many requests' in text:
+        return 'rate_limit'
+    # Google answers a bad key with HTTP 400, so the body is checked too
+    auth_phrases = ('unauthorized', 'invalid api key', 'api key not valid', 'forbidden')
+    if status in (401, 403) or any(s in text or s in body for s in auth_phrases):
+        return 'auth'
+    if status == 404 or 'not found' in text:
+        return 'not_found'
+    if 'timeout' in names or 'timed out' in text:
+        return 'timeout'
+    if 'connect' in names:
+        return 'connection'
+    if status is not None and status >= 500:
+        return 'server'
+    return 'other'
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class NegativeCache:
+    """Per-backend failure memo with error-class cooldowns and single probes."""
+
+    def __init__(self, cooldowns: Optional[Dict[str, float]] = None):
+        self.cooldowns = dict(DEFAULT_COOLDOWNS)
+        self.cooldowns.update(_parse_cooldowns(os.getenv('BACKEND_COOLDOWNS', '')))
+        self.cooldowns.update(cooldowns or {})
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def check(self, backend: str) -> Optional[Dict[str, Any]]:
+        """Return the failure entry if ``backend`` should be skipped, else None.
+
+        Once the cooldown has passed the first caller is let through as the
+        probe; everyone else is skipped until it reports success or failure
+        (or gives the slot back with ``release_probe`` without calling).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self.entries.get(backend)
+            if entry is None:
+                return None
+            if now < entry['until']:
+                self.skipped[backend] = self.skipped.get(backend, 0) + 1
+                return entry
+            if entry.get('probe_started') and now - entry['probe_started'] < PROBE_TIMEOUT:
+                self.skipped[backend] = self.skipped.get(backend, 0) + 1
+                return entry
+            entry['probe_started'] = now
+            return None
+
+    def record_failure(self, backend: str, exc: Optional[BaseException] = None,
+                       error_class: Optional[str] = None, message: Optional[str] = None) -> Dict[str, Any]:
+        error_class = error_class or (classify_error(exc) if exc is not None else 'other')
+        cooldown = self.cooldowns.get(error_class, self.cooldowns['other'])
+        if error_class == 'rate_limit' and exc is not None and _retry_after(exc) is not None:
+            cooldown = _retry_after(exc)
+        now = time.time()
+        with self._lock:
+            previous = self.entries.get(backend)
+            entry = {
+                'backend': backend,
+                'error_class': error_class,
+                'message': (message or str(exc or error_class))[:200],
+                'since': previous['since'] if previous else now,
+                'until': now + cooldown,
+                'failures': (previous['failures'] if previous else 0) + 1,
+            }
+            self.entries[backend] = entry
+            return entry
+
+    def release_probe(self, backend: str):
+        """Give back the probe slot when the caller returns without calling the backend."""
+        with self._lock:
+            entry = self.entries.get(backend)
+            if entry is not None:
+                entry.pop('probe_started', None)
+
+    def record_success(self, backend: str):
+        with self._lock:
+            self.entries.pop(backend, None)
+
+    def unavailable_error(self, backend: str, entry: Dict[str, Any]) -> BackendUnavailableError:
+        return BackendUnavailableError(backend, entry['error_class'], entry['message'],
+                                       max(0.0, entry['until'] - time.time()))
+
+    def call(self, backend: str, func: Callable, *args, **kwargs):
+        """Call ``func`` unless ``backend`` is cooling down; record the outcome."""
+        entry = self.check(backend)
+        if entry is not None:
+            raise self.unavailable_error(backend, entry)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(backend, e)
+            raise
+        self.record_success(backend)
+        return result
+
+    async def acall(self, backend: str, func: Callable, *args, **kwargs):
+        """Async variant of ``call`` for coroutine functions."""
+        entry = self.check(backend)
+        if entry is not None:
+            raise self.unavailable_error(backend, entry)
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(backend, e)
+            raise
+        self.record_success(backend)
+        return result
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return {
+                backend: {
+                    'error_class': entry['error_class'],
+                    'message': entry['message'],
+                    'retry_in': max(0.0, entry['until'] - now),
+                    'failures': entry['failures'],
+                    'skipped': self.skipped.get(backend, 0),
+                }
+                for backend, entry in self.entries.items()
+            }
+
+
+def _parse_cooldowns(spec: str) -> Dict[str, float]:
+    cooldowns = {}
+    for part in spec.split(','):
+        name, _, value = part.partition('=')
+        if name.strip() and value.strip():
+            cooldowns[name.strip()] = float(value)
+    return cooldowns
+
+
+negative_cache = NegativeCache()
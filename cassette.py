@@ -0,0 +1,329 @@
+"""Record/replay of HTTP traffic to OpenAI, Google CSE and Pinecone.
+
+Realistic performance testing used to need live keys, and the mock search
+functions answer instantly with tiny strings. A cassette records the real
+request/response pairs of a session to disk and serves them back later with
+their original timing (or scaled), so an end-to-end ``app.py`` or week3 run
+can be replayed offline as often as needed to benchmark orchestration
+changes.
+
+Recording happens below the client libraries:
+
+- httpx transports (``HTTPTransport`` / ``AsyncHTTPTransport``): the OpenAI
+  SDK, sync and async, and async_search.py's CSE client
+- urllib3 connection pools: ``requests`` (web_search.py's CSE session) and
+  the Pinecone REST client
+
+Pinecone's gRPC and ``PineconeAsyncio`` (aiohttp) clients aren't covered.
+
+Streamed responses are recorded chunk by chunk as the caller reads them, so
+recording doesn't change what the app sees; replay delays the headers and
+each chunk to their recorded offsets times ``time_scale`` (0 = no delay).
+Requests are matched on method, URL and a hash of the body; when nothing
+matches exactly the next recording of the same endpoint is used (``loose``
+in the stats), so small prompt differences don't break a replay. API keys
+in query strings are dropped and request headers aren't stored.
+
+``CASSETTE_MODE`` (``record`` or ``replay``), ``CASSETTE_PATH`` (default
+``cassettes/session.jsonl``) and ``CASSETTE_TIME_SCALE`` (default 1)
+configure ``install_from_env``::
+
+    CASSETTE_MODE=record streamlit run app.py      # use the app with live keys
+    CASSETTE_MODE=replay CASSETTE_TIME_SCALE=0 streamlit run app.py
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.response import HTTPResponse
+
+_SECRET_PARAMS = {'key', 'api_key', 'apikey', 'access_token'}
+_DROPPED_HEADERS = {'set-cookie', 'date', 'x-request-id', 'openai-organization', 'openai-project'}
+
+
+class CassetteMiss(RuntimeError):
+    """A replayed request has no recording."""
+
+
+def _redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _SECRET_PARAMS]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+def _route(method: str, url: str) -> Tuple[str, str]:
+    parts = urlsplit(url)
+    return method.upper(), f"{parts.netloc}{parts.path}"
+
+
+def _body_hash(body) -> str:
+    if body is None:
+        body = b''
+    elif isinstance(body, str):
+        body = body.encode('utf-8')
+    elif not isinstance(body, (bytes, bytearray)):
+        return 'stream'
+    return hashlib.sha256(body).hexdigest()[:16]
+
+
+def _encode(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii')
+
+
+class Cassette:
+    """Interactions of one recorded session, appended to or served from ``path``."""
+
+    def __init__(self, path: str, mode: str = 'replay', time_scale: float = 1.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode {mode!r} (expected 'record' or 'replay')")
+        self.path = path
+        self.mode = mode
+        self.time_scale = time_scale
+        self.interactions: List[Dict[str, Any]] = []
+        self.stats = {'recorded': 0, 'replayed': 0, 'loose': 0, 'misses': 0}
+        self._next: Dict[Any, int] = {}  # per key/route: how many times it was served
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            with open(path, 'r', encoding='utf-8') as f:
+                self.interactions = [json.loads(line) for line in f if line.strip()]
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, interaction: Dict[str, Any]):
+        with self._lock:
+            self.interactions.append(interaction)
+            self.stats['recorded'] += 1
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(interaction) + "\n")
+
+    def match(self, method: str, url: str, body) -> Dict[str, Any]:
+        """Next recording for the request; repeated requests cycle through their recordings."""
+        url = _redact_url(url)
+        key = (method.upper(), url, _body_hash(body))
+        route = _route(method, url)
+        with self._lock:
+            exact = [i for i in self.interactions if (i['method'], i['url'], i['body_hash']) == key]
+            candidates, slot = exact, key
+            if not exact:
+                candidates = [i for i in self.interactions if _route(i['method'], i['url']) == route]
+                slot = route
+            if not candidates:
+                self.stats['misses'] += 1
+                raise CassetteMiss(f"No recording for {method.upper()} {url} in {self.path}")
+            served = self._next.get(slot, 0)
+            self._next[slot] = served + 1
+            self.stats['replayed'] += 1
+            self.stats['loose'] += int(not exact)
+            return candidates[served % len(candidates)]
+
+    def wait_until(self, start: float, offset: float):
+        """Sleep until ``offset`` recorded seconds (scaled) after ``start``."""
+        delay = start + offset * self.time_scale - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_wait_until(self, start: float, offset: float):
+        import asyncio
+
+        delay = start + offset * self.time_scale - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'mode': self.mode, 'path': self.path, 'interactions': len(self.interactions), **self.stats}
+
+
+def _interaction(method: str, url: str, body, status: int, headers, ttfb: float) -> Dict[str, Any]:
+    return {
+        'method': method.upper(),
+        'url': _redact_url(url),
+        'body_hash': _body_hash(body),
+        'status': status,
+        'headers': [[k, v] for k, v in headers if k.lower() not in _DROPPED_HEADERS],
+        'ttfb': round(ttfb, 4),
+        'chunks': [],  # [offset seconds, base64 bytes]
+    }
+
+
+# httpx
+
+class _RecordingStream(httpx.SyncByteStream):
+    def __init__(self, stream, cassette: Cassette, interaction: Dict[str, Any], start: float):
+        self._stream, self._cassette, self._interaction, self._start = stream, cassette, interaction, start
+        self._saved = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._interaction['chunks'].append([round(time.perf_counter() - self._start, 4), _encode(chunk)])
+            yield chunk
+
+    def close(self):
+        self._stream.close()
+        if not self._saved:
+            self._saved = True
+            self._cassette.record(self._interaction)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, cassette: Cassette, interaction: Dict[str, Any], start: float):
+        self._stream, self._cassette, self._interaction, self._start = stream, cassette, interaction, start
+        self._saved = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._interaction['chunks'].append([round(time.perf_counter() - self._start, 4), _encode(chunk)])
+            yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+        if not self._saved:
+            self._saved = True
+            self._cassette.record(self._interaction)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, cassette: Cassette, interaction: Dict[str, Any], start: float):
+        self._cassette, self._interaction, self._start = cassette, interaction, start
+
+    def __iter__(self):
+        for offset, data in self._interaction['chunks']:
+            self._cassette.wait_until(self._start, offset)
+            yield base64.b64decode(data)
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, cassette: Cassette, interaction: Dict[str, Any], start: float):
+        self._cassette, self._interaction, self._start = cassette, interaction, start
+
+    async def __aiter__(self):
+        for offset, data in self._interaction['chunks']:
+            await self._cassette.async_wait_until(self._start, offset)
+            yield base64.b64decode(data)
+
+
+def _httpx_handle_request(transport, request: httpx.Request) -> httpx.Response:
+    cassette = _active
+    if cassette is None:
+        return _originals['httpx'](transport, request)
+    start = time.perf_counter()
+    body = request.read()
+    if cassette.mode == 'replay':
+        interaction = cassette.match(request.method, str(request.url), body)
+        cassette.wait_until(start, interaction['ttfb'])
+        return httpx.Response(interaction['status'], headers=interaction['headers'],
+                              stream=_ReplayStream(cassette, interaction, start), request=request)
+    response = _originals['httpx'](transport, request)
+    interaction = _interaction(request.method, str(request.url), body, response.status_code,
+                               response.headers.multi_items(), time.perf_counter() - start)
+    response.stream = _RecordingStream(response.stream, cassette, interaction, start)
+    return response
+
+
+async def _httpx_handle_async_request(transport, request: httpx.Request) -> httpx.Response:
+    cassette = _active
+    if cassette is None:
+        return await _originals['httpx_async'](transport, request)
+    start = time.perf_counter()
+    body = await request.aread()
+    if cassette.mode == 'replay':
+        interaction = cassette.match(request.method, str(request.url), body)
+        await cassette.async_wait_until(start, interaction['ttfb'])
+        return httpx.Response(interaction['status'], headers=interaction['headers'],
+                              stream=_AsyncReplayStream(cassette, interaction, start), request=request)
+    response = await _originals['httpx_async'](transport, request)
+    interaction = _interaction(request.method, str(request.url), body, response.status_code,
+                               response.headers.multi_items(), time.perf_counter() - start)
+    response.stream = _AsyncRecordingStream(response.stream, cassette, interaction, start)
+    return response
+
+
+# urllib3 (requests, Pinecone REST)
+
+_in_urlopen = threading.local()
+
+
+def _urllib3_urlopen(pool, method, url, body=None, headers=None, **kwargs):
+    cassette = _active
+    if cassette is None or getattr(_in_urlopen, 'active', False):
+        # retries and redirects re-enter urlopen; only the outermost call is recorded
+        return _originals['urllib3'](pool, method, url, body=body, headers=headers, **kwargs)
+    full_url = f"{pool.scheme}://{pool.host}" + (f":{pool.port}" if pool.port else '') + url
+    preload_content = kwargs.get('preload_content', True)
+    decode_content = kwargs.get('decode_content', True)
+    start = time.perf_counter()
+    if cassette.mode == 'replay':
+        interaction = cassette.match(method, full_url, body)
+        cassette.wait_until(start, interaction['ttfb'])
+    else:
+        kwargs.update(preload_content=False, decode_content=False)
+        _in_urlopen.active = True
+        try:
+            raw = _originals['urllib3'](pool, method, url, body=body, headers=headers, **kwargs)
+        finally:
+            _in_urlopen.active = False
+        data = raw.read(decode_content=False)
+        raw.release_conn()
+        interaction = _interaction(method, full_url, body, raw.status, raw.headers.items(),
+                                   time.perf_counter() - start)
+        interaction['chunks'].append([interaction['ttfb'], _encode(data)])
+        cassette.record(interaction)
+    data = b''.join(base64.b64decode(chunk) for _, chunk in interaction['chunks'])
+    return HTTPResponse(body=io.BytesIO(data), headers=dict(interaction['headers']), status=interaction['status'],
+                        preload_content=preload_content, decode_content=decode_content,
+                        request_method=method, request_url=full_url)
+
+
+_active: Optional[Cassette] = None
+_originals: Dict[str, Any] = {}
+_install_lock = threading.Lock()
+
+
+def install(cassette: Cassette) -> Cassette:
+    """Route all httpx and urllib3 traffic of the process through ``cassette``."""
+    global _active
+    with _install_lock:
+        if not _originals:
+            _originals['httpx'] = httpx.HTTPTransport.handle_request
+            _originals['httpx_async'] = httpx.AsyncHTTPTransport.handle_async_request
+            _originals['urllib3'] = HTTPConnectionPool.urlopen
+            httpx.HTTPTransport.handle_request = _httpx_handle_request
+            httpx.AsyncHTTPTransport.handle_async_request = _httpx_handle_async_request
+            HTTPConnectionPool.urlopen = _urllib3_urlopen
+        _active = cassette
+    return cassette
+
+
+def uninstall():
+    global _active
+    with _install_lock:
+        if _originals:
+            httpx.HTTPTransport.handle_request = _originals.pop('httpx')
+            httpx.AsyncHTTPTransport.handle_async_request = _originals.pop('httpx_async')
+            HTTPConnectionPool.urlopen = _originals.pop('urllib3')
+        _active = None
+
+
+def active_cassette() -> Optional[Cassette]:
+    return _active
+
+
+def install_from_env() -> Optional[Cassette]:
+    """Install the cassette configured by ``CASSETTE_MODE`` (safe to call on every rerun)."""
+    mode = os.getenv('CASSETTE_MODE', '').lower()
+    if mode in ('', 'off', '0', 'false', 'no'):
+        return None
+    path = os.getenv('CASSETTE_PATH', os.path.join('cassettes', 'session.jsonl'))
+    if _active is not None and _active.mode == mode and _active.path == path:
+        return _active
+    return install(Cassette(path, mode=mode, time_scale=float(os.getenv('CASSETTE_TIME_SCALE', '1'))))
@@ -0,0 +1,125 @@
+"""Streaming chat completions with usage accounting.
+
+The synthesis call in ``app.py`` used to block until the whole answer was
+generated before anything was shown. ``stream_chat_completion`` requests a
+stream (``stream=True`` with ``stream_options={"include_usage": True}``),
+hands the accumulated text to a callback as tokens arrive and reads token
+usage from the final chunk, which carries ``usage`` and no choices.
+
+Rendering is throttled (``min_interval``) so a fast stream doesn't redraw the
+Streamlit placeholder for every token. Tool calls requested mid-stream are
+reassembled from their deltas (``ToolCallAccumulator``), so a streamed call
+can also start another round of tool use.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Any, Callable, Dict, List
+
+
+@dataclass
+class StreamedFunction:
+    name: str = ''
+    arguments: str = ''
+
+
+@dataclass
+class StreamedToolCall:
+    """Tool call rebuilt from stream deltas (same attributes as the SDK object)."""
+
+    id: str = ''
+    function: StreamedFunction = field(default_factory=StreamedFunction)
+    type: str = 'function'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'type': self.type,
+                'function': {'name': self.function.name, 'arguments': self.function.arguments}}
+
+
+class ToolCallAccumulator:
+    """Merge streamed ``delta.tool_calls`` fragments by their ``index``."""
+
+    def __init__(self):
+        self._calls: Dict[int, StreamedToolCall] = {}
+
+    def add(self, deltas):
+        for delta in deltas or ():
+            call = self._calls.setdefault(getattr(delta, 'index', 0) or 0, StreamedToolCall())
+            if getattr(delta, 'id', None):
+                call.id = delta.id
+            function = getattr(delta, 'function', None)
+            if function is not None:
+                call.function.name += getattr(function, 'name', None) or ''
+                call.function.arguments += getattr(function, 'arguments', None) or ''
+
+    def calls(self) -> List[StreamedToolCall]:
+        return [self._calls[i] for i in sorted(self._calls)]
+
+
+@dataclass
+class StreamedCompletion:
+    """Result of a streamed chat completion."""
+
+    content: str
+    usage: Any = None                  # CompletionUsage from the final chunk, if sent
+    finish_reason: Optional[str] = None
+    first_token_seconds: Optional[float] = None
+    total_seconds: float = 0.0
+    model: Optional[str] = None
+    hedged: bool = False               # a fallback model was started (hedging.py)
+    hedge_reason: Optional[str] = None  # why: 'slow', 'empty' or 'error' primary (hedging.py)
+    attempts: List[Dict[str, Any]] = field(default_factory=list)  # every stream a hedge started
+    tool_calls: List[StreamedToolCall] = field(default_factory=list)
+
+    def assistant_message(self) -> Dict[str, Any]:
+        """The reply as a chat message, for appending to the conversation."""
+        message = {'role': 'assistant', 'content': self.content or None}
+        if self.tool_calls:
+            message['tool_calls'] = [call.to_dict() for call in self.tool_calls]
+        return message
+
+
+def stream_chat_completion(client, on_text: Optional[Callable[[str], None]] = None,
+                           min_interval: float = 0.05, **params) -> StreamedCompletion:
+    """Run ``client.chat.completions.create(**params)`` as a stream.
+
+    ``on_text`` receives the full text so far (throttled to ``min_interval``
+    seconds, plus once at the end).
+    """
+    start = time.perf_counter()
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **params)
+
+    parts = []
+    tool_calls = ToolCallAccumulator()
+    result = StreamedCompletion(content='', model=params.get('model'))
+    last_render = 0.0
+    for chunk in stream:
+        if getattr(chunk, 'usage', None) is not None:
+            result.usage = chunk.usage
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            result.finish_reason = choice.finish_reason
+        now = time.perf_counter()
+        if getattr(choice.delta, 'tool_calls', None):
+            tool_calls.add(choice.delta.tool_calls)
+            if result.first_token_seconds is None:
+                result.first_token_seconds = now - start
+        text = getattr(choice.delta, 'content', None)
+        if not text:
+            continue
+        if result.first_token_seconds is None:
+            result.first_token_seconds = now - start
+        parts.append(text)
+        if on_text is not None and now - last_render >= min_interval:
+            on_text(''.join(parts))
+            last_render = now
+
+    result.content = ''.join(parts)
+    result.tool_calls = tool_calls.calls()
+    result.total_seconds = time.perf_counter() - start
+    if on_text is not None and result.content:
+        on_text(result.content)
+    return result
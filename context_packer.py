@@ -0,0 +1,164 @@
+"""Token-budgeted packing of search results into model context.
+
+Tool messages in ``app.py`` and the week3 summarizer prompt used to carry
+every search result in full, so prompt size (and latency) depended on how
+much the searches happened to return. ``pack_results`` fits structured
+results (tool_results.py) into a token budget instead:
+
+- every item becomes a snippet, valued by its rank within its source and
+  its score (documents), so the best results of each source go first
+- each source (``web``, ``docs``) gets a quota of the budget; budget a
+  source leaves unused is handed to the others' next-best snippets
+- kept items keep their original IDs (``W1``, ``W3``) so citations stay
+  stable, and a ``note:`` line tells the model how many were dropped
+
+Tokens are counted with tiktoken when it is installed and estimated at four
+characters per token otherwise. ``CONTEXT_SOURCE_QUOTAS`` (e.g.
+``web=0.6,docs=0.4``) overrides the default even split.
+"""
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional, Dict, Any, List
+
+from tool_results import encode_header, encode_item
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character estimate
+    tiktoken = None
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('o200k_base')
+
+
+def count_tokens(text: str, model: str = 'gpt-4o') -> int:
+    """Tokens in ``text`` for ``model`` (estimated when tiktoken is missing)."""
+    if not text:
+        return 0
+    if tiktoken is not None:
+        return len(_encoding(model).encode(text))
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class PackedContext:
+    """Packed results: one text per input result, plus what was kept and dropped.
+
+    ``kept_tokens`` is the whole packed context (at most the budget);
+    ``per_source`` counts snippets only.
+    """
+
+    texts: List[str]
+    kept_tokens: int = 0
+    dropped_tokens: int = 0
+    kept_items: int = 0
+    dropped_items: int = 0
+    per_source: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return '\n\n'.join(t for t in self.texts if t)
+
+
+def _parse_quotas(spec: str) -> Dict[str, float]:
+    quotas = {}
+    for part in spec.split(','):
+        name, _, value = part.partition('=')
+        if name.strip() and value.strip():
+            quotas[name.strip()] = float(value)
+    return quotas
+
+
+def pack_results(results: List[Any], budget: int, quotas: Optional[Dict[str, float]] = None,
+                 model: str = 'gpt-4o', max_text: int = 300, max_content: int = 1200) -> PackedContext:
+    """Fit structured results into ``budget`` tokens, best snippets first.
+
+    ``results`` may mix structured dicts and plain strings; strings (and the
+    header/note lines of each result) are always kept and count against the
+    budget. ``quotas`` maps source kind to its share of the budget.
+    """
+    texts: List[Optional[str]] = [None] * len(results)
+    used = 0
+    snippets = []
+    for r_index, result in enumerate(results):
+        if not isinstance(result, dict):
+            texts[r_index] = str(result)
+            used += count_tokens(texts[r_index], model)
+            continue
+        kind = result.get('kind', 'web')
+        items = result.get('items') or []
+        overhead = encode_header(result, len(items)) + f"\nnote: {result.get('note') or ''}"
+        if items:
+            overhead += f"; {len(items)} lower-ranked results omitted for length"  # room for the omission note
+        used += count_tokens(overhead, model)
+        for position, item in enumerate(items, 1):
+            record = encode_item(kind, position, item, max_text, max_content)
+            score = item.get('score') if isinstance(item.get('score'), (int, float)) else 0.0
+            snippets.append({'result': r_index, 'kind': kind, 'position': position, 'record': record,
+                             'tokens': count_tokens(record, model), 'value': 1.0 / position + score})
+
+    kinds = sorted({s['kind'] for s in snippets})
+    quotas = dict(quotas if quotas is not None else _parse_quotas(os.getenv('CONTEXT_SOURCE_QUOTAS', '')))
+    total_share = sum(quotas.get(k, 0.0) for k in kinds)
+    if not total_share:
+        quotas, total_share = {k: 1.0 for k in kinds}, float(len(kinds) or 1)
+    available = max(0, budget - used)
+    allowance = {k: available * quotas.get(k, 0.0) / total_share for k in kinds}
+
+    ranked = sorted(snippets, key=lambda s: -s['value'])
+    kept = set()
+    spent = {k: 0 for k in kinds}
+    # first pass within each source's quota, second pass hands out what's left
+    for within_quota in (True, False):
+        for i, snippet in enumerate(ranked):
+            if i in kept:
+                continue
+            if used + snippet['tokens'] > budget:
+                continue
+            if within_quota and spent[snippet['kind']] + snippet['tokens'] > allowance[snippet['kind']]:
+                continue
+            kept.add(i)
+            used += snippet['tokens']
+            spent[snippet['kind']] += snippet['tokens']
+
+    packed = PackedContext(texts=[])
+    by_result: Dict[int, List[Dict[str, Any]]] = {}
+    for i, snippet in enumerate(ranked):
+        source = packed.per_source.setdefault(snippet['kind'], {'kept_tokens': 0, 'dropped_tokens': 0,
+                                                                'kept_items': 0, 'dropped_items': 0})
+        if i in kept:
+            by_result.setdefault(snippet['result'], []).append(snippet)
+            source['kept_tokens'] += snippet['tokens']
+            source['kept_items'] += 1
+        else:
+            source['dropped_tokens'] += snippet['tokens']
+            source['dropped_items'] += 1
+    packed.kept_tokens = used  # snippets plus headers, notes and plain-text results
+    for source in packed.per_source.values():
+        packed.dropped_tokens += source['dropped_tokens']
+        packed.kept_items += source['kept_items']
+        packed.dropped_items += source['dropped_items']
+
+    for r_index, result in enumerate(results):
+        if texts[r_index] is not None:
+            packed.texts.append(texts[r_index])
+            continue
+        records = sorted(by_result.get(r_index, []), key=lambda s: s['position'])
+        dropped = len(result.get('items') or []) - len(records)
+        notes = [result['note']] if result.get('note') else []
+        if dropped:
+            notes.append(f"{dropped} lower-ranked results omitted for length")
+        lines = [encode_header(result, len(records))] + [s['record'] for s in records]
+        if notes:
+            lines.append(f"note: {'; '.join(notes)}")
+        packed.texts.append('\n'.join(lines))
+    return packed
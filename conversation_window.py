@@ -0,0 +1,147 @@
+"""Rolling conversation window with an incrementally updated summary.
+
+Every chat turn used to resend the whole session history, including earlier
+error replies, so prompt size and latency grew without bound. The window
+keeps the last ``keep_turns`` user/assistant turns verbatim and folds older
+turns into a running summary:
+
+- build_messages: system prompt + summary (as a second system message) +
+  the messages not yet folded in, with error replies dropped
+- schedule_compaction: once more than ``keep_turns + batch_turns`` turns are
+  unsummarized, the oldest ones are merged into the summary on a background
+  thread; the result is picked up at the start of a later turn
+
+Only the newly evicted turns and the previous summary go to the summarizer,
+so the summary is never recomputed from scratch. Until a compaction lands
+the evicted turns are still sent verbatim, so nothing is lost while it runs.
+
+``CONVERSATION_KEEP_TURNS`` (default 6) and ``CONVERSATION_SUMMARY_MODEL``
+(default gpt-4o-mini) configure it.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable
+
+ERROR_PREFIX = "❌ Error:"
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a research assistant. "
+    "Merge the new messages into the existing summary. Keep facts the user stated, their goals and "
+    "preferences, questions asked, key findings and sources cited. Drop greetings and filler. "
+    "Reply with the updated summary only, at most 200 words."
+)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='conversation-summary')
+
+
+def is_error_message(message: Dict[str, Any]) -> bool:
+    content = message.get('content') or ''
+    return message.get('role') == 'assistant' and content.startswith(ERROR_PREFIX)
+
+
+def summarize_with_openai(client, model: Optional[str] = None) -> Callable[[str, List[Dict[str, Any]]], str]:
+    """A ``summarize(previous_summary, messages)`` function backed by a chat model."""
+    model = model or os.getenv('CONVERSATION_SUMMARY_MODEL', 'gpt-4o-mini')
+
+    def summarize(previous: str, messages: List[Dict[str, Any]]) -> str:
+        transcript = '\n'.join(f"{m['role']}: {m.get('content') or ''}" for m in messages)
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"},
+            ],
+            max_completion_tokens=400,
+            temperature=0.2,
+        )
+        return (response.choices[0].message.content or previous).strip()
+
+    return summarize
+
+
+class ConversationWindow:
+    """Last N turns verbatim, older turns folded into a background-updated summary."""
+
+    def __init__(self, summarize: Callable[[str, List[Dict[str, Any]]], str],
+                 keep_turns: Optional[int] = None, batch_turns: int = 2):
+        self.summarize = summarize
+        self.keep_turns = int(keep_turns if keep_turns is not None else os.getenv('CONVERSATION_KEEP_TURNS', '6'))
+        self.batch_turns = batch_turns
+        self.summary = ''
+        self.summarized = 0          # messages folded into the summary
+        self.compactions = 0
+        self.last_error: Optional[str] = None
+        self._pending: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def _collect(self):
+        """Apply a finished background compaction, if any."""
+        with self._lock:
+            pending = self._pending
+            if pending is None or not pending.done():
+                return
+            self._pending = None
+        try:
+            summary, upto = pending.result()
+        except Exception as e:
+            self.last_error = str(e)  # keep the old summary; the turns stay verbatim
+            return
+        self.summary, self.summarized = summary, upto
+        self.compactions += 1
+
+    def _turn_starts(self, messages: List[Dict[str, Any]]) -> List[int]:
+        return [i for i in range(self.summarized, len(messages)) if messages[i].get('role') == 'user']
+
+    def build_messages(self, system_message: Dict[str, Any], messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Messages for the next completion."""
+        self._collect()
+        if self.summarized > len(messages):  # history was cleared or replaced
+            self.reset()
+        built = [system_message]
+        if self.summary:
+            built.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        built.extend(m for m in messages[self.summarized:] if not is_error_message(m))
+        return built
+
+    def schedule_compaction(self, messages: List[Dict[str, Any]]) -> bool:
+        """Fold the oldest unsummarized turns into the summary in the background.
+
+        Returns True if a compaction was started. At most one runs at a time.
+        """
+        self._collect()
+        starts = self._turn_starts(messages)
+        if len(starts) <= self.keep_turns + self.batch_turns:
+            return False
+        with self._lock:
+            if self._pending is not None:
+                return False
+            upto = starts[len(starts) - self.keep_turns]
+            evicted = [dict(m) for m in messages[self.summarized:upto] if not is_error_message(m)]
+            previous = self.summary
+            self._pending = _executor.submit(lambda: (self.summarize(previous, evicted), upto))
+        return True
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running compaction finishes (tests and shutdown)."""
+        pending = self._pending
+        if pending is not None:
+            pending.exception(timeout=timeout)
+        self._collect()
+
+    def reset(self):
+        with self._lock:
+            self._pending = None
+        self.summary = ''
+        self.summarized = 0
+
+    def get_metrics(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            'summarized_messages': self.summarized,
+            'verbatim_messages': max(0, len(messages) - self.summarized),
+            'summary_chars': len(self.summary),
+            'compactions': self.compactions,
+            'compacting': self._pending is not None,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,344 @@
+"""Quota-aware scheduling of Google Custom Search calls.
+
+The CSE API has a daily query quota (100/day on the free tier). Without
+coordination every session spends it independently, duplicate queries in
+flight each cost a unit, and once it runs out searches fail mid-session. The
+scheduler sits in front of every live CSE call (``web_search.fetch_web_results``
+and ``async_search.async_fetch_web_results``):
+
+- QuotaTracker: daily usage shared by all processes on the machine (SQLite,
+  reset at midnight Pacific like Google's quota)
+- CSEScheduler: cache-first search that merges identical in-flight queries and
+  spends quota only on cache misses
+
+Under pressure searches degrade in a fixed order:
+
+1. fresh cache hit (no quota)
+2. join an identical query already in flight (no quota)
+3. live search with all requested pages
+4. below the reserve (``CSE_QUOTA_RESERVE``): a single page (<= 10 results),
+   served from cache when a single-page entry exists
+5. quota gone, or CSE in a failure cooldown (backend_health.py): a stale
+   cache entry (``WEB_SEARCH_CACHE_STALE_TTL``)
+6. ``QuotaExhaustedError`` / ``BackendUnavailableError``; the apps then fall
+   back to mock results
+
+Configuration: ``CSE_DAILY_QUOTA`` (default 100), ``CSE_QUOTA_RESERVE``
+(fraction kept back, default 0.1) and ``CSE_QUOTA_PATH`` (shared state file).
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+import requests
+
+from backend_health import negative_cache
+from web_search import CSE_PAGE_SIZE, WebResultCache, get_web_cache, search_google_cse_pages
+
+try:
+    from zoneinfo import ZoneInfo
+    _QUOTA_TZ = ZoneInfo('America/Los_Angeles')
+except Exception:  # tzdata missing
+    _QUOTA_TZ = timezone.utc
+
+_QUOTA_REASONS = ('dailyLimitExceeded', 'quotaExceeded')
+BACKEND = 'google_cse'  # negative-cache key (backend_health.py)
+
+
+class QuotaExhaustedError(RuntimeError):
+    """No CSE quota left and nothing usable in the cache."""
+
+    error_class = 'quota'
+
+
+class QuotaTracker:
+    """Daily CSE quota usage, shared across processes through a SQLite file.
+
+    With ``path=None`` usage is tracked in memory for this process only.
+    """
+
+    def __init__(self, daily_limit: Optional[int] = None, path: Optional[str] = None):
+        self.daily_limit = int(daily_limit if daily_limit is not None else os.getenv('CSE_DAILY_QUOTA', '100'))
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory: Dict[str, int] = {}
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS cse_quota (day TEXT PRIMARY KEY, used INTEGER NOT NULL)')
+
+    @staticmethod
+    def day_key() -> str:
+        return datetime.now(_QUOTA_TZ).strftime('%Y-%m-%d')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def used(self) -> int:
+        day = self.day_key()
+        if not self.path:
+            with self._lock:
+                return self._memory.get(day, 0)
+        with self._connect() as conn:
+            row = conn.execute('SELECT used FROM cse_quota WHERE day = ?', (day,)).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self) -> int:
+        return max(0, self.daily_limit - self.used())
+
+    def try_acquire(self, units: int = 1) -> bool:
+        """Atomically reserve ``units`` queries; False if they'd exceed the limit."""
+        day = self.day_key()
+        if not self.path:
+            with self._lock:
+                used = self._memory.get(day, 0)
+                if used + units > self.daily_limit:
+                    return False
+                self._memory = {day: used + units}
+                return True
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT used FROM cse_quota WHERE day = ?', (day,)).fetchone()
+            used = row[0] if row else 0
+            if used + units > self.daily_limit:
+                conn.execute('ROLLBACK')
+                return False
+            conn.execute('INSERT OR REPLACE INTO cse_quota (day, used) VALUES (?, ?)', (day, used + units))
+            conn.execute('DELETE FROM cse_quota WHERE day != ?', (day,))
+            conn.execute('COMMIT')
+            return True
+        finally:
+            conn.close()
+
+    def mark_exhausted(self):
+        """Record that Google reported the quota as spent (e.g. used by another key holder)."""
+        day = self.day_key()
+        if not self.path:
+            with self._lock:
+                self._memory = {day: self.daily_limit}
+            return
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO cse_quota (day, used) VALUES (?, ?)', (day, self.daily_limit))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        used = self.used()
+        return {'day': self.day_key(), 'used': used, 'limit': self.daily_limit,
+                'remaining': max(0, self.daily_limit - used), 'shared': bool(self.path)}
+
+
+def _is_quota_error(error: Exception) -> bool:
+    response = getattr(error, 'response', None)
+    if response is None or response.status_code not in (403, 429):
+        return False
+    try:
+        text = response.text
+    except Exception:
+        return False
+    return any(reason in text for reason in _QUOTA_REASONS)
+
+
+def _pages(num: int) -> int:
+    return max(1, math.ceil(num / CSE_PAGE_SIZE))
+
+
+class CSEScheduler:
+    """Cache-first, quota-aware CSE search with in-flight query merging."""
+
+    def __init__(self, cache: Optional[WebResultCache] = None, quota: Optional[QuotaTracker] = None,
+                 reserve_fraction: Optional[float] = None, merge_timeout: float = 30.0):
+        self.cache = cache
+        self.quota = quota if quota is not None else QuotaTracker(path=_default_quota_path())
+        self.reserve_fraction = float(reserve_fraction if reserve_fraction is not None
+                                      else os.getenv('CSE_QUOTA_RESERVE', '0.1'))
+        self.merge_timeout = merge_timeout
+        self.stats = {'cache': 0, 'merged': 0, 'live': 0, 'reduced': 0, 'stale': 0, 'exhausted': 0,
+                      'unavailable': 0}
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._async_inflight: Dict[tuple, asyncio.Future] = {}
+
+    def _cache(self) -> WebResultCache:
+        return self.cache if self.cache is not None else get_web_cache()
+
+    def _count(self, source: str):
+        with self._lock:
+            self.stats[source] += 1
+
+    def _plan(self, query: str, num: int):
+        """Decide how to serve a cache miss: ``(results, None)`` or ``(None, live_num)``."""
+        cache = self._cache()
+        live_num = num
+        if num > CSE_PAGE_SIZE and self.quota.remaining() <= self.quota.daily_limit * self.reserve_fraction:
+            live_num = CSE_PAGE_SIZE
+            cached = cache.get(query, live_num)
+            if cached is not None:
+                self._count('reduced')
+                return cached, None
+        failure = negative_cache.check(BACKEND)
+        if failure is not None:
+            # known-bad backend: don't wait on it (or spend quota) until the cooldown ends
+            return self._degrade(query, num, negative_cache.unavailable_error(BACKEND, failure)), None
+        if self.quota.try_acquire(_pages(live_num)):
+            if live_num != num:
+                self._count('reduced')
+            return None, live_num
+        # no live call after all: let the next search probe the backend
+        negative_cache.release_probe(BACKEND)
+        return self._degrade(query, num), None
+
+    def can_prefetch(self, query: str, num: int = 5) -> bool:
+        """True if a speculative search for ``query`` (app.py) may run now.
+
+        A cached query costs nothing; a miss only while the remaining quota is
+        above the ``CSE_QUOTA_RESERVE`` line, since a discarded prefetch must
+        not eat into the quota kept for searches the model actually asks for.
+        """
+        if self._cache().contains(query, num):
+            return True
+        return self.quota.remaining() > self.quota.daily_limit * self.reserve_fraction
+
+    def _degrade(self, query: str, num: int, error: Optional[Exception] = None) -> List[Dict[str, str]]:
+        """Serve a stale entry or raise ``error`` (``QuotaExhaustedError`` by default)."""
+        cache = self._cache()
+        for candidate in dict.fromkeys((num, min(num, CSE_PAGE_SIZE))):
+            stale = cache.get(query, candidate, allow_stale=True)
+            if stale is not None:
+                self._count('stale')
+                return stale
+        if error is not None:
+            self._count('unavailable')
+            raise error
+        self._count('exhausted')
+        raise QuotaExhaustedError('Google CSE daily quota exhausted and no cached results available')
+
+    def _store(self, query: str, num: int, live_num: int, results: List[Dict[str, str]]):
+        cache = self._cache()
+        cache.set(query, live_num, results)
+        if live_num != num:
+            # best available answer for the larger request until quota returns
+            cache.set(query, num, results)
+        self._count('live')
+
+    def search(self, query: str, num: int = 5, api_key: Optional[str] = None,
+               cse_id: Optional[str] = None) -> List[Dict[str, str]]:
+        cache = self._cache()
+        cached = cache.get(query, num)
+        if cached is not None:
+            self._count('cache')
+            return cached
+
+        key = cache.get_cache_key(query, num)
+        with self._lock:
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[key] = Future()
+        if not leader:
+            self._count('merged')
+            return pending.result(timeout=self.merge_timeout)
+
+        try:
+            results, live_num = self._plan(query, num)
+            if results is None:
+                try:
+                    results = search_google_cse_pages(query, num=live_num, api_key=api_key, cse_id=cse_id)
+                except Exception as e:
+                    negative_cache.record_failure(BACKEND, e)
+                    if not (isinstance(e, requests.HTTPError) and _is_quota_error(e)):
+                        raise
+                    self.quota.mark_exhausted()
+                    results = self._degrade(query, num)
+                else:
+                    negative_cache.record_success(BACKEND)
+                    self._store(query, num, live_num, results)
+            pending.set_result(results)
+            return results
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def asearch(self, query: str, num: int,
+                      fetch: Callable[..., Awaitable[List[Dict[str, str]]]],
+                      api_key: Optional[str] = None, cse_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """Async variant of ``search``; ``fetch`` performs the live paged search."""
+        cache = self._cache()
+        cached = cache.get(query, num)
+        if cached is not None:
+            self._count('cache')
+            return cached
+
+        loop = asyncio.get_running_loop()
+        key = (id(loop), cache.get_cache_key(query, num))
+        pending = self._async_inflight.get(key)
+        if pending is not None:
+            self._count('merged')
+            return await asyncio.wait_for(asyncio.shield(pending), self.merge_timeout)
+        pending = self._async_inflight[key] = loop.create_future()
+
+        try:
+            results, live_num = self._plan(query, num)
+            if results is None:
+                try:
+                    results = await fetch(query, num=live_num, api_key=api_key, cse_id=cse_id)
+                except asyncio.CancelledError:
+                    negative_cache.release_probe(BACKEND)
+                    raise
+                except Exception as e:
+                    negative_cache.record_failure(BACKEND, e)
+                    if not _is_quota_error(e):
+                        raise
+                    self.quota.mark_exhausted()
+                    results = self._degrade(query, num)
+                else:
+                    negative_cache.record_success(BACKEND)
+                    self._store(query, num, live_num, results)
+            pending.set_result(results)
+            return results
+        except BaseException as e:
+            pending.set_exception(e)
+            pending.exception()  # mark retrieved when nobody joined
+            raise
+        finally:
+            self._async_inflight.pop(key, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'quota': self.quota.get_metrics()}
+
+
+def _default_quota_path() -> str:
+    return os.getenv('CSE_QUOTA_PATH') or os.path.join(tempfile.gettempdir(), 'yes_dear_cse_quota.sqlite3')
+
+
+_scheduler: Optional[CSEScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_cse_scheduler() -> CSEScheduler:
+    """Return the process-wide scheduler (configured from the environment)."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = CSEScheduler()
+    return _scheduler
+
+
+def reset_cse_scheduler():
+    """Drop the process-wide scheduler so it is rebuilt from the environment."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
@@ -0,0 +1,265 @@
+"""Local stand-in for the Google Custom Search JSON API.
+
+Serves ``/customsearch/v1`` with the same response shape as Google (``items``,
+``queries``, ``searchInformation``), so web search pooling, caching, pagination
+and retries can be exercised and benchmarked without network access or CSE
+quota. Point the apps at it with the base-URL setting::
+
+    python fake_cse.py --port 8765 --latency lognormal:120:0.5 --error-rate 0.02 --rate-limit-rate 0.05
+    GOOGLE_CSE_URL=http://127.0.0.1:8765/customsearch/v1 GOOGLE_API_KEY=fake GOOGLE_CSE_ID=fake streamlit run app.py
+
+- LatencyModel: seeded latency distribution (fixed, uniform, normal, lognormal, pareto)
+- FakeCSEServer: threaded HTTP server with error/429 injection, an optional
+  queries-per-second limit and request counters (``GET /stats``)
+
+Results are deterministic per query and page, so cache hits and misses can be
+compared across runs.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any
+from urllib.parse import parse_qs, urlparse
+
+
+class LatencyModel:
+    """Seeded latency distribution, in milliseconds.
+
+    Specs are ``"<kind>:<params>"``:
+
+    - ``fixed:50``            always 50 ms
+    - ``uniform:20:200``      uniform between 20 and 200 ms
+    - ``normal:100:30``       mean 100 ms, std dev 30 ms (clipped at 0)
+    - ``lognormal:100:0.5``   median 100 ms, sigma 0.5 (long tail)
+    - ``pareto:50:1.5``       at least 50 ms, shape 1.5 (heavy tail: rare very slow calls)
+    """
+
+    KINDS = ('fixed', 'uniform', 'normal', 'lognormal', 'pareto')
+
+    def __init__(self, spec: str = 'fixed:0', seed: Optional[int] = None):
+        kind, _, rest = spec.partition(':')
+        if kind not in self.KINDS:
+            raise ValueError(f'Unknown latency distribution {kind!r} (expected one of {", ".join(self.KINDS)})')
+        self.kind = kind
+        self.params = [float(p) for p in rest.split(':') if p] or [0.0]
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self) -> float:
+        p = self.params
+        with self._lock:
+            if self.kind == 'fixed':
+                value = p[0]
+            elif self.kind == 'uniform':
+                value = self._rng.uniform(p[0], p[1] if len(p) > 1 else p[0])
+            elif self.kind == 'normal':
+                value = self._rng.gauss(p[0], p[1] if len(p) > 1 else 0.0)
+            elif self.kind == 'pareto':
+                value = p[0] * self._rng.paretovariate(p[1] if len(p) > 1 else 1.5)
+            else:
+                median = max(p[0], 1e-9)
+                value = self._rng.lognormvariate(0.0, p[1] if len(p) > 1 else 0.5) * median
+        return max(0.0, value)
+
+    def sample(self) -> float:
+        """Latency in seconds."""
+        return self.sample_ms() / 1000
+
+
+def fake_results(query: str, start: int, num: int, total: int) -> list:
+    """Deterministic CSE ``items`` for one page of ``query``."""
+    slug = hashlib.md5(query.encode('utf-8')).hexdigest()[:8]
+    items = []
+    for rank in range(start, min(start + num, total + 1)):
+        link = f'https://example.com/{slug}/{rank}'
+        title = f'{query} - result {rank}'
+        snippet = f'Synthetic result {rank} for "{query}". Served by the local fake Custom Search API.'
+        items.append({
+            'kind': 'customsearch#result',
+            'title': title,
+            'htmlTitle': title,
+            'link': link,
+            'displayLink': 'example.com',
+            'snippet': snippet,
+            'htmlSnippet': snippet,
+            'formattedUrl': link,
+        })
+    return items
+
+
+class _FakeCSEHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    server: 'FakeCSEServer'
+
+    def do_GET(self):
+        fake = self.server
+        parsed = urlparse(self.path)
+        if parsed.path == '/stats':
+            return self._send_json(200, fake.get_stats())
+        if parsed.path.rstrip('/') != '/customsearch/v1':
+            return self._send_error(404, 'Not Found', 'notFound')
+
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        fake.count('requests')
+        time.sleep(fake.latency.sample())
+
+        if not params.get('key') or not params.get('cx'):
+            fake.count('bad_requests')
+            return self._send_error(400, 'Missing key or cx parameter', 'badRequest')
+        outcome = fake.draw_outcome()
+        if outcome == 'rate_limited':
+            fake.count('rate_limited')
+            return self._send_error(429, 'Quota exceeded for quota metric queries per minute',
+                                    'rateLimitExceeded', retry_after=fake.retry_after)
+        if outcome == 'error':
+            fake.count('errors')
+            return self._send_error(503, 'Backend Error', 'backendError')
+
+        query = params.get('q', '')
+        start = max(1, int(params.get('start', '1')))
+        num = max(1, min(10, int(params.get('num', '10'))))
+        if start + num - 1 > 100:
+            fake.count('bad_requests')
+            return self._send_error(400, 'Request contains an invalid argument.', 'invalid')
+
+        items = fake_results(query, start, num, fake.total_results)
+        request_info = {'totalResults': str(fake.total_results), 'searchTerms': query,
+                        'count': len(items), 'startIndex': start}
+        body: Dict[str, Any] = {
+            'kind': 'customsearch#search',
+            'url': {'type': 'application/json'},
+            'queries': {'request': [request_info]},
+            'searchInformation': {'searchTime': round(fake.latency.sample_ms() / 1000, 3),
+                                  'totalResults': str(fake.total_results)},
+        }
+        if start + num <= min(fake.total_results, 100):
+            body['queries']['nextPage'] = [{**request_info, 'startIndex': start + num}]
+        if items:
+            body['items'] = items
+        fake.count('ok')
+        self._send_json(200, body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, reason: str, retry_after: Optional[float] = None):
+        # Retry-After must be whole seconds (or an HTTP date)
+        headers = {'Retry-After': str(math.ceil(retry_after))} if retry_after is not None else None
+        self._send_json(status, {'error': {'code': status, 'message': message,
+                                           'errors': [{'message': message, 'domain': 'global', 'reason': reason}]}},
+                        headers)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeCSEServer(ThreadingHTTPServer):
+    """Threaded fake CSE server.
+
+    ``error_rate`` and ``rate_limit_rate`` are per-request probabilities of a
+    503 or a 429 (with ``Retry-After``); ``qps_limit`` additionally returns 429
+    once more than that many requests arrive within one second. All random
+    draws use ``seed``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0',
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1,
+                 qps_limit: Optional[float] = None, total_results: int = 100, seed: Optional[int] = 0):
+        super().__init__((host, port), _FakeCSEHandler)
+        self.latency = LatencyModel(latency, seed=seed)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.qps_limit = qps_limit
+        self.total_results = total_results
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window: list = []
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'bad_requests': 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/customsearch/v1'
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'latency': self.latency.spec}
+
+    def draw_outcome(self) -> str:
+        with self._lock:
+            if self.qps_limit:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= self.qps_limit:
+                    return 'rate_limited'
+                self._window.append(now)
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return 'rate_limited'
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 'error'
+        return 'ok'
+
+    def start(self) -> 'FakeCSEServer':
+        """Serve from a daemon thread (tests, in-process benchmarks)."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-cse', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake Google Custom Search API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal:120:0.4',
+                        help='fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA | pareto:MIN:SHAPE')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a 503 response')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Probability of a 429 response')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--qps-limit', type=float, default=None, help='Return 429 above this many requests/second')
+    parser.add_argument('--total-results', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeCSEServer(args.host, args.port, latency=args.latency, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                           qps_limit=args.qps_limit, total_results=args.total_results, seed=args.seed)
+    print(f'🔎 Fake CSE listening on {server.url} (latency {args.latency})')
+    print(f'   export GOOGLE_CSE_URL={server.url} GOOGLE_API_KEY=fake GOOGLE_CSE_ID=fake')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\nStats: {server.get_stats()}')
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
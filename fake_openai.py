@@ -0,0 +1,386 @@
+"""Local stand-in for the OpenAI API.
+
+Serves ``/v1/chat/completions`` (plain and streamed, with tool calls and
+``stream_options.include_usage``), ``/v1/embeddings`` and ``/v1/moderations``
+in the shapes the OpenAI SDK parses, so every chat path (app.py, the week3
+summarizer, week4/week4_app_final.py, the leads app in week3/vscode) can be
+benchmarked end to end without network access or spend. The SDK reads
+``OPENAI_BASE_URL``, so pointing the apps at it needs no code changes::
+
+    python fake_openai.py --port 8766 --ttft lognormal:400:0.5 --token-rate normal:60:15 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8766/v1 OPENAI_API_KEY=fake streamlit run app.py
+
+- Latency: time to first token from a ``fake_cse.LatencyModel`` spec, then
+  completion tokens at a rate (tokens/second) drawn from another spec
+- Tool calls: when a request offers tools (and ``tool_choice`` isn't
+  ``"none"``) and the last message isn't a tool result, the model calls them.
+  By default it calls every offered tool with the user's message as
+  ``query``; a script (JSON list of ``{"match": regex, "tool_calls": [...]}`` or
+  ``{"match": regex, "content": "..."}`` rules, ``{user}`` is replaced by the
+  user's message) decides per prompt
+- Failures: per-request probabilities of a 429 (with ``Retry-After``) or a 500,
+  in OpenAI's error format
+- Prompt caching: prompts that repeat an earlier request's prefix (tools and
+  leading messages) report ``prompt_tokens_details.cached_tokens``, in
+  128-token steps from 1024 tokens up, like the real API
+
+Answers, embeddings and random draws are seeded; ``GET /stats`` returns
+request counters.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List
+
+from fake_cse import LatencyModel
+
+MODERATION_CATEGORIES = ('harassment', 'harassment/threatening', 'hate', 'hate/threatening', 'illicit',
+                         'illicit/violent', 'self-harm', 'self-harm/instructions', 'self-harm/intent',
+                         'sexual', 'sexual/minors', 'violence', 'violence/graphic')
+_FILLER = ('the', 'results', 'show', 'that', 'this', 'policy', 'applies', 'to', 'most', 'teams', 'and',
+           'the', 'sources', 'agree', 'on', 'the', 'main', 'points', 'with', 'some', 'caveats')
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (four characters per token), like the API's order of magnitude."""
+    text = value if isinstance(value, str) else json.dumps(value, sort_keys=True)
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):  # content parts
+        return ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+    return content or ''
+
+
+def fake_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """Deterministic unit vector for ``text``."""
+    rng = random.Random(hashlib.sha256(text.encode('utf-8')).hexdigest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [round(v / norm, 6) for v in vector]
+
+
+class _FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    server: 'FakeOpenAIServer'
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            return self._send_json(200, self.server.get_stats())
+        if self.path.rstrip('/') == '/v1/models':
+            return self._send_json(200, {'object': 'list', 'data': [
+                {'id': m, 'object': 'model', 'created': 0, 'owned_by': 'fake'} for m in ('gpt-4o', 'gpt-5')]})
+        self._send_error(404, 'Not found', 'not_found')
+
+    def do_POST(self):
+        fake = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send_error(400, 'Invalid JSON body', 'invalid_request_error')
+        path = self.path.split('?', 1)[0].rstrip('/')
+        routes = {'/v1/chat/completions': self._chat, '/v1/embeddings': self._embeddings,
+                  '/v1/moderations': self._moderations}
+        if path not in routes:
+            return self._send_error(404, f'Unknown endpoint {path}', 'not_found')
+        fake.count('requests')
+        outcome = fake.draw_outcome()
+        if outcome == 'rate_limited':
+            fake.count('rate_limited')
+            time.sleep(fake.latency.sample() / 4)  # rejections are fast
+            return self._send_error(429, 'Rate limit reached for requests', 'requests',
+                                    code='rate_limit_exceeded', retry_after=fake.retry_after)
+        if outcome == 'error':
+            fake.count('errors')
+            time.sleep(fake.latency.sample())
+            return self._send_error(500, 'The server had an error while processing your request.', 'server_error')
+        routes[path](body)
+
+    # endpoints
+
+    def _chat(self, body: Dict[str, Any]):
+        fake = self.server
+        fake.count('chat')
+        messages = body.get('messages') or []
+        model = body.get('model', 'gpt-4o')
+        reply = fake.plan_reply(body)
+        limit = body.get('max_completion_tokens') or body.get('max_tokens')
+        if reply['content'] and limit:
+            reply['content'] = ' '.join(reply['content'].split(' ')[:int(limit)])
+        prompt_tokens = estimate_tokens(messages) + estimate_tokens(body.get('tools') or [])
+        completion_tokens = (len(reply['content'].split()) if reply['content'] else 0) + \
+            sum(estimate_tokens(c['function']['arguments']) for c in reply['tool_calls'])
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens,
+                 'prompt_tokens_details': {'cached_tokens': fake.cached_tokens(body)},
+                 'completion_tokens_details': {'reasoning_tokens': 0}}
+        ttft = fake.latency.sample()
+        rate = max(1.0, fake.token_rate.sample_ms())
+        base = {'id': f'chatcmpl-{uuid.uuid4().hex[:24]}', 'created': int(time.time()), 'model': model,
+                'system_fingerprint': 'fp_fake'}
+        finish = 'tool_calls' if reply['tool_calls'] else 'stop'
+
+        if not body.get('stream'):
+            time.sleep(ttft + completion_tokens / rate)
+            message = {'role': 'assistant', 'content': reply['content'] or None, 'refusal': None}
+            if reply['tool_calls']:
+                message['tool_calls'] = reply['tool_calls']
+            return self._send_json(200, {**base, 'object': 'chat.completion', 'usage': usage, 'choices': [
+                {'index': 0, 'message': message, 'finish_reason': finish, 'logprobs': None}]})
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(choices, **extra):
+            self._send_chunk(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': choices, **extra})}\n\n")
+
+        def delta(d, finish_reason=None):
+            event([{'index': 0, 'delta': d, 'finish_reason': finish_reason, 'logprobs': None}])
+
+        time.sleep(ttft)
+        delta({'role': 'assistant', 'content': ''})
+        for words in (reply['content'].split(' ') if reply['content'] else []):
+            time.sleep(1 / rate)
+            delta({'content': words + ' '})
+        for index, call in enumerate(reply['tool_calls']):
+            delta({'tool_calls': [{'index': index, 'id': call['id'], 'type': 'function',
+                                   'function': {'name': call['function']['name'], 'arguments': ''}}]})
+            arguments = call['function']['arguments']
+            for start in range(0, len(arguments), 16):
+                time.sleep(4 / rate)  # ~4 characters per token
+                delta({'tool_calls': [{'index': index, 'function': {'arguments': arguments[start:start + 16]}}]})
+        delta({}, finish_reason=finish)
+        if (body.get('stream_options') or {}).get('include_usage'):
+            event([], usage=usage)
+        self._send_chunk('data: [DONE]\n\n')
+        self._send_chunk('')  # end of chunked body
+
+    def _embeddings(self, body: Dict[str, Any]):
+        fake = self.server
+        fake.count('embeddings')
+        inputs = body.get('input')
+        inputs = inputs if isinstance(inputs, list) else [inputs or '']
+        dimensions = int(body.get('dimensions') or 1536)
+        time.sleep(fake.latency.sample() / 4)
+        tokens = sum(estimate_tokens(str(text)) for text in inputs)
+        self._send_json(200, {'object': 'list', 'model': body.get('model', 'text-embedding-ada-002'),
+                              'data': [{'object': 'embedding', 'index': i, 'embedding': fake_embedding(str(text), dimensions)}
+                                       for i, text in enumerate(inputs)],
+                              'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}})
+
+    def _moderations(self, body: Dict[str, Any]):
+        fake = self.server
+        fake.count('moderations')
+        inputs = body.get('input')
+        inputs = inputs if isinstance(inputs, list) else [inputs or '']
+        time.sleep(fake.latency.sample() / 4)
+        results = []
+        for text in inputs:
+            flagged = bool(fake.flag_pattern and fake.flag_pattern.search(_text(text)))
+            results.append({'flagged': flagged,
+                            'categories': {c: flagged and c == 'violence' for c in MODERATION_CATEGORIES},
+                            'category_scores': {c: (0.9 if flagged and c == 'violence' else 0.0001)
+                                                for c in MODERATION_CATEGORIES},
+                            'category_applied_input_types': {c: ['text'] for c in MODERATION_CATEGORIES}})
+        self._send_json(200, {'id': f'modr-{uuid.uuid4().hex[:24]}',
+                              'model': body.get('model', 'omni-moderation-latest'), 'results': results})
+
+    # responses
+
+    def _send_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, error_type: str, code: Optional[str] = None,
+                    retry_after: Optional[float] = None):
+        # Retry-After must be whole seconds (or an HTTP date)
+        headers = {'Retry-After': str(math.ceil(retry_after))} if retry_after is not None else None
+        self._send_json(status, {'error': {'message': message, 'type': error_type, 'param': None, 'code': code}},
+                        headers)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded fake OpenAI server.
+
+    ``latency`` is the time to first token (a quarter of it for embeddings and
+    moderations), ``token_rate`` the completion speed in tokens per second and
+    ``answer_tokens`` the answer length. ``error_rate`` and ``rate_limit_rate``
+    are per-request probabilities of a 500 or a 429. ``script`` is a list of
+    rules (see the module docstring); ``flag_pattern`` a regex that gets
+    moderation inputs flagged. All random draws use ``seed``.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: str = 'fixed:0',
+                 token_rate: str = 'fixed:1000', answer_tokens: str = 'fixed:60', error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1, script: Optional[List[Dict[str, Any]]] = None,
+                 flag_pattern: Optional[str] = None, seed: Optional[int] = 0):
+        super().__init__((host, port), _FakeOpenAIHandler)
+        self.latency = LatencyModel(latency, seed=seed)
+        self.token_rate = LatencyModel(token_rate, seed=seed)
+        self.answer_tokens = LatencyModel(answer_tokens, seed=seed)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.script = [{**rule, 'pattern': re.compile(rule.get('match', '.*'), re.IGNORECASE)} for rule in script or []]
+        self.flag_pattern = re.compile(flag_pattern, re.IGNORECASE) if flag_pattern else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prefixes: OrderedDict = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'requests': 0, 'chat': 0, 'embeddings': 0, 'moderations': 0, 'tool_calls': 0,
+                      'errors': 0, 'rate_limited': 0, 'cached_tokens': 0}
+
+    @property
+    def url(self) -> str:
+        """Base URL for the SDK (``OPENAI_BASE_URL``)."""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'latency': self.latency.spec, 'token_rate': self.token_rate.spec}
+
+    def draw_outcome(self) -> str:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return 'rate_limited'
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 'error'
+        return 'ok'
+
+    def cached_tokens(self, body: Dict[str, Any]) -> int:
+        """Tokens of the longest prefix an earlier request already sent (then remember this one)."""
+        digest = hashlib.sha256(json.dumps([body.get('model'), body.get('tools')], sort_keys=True).encode())
+        tokens = estimate_tokens(body.get('tools') or [])
+        cached = 0
+        with self._lock:
+            for message in body.get('messages') or []:
+                digest.update(json.dumps(message, sort_keys=True).encode())
+                tokens += estimate_tokens([message])
+                key = digest.hexdigest()
+                if key in self._prefixes:
+                    cached = tokens
+                    self._prefixes.move_to_end(key)
+                else:
+                    self._prefixes[key] = True
+            while len(self._prefixes) > 10_000:
+                self._prefixes.popitem(last=False)
+        cached = cached // 128 * 128 if cached >= 1024 else 0
+        self.count('cached_tokens', cached)
+        return cached
+
+    def plan_reply(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """``{'content': str, 'tool_calls': [...]}`` for a chat request."""
+        messages = body.get('messages') or []
+        user = next((_text(m.get('content')) for m in reversed(messages) if m.get('role') == 'user'), '')
+        offered = [t['function']['name'] for t in body.get('tools') or [] if t.get('type') == 'function']
+        may_call = offered and body.get('tool_choice') != 'none' and messages and messages[-1].get('role') != 'tool'
+        tool_results = sum(1 for m in messages if m.get('role') == 'tool')
+
+        rule = next((r for r in self.script if r['pattern'].search(user)), None)
+        calls = []
+        if may_call:
+            if rule is None:
+                calls = [{'name': name, 'arguments': {'query': user}} for name in offered]
+            elif 'tool_calls' in rule:
+                calls = [c for c in rule['tool_calls'] if c['name'] in offered]
+        if calls:
+            self.count('tool_calls', len(calls))
+            return {'content': '', 'tool_calls': [
+                {'id': f'call_{uuid.uuid4().hex[:24]}', 'type': 'function',
+                 'function': {'name': c['name'], 'arguments': json.dumps(
+                     {k: v.replace('{user}', user) if isinstance(v, str) else v
+                      for k, v in (c.get('arguments') or {'query': '{user}'}).items()})}}
+                for c in calls]}
+
+        if rule is not None and 'content' in rule:
+            return {'content': rule['content'].replace('{user}', user), 'tool_calls': []}
+        with self._lock:
+            length = max(5, int(self.answer_tokens.sample_ms()))
+            filler = [self._rng.choice(_FILLER) for _ in range(length)]
+        source = f' based on {tool_results} search results [W1]' if tool_results else ''
+        return {'content': f'Mock answer to "{user[:80]}"{source}: ' + ' '.join(filler) + '.', 'tool_calls': []}
+
+    def start(self) -> 'FakeOpenAIServer':
+        """Serve from a daemon thread (tests, in-process benchmarks)."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-openai', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake OpenAI API (chat completions, embeddings, moderations)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--ttft', default='lognormal:400:0.5',
+                        help='Time to first token: fixed:MS | uniform:LO:HI | normal:MEAN:SD | '
+                             'lognormal:MEDIAN:SIGMA | pareto:MIN:SHAPE')
+    parser.add_argument('--token-rate', default='normal:60:15', help='Completion tokens per second (same spec format)')
+    parser.add_argument('--answer-tokens', default='lognormal:150:0.4', help='Answer length in tokens (same spec format)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a 500 response')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Probability of a 429 response')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--script', default=None, help='JSON file of tool-call / answer rules')
+    parser.add_argument('--flag-pattern', default=None, help='Regex that gets moderation inputs flagged')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+    server = FakeOpenAIServer(args.host, args.port, latency=args.ttft, token_rate=args.token_rate,
+                              answer_tokens=args.answer_tokens, error_rate=args.error_rate,
+                              rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                              script=script, flag_pattern=args.flag_pattern, seed=args.seed)
+    print(f'🤖 Fake OpenAI listening on {server.url} (ttft {args.ttft}, {args.token_rate} tokens/s)')
+    print(f'   export OPENAI_BASE_URL={server.url} OPENAI_API_KEY=fake')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f'\nStats: {server.get_stats()}')
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""Precomputed FAQ answer index.
+
+Many document questions ("How many vacation days do I get?") are answered by a
+single paragraph of a single policy. This module builds likely question/answer
+pairs from the seeded corpus offline (see ``scripts/build_faq_index.py``),
+indexes the questions, and matches incoming queries against them. A confident
+match is answered straight from the index with a citation, skipping the model,
+search and summarizer round trips.
+
+- build_faq_entries: derive question/answer pairs from corpus documents
+- FAQIndex: TF-IDF question index with threshold + ambiguity matching
+- load_faq_index: load the JSON index once per process (reloaded on mtime change)
+- format_faq_answer: render a match as markdown with its citation
+
+The module has no dependency on Streamlit or OpenAI.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+DEFAULT_INDEX_PATH = os.getenv(
+    'FAQ_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faq_index.json'),
+)
+
+_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'could', 'do', 'does', 'for',
+    'from', 'get', 'have', 'how', 'i', 'if', 'in', 'into', 'is', 'it', 'me', 'my', 'of',
+    'on', 'or', 'our', 'please', 'should', 'tell', 'that', 'the', 'there', 'this', 'to',
+    'we', 'what', 'whats', 'when', 'where', 'which', 'who', 'will', 'with', 'you',
+    'your', 'about', 'acme', 'corporation', 'corp', 'company',
+}
+
+# "2.5 vacation days per month", "30 days of vacation annually", "15 days per year"
+_ENTITLEMENT_RE = re.compile(
+    r'\b\d+(?:\.\d+)?\s+(?:(?P<before>[a-z]+)\s+)?days?\b(?:\s+of\s+(?P<after>[a-z]+))?'
+    r'[^.\n]*?\b(?:annually|per\s+(?:year|month)|a\s+year|each\s+year)\b',
+    re.IGNORECASE,
+)
+_HEADING_RE = re.compile(r'^(?P<heading>[A-Za-z][A-Za-z &/()\-]{2,60}):\s*(?P<rest>.*)$')
+_QA_RE = re.compile(r'^Q:\s*(?P<q>.+?)\s*\nA:\s*(?P<a>.+?)(?=\n\s*\n|\nQ:|\Z)', re.MULTILINE | re.DOTALL)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, drop stopwords and fold simple plurals."""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", (text or '').lower().replace("'", '')):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _topic_words(title: str) -> str:
+    words = [w for w in re.findall(r"[A-Za-z]+", title.lower())
+             if w not in _STOPWORDS and w not in ('policy', 'policies', 'documentation')]
+    return ' '.join(words[:2])
+
+
+def _split_sections(content: str) -> List[Tuple[str, str]]:
+    """Split a policy document into (heading, paragraph) pairs.
+
+    Headings are short lines ending in a colon ("VACATION ACCRUAL:") or inline
+    "Heading: text" lines; a section runs until the next heading or blank line
+    after body text.
+    """
+    sections: List[Tuple[str, str]] = []
+    heading: Optional[str] = None
+    body: List[str] = []
+
+    def flush():
+        if heading and body:
+            sections.append((heading, '\n'.join(body).strip()))
+
+    for raw in content.splitlines():
+        line = raw.strip()
+        match = _HEADING_RE.match(line) if not line.startswith('-') else None
+        is_heading = bool(match) and len(match.group('heading').split()) <= 5
+        if is_heading and not re.match(r'^(Q|A|GET|POST|PUT|DELETE)$', match.group('heading')):
+            flush()
+            heading = match.group('heading').strip()
+            body = [match.group('rest')] if match.group('rest') else []
+        elif not line:
+            if body:
+                flush()
+                heading, body = None, []
+        elif heading:
+            body.append(line)
+    flush()
+    return sections
+
+
+def _section_questions(topic: str, heading: str, answer: str) -> List[str]:
+    subject = re.sub(r'\b(policy|summary)\b', '', heading.lower()).strip()
+    subject = re.sub(r'\s+', ' ', subject)
+    subjects = [subject]
+    if topic and not set(topic.split()) & set(subject.split()):
+        # "Carryover Policy" in the vacation policy is asked as "vacation carryover"
+        subjects.insert(0, f'{topic} {subject}')
+    questions = []
+    for subj in subjects:
+        questions.extend([
+            f'What is the {subj} policy?',
+            f'How does {subj} work?',
+            f'Tell me about {subj}',
+        ])
+    entitlement = _ENTITLEMENT_RE.search(answer)
+    if entitlement:
+        noun = entitlement.group('before') or entitlement.group('after')
+        if noun and noun.isalpha() and noun.lower() not in ('of', 'per', 'calendar', 'business'):
+            questions.append(f'How many {noun.lower()} days do I get?')
+        else:
+            questions.append(f'How many days of {subjects[-1]} do I get?')
+    return questions
+
+
+def build_faq_entries(documents: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Generate question/answer pairs from corpus documents.
+
+    ``documents`` are dicts with ``title`` and ``content`` (and optionally
+    ``id``), as used by the seeding scripts. Explicit "Q:/A:" pairs are taken
+    verbatim; other sections get templated questions. When two documents
+    generate the same question, the first document in corpus order wins.
+    """
+    entries: List[Dict[str, str]] = []
+    seen: set = set()
+
+    def add(question: str, answer: str, doc: Dict[str, Any], section: str):
+        key = ' '.join(tokenize(question))
+        if not key or key in seen:
+            return
+        seen.add(key)
+        entries.append({
+            'question': question,
+            'answer': answer.strip(),
+            'title': doc.get('title', 'Untitled'),
+            'section': section,
+            'doc_id': str(doc.get('id', doc.get('title', ''))),
+        })
+
+    for doc in documents:
+        content = doc.get('content', '') or ''
+        for qa in _QA_RE.finditer(content):
+            add(qa.group('q'), qa.group('a'), doc, qa.group('q'))
+        content_wo_qa = _QA_RE.sub('', content)
+        topic = _topic_words(doc.get('title', ''))
+        for heading, answer in _split_sections(content_wo_qa):
+            for question in _section_questions(topic, heading, answer):
+                add(question, answer, doc, heading.title() if heading.isupper() else heading)
+    return entries
+
+
+class FAQIndex:
+    """TF-IDF index over generated FAQ questions.
+
+    A query is answered only when the best question scores at least
+    ``threshold`` (cosine similarity) and beats the best question pointing at
+    a *different* answer by ``margin``; otherwise ``match`` returns None and the
+    normal research pipeline runs.
+    """
+
+    def __init__(self, entries: List[Dict[str, str]], threshold: Optional[float] = None, margin: float = 0.05):
+        self.entries = entries
+        self.threshold = threshold if threshold is not None else float(os.getenv('FAQ_MATCH_THRESHOLD', '0.82'))
+        self.margin = margin
+        df: Counter = Counter()
+        tokenized = [tokenize(e['question']) for e in entries]
+        for tokens in tokenized:
+            df.update(set(tokens))
+        n = max(len(entries), 1)
+        self.idf: Dict[str, float] = {t: math.log((1 + n) / (1 + c)) + 1.0 for t, c in df.items()}
+        self._vectors = [self._vectorize(tokens) for tokens in tokenized]
+        self.hits = 0
+        self.misses = 0
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(tokens)
+        vec = {t: c * self.idf.get(t, 0.0) for t, c in counts.items() if t in self.idf}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, Dict[str, str]]]:
+        qvec = self._vectorize(tokenize(query))
+        if not qvec:
+            return []
+        scored = []
+        for entry, vec in zip(self.entries, self._vectors):
+            score = sum(w * vec.get(t, 0.0) for t, w in qvec.items())
+            if score > 0:
+                scored.append((score, entry))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:top_k]
+
+    def match(self, query: str) -> Optional[Dict[str, Any]]:
+        ranked = self.search(query, top_k=10)
+        if not ranked or ranked[0][0] < self.threshold:
+            self.misses += 1
+            return None
+        best_score, best = ranked[0]
+        for score, entry in ranked[1:]:
+            if entry['answer'] != best['answer']:
+                if best_score - score < self.margin:
+                    self.misses += 1
+                    return None
+                break
+        self.hits += 1
+        return {**best, 'score': best_score}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': 1,
+            'built_at': datetime.now().isoformat(),
+            'entries': self.entries,
+        }
+
+    def save(self, path: str = DEFAULT_INDEX_PATH):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    @classmethod
+    def from_documents(cls, documents: List[Dict[str, Any]], **kwargs) -> 'FAQIndex':
+        return cls(build_faq_entries(documents), **kwargs)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH, **kwargs) -> 'FAQIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        return cls(payload.get('entries', []), **kwargs)
+
+
+_LOADED: Dict[str, Tuple[float, FAQIndex]] = {}
+
+
+def load_faq_index(path: str = DEFAULT_INDEX_PATH) -> Optional[FAQIndex]:
+    """Return the FAQ index at ``path``, or None if it has not been built."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _LOADED.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        index = FAQIndex.load(path)
+    except Exception:
+        return None
+    _LOADED[path] = (mtime, index)
+    return index
+
+
+def format_faq_answer(hit: Dict[str, Any]) -> str:
+    """Render a FAQ match as markdown with its citation."""
+    return (
+        f"{hit['answer']}\n\n"
+        f"*Source: {hit['title']} — {hit['section']}*"
+    )
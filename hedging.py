@@ -0,0 +1,291 @@
+"""Hedged streaming completions: race a slow primary model against a fallback.
+
+GPT-5 sometimes takes a long time to produce its first token, or finishes
+with no answer at all. ``app.py`` used to wait for it to finish and then run
+a GPT-4o call from scratch, so users paid both latencies back to back. With
+hedging the primary is streamed, and if it hasn't produced its first token
+within a deadline learned from recent latencies, the fallback model is
+started in parallel:
+
+- LatencyTracker: recent first-token latencies per model; the deadline is a
+  quantile (``HEDGE_QUANTILE``, default 0.9) of them
+- hedged_stream_completion: the deadline only applies until the primary's
+  first token (a primary streaming ``<thinking>`` is healthy, not slow). The
+  first attempt to produce answer text (outside ``<thinking>``, see
+  response_contract.py) or to finish a set of tool calls wins and the other
+  stream is closed; if the primary ends with neither the fallback starts at
+  once. Every attempt (including the cancelled one, which is still billed)
+  is returned in ``attempts``
+- hedge_stats: hedge rate, fallback wins and latency saved (estimated when
+  the slow primary is cancelled before it finishes)
+
+Streams are read on worker threads and the text is handed back through a
+queue, so ``on_text`` (which touches ``st.*``) only ever runs on the calling
+thread. ``HEDGE_REQUESTS=0`` turns hedging off.
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Callable, List
+
+from chat_stream import StreamedCompletion, ToolCallAccumulator
+from response_contract import split_response
+
+
+def hedging_enabled() -> bool:
+    return os.getenv('HEDGE_REQUESTS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+class LatencyTracker:
+    """Sliding window of first-token latencies per model."""
+
+    def __init__(self, window: int = 100, quantile: Optional[float] = None,
+                 default_deadline: Optional[float] = None, min_samples: int = 5,
+                 floor: float = 1.0, ceiling: float = 30.0):
+        self.quantile = float(quantile if quantile is not None else os.getenv('HEDGE_QUANTILE', '0.9'))
+        self.default_deadline = float(default_deadline if default_deadline is not None
+                                      else os.getenv('HEDGE_DEFAULT_DEADLINE', '8'))
+        self.min_samples = min_samples
+        self.floor = floor
+        self.ceiling = ceiling
+        self._window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def deadline(self, model: str) -> float:
+        """Seconds to wait for the primary's first token before hedging."""
+        with self._lock:
+            count = len(self._samples.get(model, ()))
+        if count < self.min_samples:
+            return self.default_deadline
+        return min(self.ceiling, max(self.floor, self.percentile(model, self.quantile)))
+
+
+class HedgeStats:
+    """Hedge rate and latency saved (thread-safe)."""
+
+    def __init__(self):
+        self.counts = {'requests': 0, 'hedged': 0, 'fallback_wins': 0, 'no_answer': 0, 'saved_seconds': 0.0}
+        self._first_answer: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    def record(self, hedged: bool, fallback_won: bool, answered: bool, first_answer: Optional[float],
+               saved: float = 0.0):
+        with self._lock:
+            self.counts['requests'] += 1
+            self.counts['hedged'] += int(hedged)
+            self.counts['fallback_wins'] += int(fallback_won)
+            self.counts['no_answer'] += int(not answered)
+            self.counts['saved_seconds'] += saved
+            if first_answer is not None:
+                self._first_answer.append(first_answer)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.counts)
+            latencies = sorted(self._first_answer)
+        metrics['hedge_rate'] = metrics['hedged'] / metrics['requests'] if metrics['requests'] else 0.0
+        metrics['p95_first_answer'] = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None
+        return metrics
+
+
+class _Attempt:
+    def __init__(self, index: int, model: str, started: float):
+        self.index = index
+        self.model = model
+        self.started = started
+        self.parts: List[str] = []
+        self.tool_calls = ToolCallAccumulator()
+        self.usage = None
+        self.finish_reason: Optional[str] = None
+        self.first_token: Optional[float] = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.ended: Optional[float] = None
+        self.cancel = threading.Event()
+
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    def record(self) -> Dict[str, Any]:
+        """The attempt for the turn ledger (times are ``perf_counter`` values)."""
+        return {'model': self.model, 'start': self.started, 'end': self.ended, 'usage': self.usage,
+                'first_token_seconds': self.first_token, 'cancelled': self.cancel.is_set(),
+                'error': str(self.error) if self.error is not None else None}
+
+
+def _read_stream(client, params: Dict[str, Any], attempt: _Attempt, events: queue.Queue):
+    """Worker thread: push ``(kind, index, payload)`` events until done or cancelled."""
+    try:
+        stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **params)
+        try:
+            for chunk in stream:
+                if attempt.cancel.is_set():
+                    break
+                if getattr(chunk, 'usage', None) is not None:
+                    events.put(('usage', attempt.index, chunk.usage))
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    events.put(('finish', attempt.index, choice.finish_reason))
+                if getattr(choice.delta, 'tool_calls', None):
+                    events.put(('tool', attempt.index, choice.delta.tool_calls))
+                text = getattr(choice.delta, 'content', None)
+                if text:
+                    events.put(('text', attempt.index, text))
+        finally:
+            close = getattr(stream, 'close', None)
+            if attempt.cancel.is_set() and close is not None:
+                close()
+    except Exception as e:
+        events.put(('error', attempt.index, e))
+    events.put(('done', attempt.index, None))
+
+
+def hedged_stream_completion(client, params: Dict[str, Any], fallback_params: Dict[str, Any],
+                             on_text: Optional[Callable[[str], None]] = None,
+                             tracker: Optional[LatencyTracker] = None, stats: Optional[HedgeStats] = None,
+                             deadline: Optional[float] = None, min_interval: float = 0.05) -> StreamedCompletion:
+    """Stream ``params``, hedging with ``fallback_params`` after the first-token deadline.
+
+    Returns the winning attempt as a ``StreamedCompletion`` (``model`` says
+    which one won). If neither attempt produces an answer, the first one that
+    didn't fail is returned as is; if both raise, the primary's error is
+    raised.
+    """
+    tracker = tracker if tracker is not None else latency_tracker
+    stats = stats if stats is not None else hedge_stats
+    primary_model = params['model']
+    deadline = deadline if deadline is not None else tracker.deadline(primary_model)
+
+    events: queue.Queue = queue.Queue()
+    start = time.perf_counter()
+    attempts: List[_Attempt] = []
+    hedge_started: Optional[float] = None
+    hedge_reason: Optional[str] = None
+
+    def launch(attempt_params: Dict[str, Any]):
+        attempt = _Attempt(len(attempts), attempt_params['model'], time.perf_counter())
+        attempts.append(attempt)
+        threading.Thread(target=_read_stream, args=(client, attempt_params, attempt, events),
+                         name=f'hedge-{attempt.index}', daemon=True).start()
+
+    launch(params)
+    winner: Optional[_Attempt] = None
+    first_answer: Optional[float] = None
+    primary_ended_at: Optional[float] = None
+    last_render = 0.0
+
+    def win(attempt: _Attempt, now: float):
+        nonlocal winner, first_answer
+        winner = attempt
+        first_answer = now - start
+        for other in attempts:
+            if other is not attempt and not other.done:
+                other.cancel.set()
+                other.ended = now
+                if other.first_token is None:
+                    # censored sample: it was still silent when it lost
+                    tracker.record(other.model, now - other.started)
+
+    while not all(a.done for a in attempts):
+        wait = None
+        if hedge_started is None and winner is None and attempts[0].first_token is None:
+            # the deadline is a first-token quantile, so it only covers the silent phase
+            wait = max(0.0, deadline - (time.perf_counter() - start))
+        try:
+            kind, index, payload = events.get(timeout=wait)
+        except queue.Empty:
+            hedge_started, hedge_reason = time.perf_counter() - start, 'slow'
+            launch(fallback_params)
+            continue
+        attempt = attempts[index]
+        now = time.perf_counter()
+
+        if kind in ('text', 'tool') and attempt.first_token is None:
+            attempt.first_token = now - attempt.started
+            tracker.record(attempt.model, attempt.first_token)
+
+        if kind == 'tool':
+            attempt.tool_calls.add(payload)
+        elif kind == 'text':
+            attempt.parts.append(payload)
+            if winner is None and split_response(attempt.text())[1]:
+                win(attempt, now)
+            if attempt is winner and on_text is not None and now - last_render >= min_interval:
+                on_text(attempt.text())
+                last_render = now
+        elif kind == 'usage':
+            attempt.usage = payload
+        elif kind == 'finish':
+            attempt.finish_reason = payload
+        elif kind == 'error':
+            attempt.error = payload
+        elif kind == 'done':
+            attempt.done = True
+            if attempt.ended is None:
+                attempt.ended = now
+            if winner is None and attempt.error is None and attempt.tool_calls.calls():
+                win(attempt, now)
+            if attempt.index == 0 and winner is None:
+                primary_ended_at = now - start
+            if winner is None and hedge_started is None:
+                # primary ended without an answer: don't wait out the deadline
+                hedge_started = now - start
+                hedge_reason = 'error' if attempt.error is not None else 'empty'
+                launch(fallback_params)
+        if winner is not None and winner.done:
+            break
+
+    if winner is None and all(a.error is not None for a in attempts):
+        raise attempts[0].error
+    result_attempt = winner or next(a for a in attempts if a.error is None)
+
+    end = time.perf_counter()
+    for attempt in attempts:
+        if attempt.ended is None:
+            attempt.ended = end
+    fallback_won = winner is not None and winner.index > 0
+    saved = 0.0
+    if fallback_won and primary_ended_at is not None:
+        # without hedging the fallback would only have started once the primary ended empty
+        saved = max(0.0, primary_ended_at - hedge_started)
+    elif fallback_won:
+        # the primary was cancelled still unanswered: it would have answered no earlier than
+        # now (censored lower bound), and typically not before its usual first-token latency
+        primary = attempts[0]
+        expected = max(end - primary.started, tracker.percentile(primary.model, tracker.quantile) or 0.0)
+        saved = max(0.0, primary.started - start + expected - first_answer)
+    stats.record(hedged=len(attempts) > 1, fallback_won=fallback_won, answered=winner is not None,
+                 first_answer=first_answer, saved=saved)
+
+    result = StreamedCompletion(content=result_attempt.text(), usage=result_attempt.usage,
+                                finish_reason=result_attempt.finish_reason,
+                                first_token_seconds=result_attempt.first_token,
+                                total_seconds=end - start,
+                                model=result_attempt.model, hedged=len(attempts) > 1,
+                                hedge_reason=hedge_reason, tool_calls=result_attempt.tool_calls.calls(),
+                                attempts=[a.record() for a in attempts])
+    if on_text is not None and result.content:
+        on_text(result.content)
+    return result
+
+
+latency_tracker = LatencyTracker()
+hedge_stats = HedgeStats()
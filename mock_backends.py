@@ -0,0 +1,182 @@
+"""Configurable mock search backends for demo mode.
+
+``get_mock_web_search`` / ``get_mock_document_search`` (app.py) and the week3
+``mock_*_search`` functions return three short hand-written results
+instantly, so demo mode shows nothing about parallel tool calls, caching or
+timeouts. A ``MockBackend`` wraps those functions with the behaviour of a
+real backend:
+
+- latency drawn from a ``fake_cse.LatencyModel`` spec (``fixed``,
+  ``uniform``, ``normal``, ``lognormal``, heavy-tailed ``pareto``)
+- payload size: number of results and words per result, drawn from the same
+  kind of spec (generated results replace the hand-written ones)
+- error and timeout rates: a failed call raises ``MockBackendError``, a
+  timed-out one hangs for ``timeout`` seconds and raises ``TimeoutError``
+- a seed, so a benchmark sees the same latencies and failures every run
+
+Generated text depends only on the query and rank, so repeated queries get
+the same payload (as a cache would see it). Settings come from
+``MOCK_WEB_*`` / ``MOCK_DOCS_*`` environment variables, falling back to
+``MOCK_SEARCH_*``: ``LATENCY``, ``RESULTS``, ``WORDS``, ``ERROR_RATE``,
+``TIMEOUT_RATE``, ``TIMEOUT`` and ``SEED``. With none set the mocks behave
+as before.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+from fake_cse import LatencyModel
+
+_WORDS = (
+    'analysis', 'policy', 'report', 'update', 'guide', 'overview', 'data', 'review', 'process',
+    'team', 'benefit', 'schedule', 'budget', 'customer', 'market', 'research', 'results', 'plan',
+    'quarter', 'summary', 'request', 'support', 'approval', 'project', 'release', 'training',
+)
+
+
+class MockBackendError(RuntimeError):
+    """Injected backend failure."""
+
+
+def _env(kind: str, name: str, default: Optional[str] = None) -> Optional[str]:
+    prefix = 'MOCK_WEB_' if kind == 'web' else 'MOCK_DOCS_'
+    return os.getenv(prefix + name) or os.getenv('MOCK_SEARCH_' + name) or default
+
+
+class MockBackend:
+    """Latency, payload size and failures of one simulated search backend."""
+
+    def __init__(self, kind: str, latency: str = 'fixed:0', results: Optional[str] = None,
+                 words: str = 'lognormal:60:0.5', error_rate: float = 0.0, timeout_rate: float = 0.0,
+                 timeout: float = 30.0, seed: Optional[int] = None):
+        self.kind = kind
+        self.latency = LatencyModel(latency, seed=seed)
+        # LatencyModel's distributions double as size distributions (values are counts)
+        self.results = LatencyModel(results).spec if results else None
+        self.words = LatencyModel(words).spec
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'errors': 0, 'timeouts': 0, 'latency_seconds': 0.0}
+
+    @classmethod
+    def from_env(cls, kind: str) -> 'MockBackend':
+        seed = _env(kind, 'SEED')
+        return cls(kind, latency=_env(kind, 'LATENCY', 'fixed:0'), results=_env(kind, 'RESULTS'),
+                   words=_env(kind, 'WORDS', 'lognormal:60:0.5'),
+                   error_rate=float(_env(kind, 'ERROR_RATE', '0')),
+                   timeout_rate=float(_env(kind, 'TIMEOUT_RATE', '0')),
+                   timeout=float(_env(kind, 'TIMEOUT', '30')),
+                   seed=int(seed) if seed else None)
+
+    @property
+    def simulated(self) -> bool:
+        """True if anything differs from the old instant, fixed mocks."""
+        return (self.latency.spec != 'fixed:0' or self.results is not None
+                or self.error_rate > 0 or self.timeout_rate > 0)
+
+    def _draw(self) -> Tuple[float, Optional[str]]:
+        """Delay in seconds and the injected failure (``'error'``, ``'timeout'`` or None)."""
+        delay = self.latency.sample()
+        with self._lock:
+            roll = self._rng.random()
+            failure = None
+            if roll < self.timeout_rate:
+                failure, delay = 'timeout', self.timeout
+            elif roll < self.timeout_rate + self.error_rate:
+                failure = 'error'
+            self.stats['calls'] += 1
+            self.stats['latency_seconds'] += delay
+            if failure:
+                self.stats['errors' if failure == 'error' else 'timeouts'] += 1
+        return delay, failure
+
+    def _raise(self, failure: Optional[str]):
+        if failure == 'timeout':
+            raise TimeoutError(f"Mock {self.kind} search timed out after {self.timeout:.0f}s")
+        if failure == 'error':
+            raise MockBackendError(f"Mock {self.kind} search failed (injected error)")
+
+    def _sample(self, spec: str, key: str) -> float:
+        """Value of ``spec`` drawn for ``key`` only (not from the shared stream)."""
+        return LatencyModel(spec, seed=f'{self.seed}:{self.kind}:{key}').sample_ms()
+
+    def items(self, query: str, max_results: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Generated results for ``query``, or None when payload size isn't configured."""
+        if self.results is None:
+            return None
+        count = max(1, int(round(self._sample(self.results, query))))
+        if max_results:
+            count = min(count, max_results)
+        slug = hashlib.md5(query.encode('utf-8')).hexdigest()[:8]
+        items = []
+        for rank in range(1, count + 1):
+            rng = random.Random(f'{self.seed}:{self.kind}:{query}:{rank}')
+            n_words = max(5, int(self._sample(self.words, f'{query}:{rank}')))
+            text = ' '.join([query] + [rng.choice(_WORDS) for _ in range(n_words - 1)])
+            if self.kind == 'web':
+                items.append({'title': f'{query} - result {rank}', 'snippet': text,
+                              'link': f'https://example.com/{slug}/{rank}'})
+            else:
+                items.append({'title': f'Document {rank}: {query}', 'content': text,
+                              'score': round(0.95 - 0.04 * rank + rng.uniform(-0.01, 0.01), 3)})
+        return items
+
+    def _result(self, query: str, build: Callable[[str], Dict[str, Any]], max_results: Optional[int]):
+        result = build(query)
+        items = self.items(query, max_results)
+        if items is not None:
+            result = {**result, 'items': items}
+        return result
+
+    def search(self, query: str, build: Callable[[str], Dict[str, Any]],
+               max_results: Optional[int] = None) -> Dict[str, Any]:
+        """Call the backend: wait, maybe fail, return ``build(query)`` (resized if configured)."""
+        delay, failure = self._draw()
+        time.sleep(delay)
+        self._raise(failure)
+        return self._result(query, build, max_results)
+
+    async def asearch(self, query: str, build: Callable[[str], Dict[str, Any]],
+                      max_results: Optional[int] = None) -> Dict[str, Any]:
+        """``search`` for the async executors (waits without blocking the loop)."""
+        delay, failure = self._draw()
+        await asyncio.sleep(delay)
+        self._raise(failure)
+        return self._result(query, build, max_results)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.stats)
+        metrics['mean_latency'] = metrics['latency_seconds'] / metrics['calls'] if metrics['calls'] else 0.0
+        return metrics
+
+
+_backends: Dict[str, MockBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_mock_backend(kind: str) -> MockBackend:
+    """Process-wide mock backend for ``kind`` (``'web'`` or ``'docs'``), configured from the environment."""
+    backend = _backends.get(kind)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(kind)
+            if backend is None:
+                backend = _backends[kind] = MockBackend.from_env(kind)
+    return backend
+
+
+def reset_mock_backends():
+    """Drop the backends so the next call re-reads the environment (tests, config changes)."""
+    with _backends_lock:
+        _backends.clear()
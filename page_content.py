@@ -0,0 +1,237 @@
+"""Fetch and extract the main text of top web results.
+
+CSE results only carry a ``snippet``, which often stops short of the actual
+answer and forces another model turn. This optional stage fetches the top N
+result pages concurrently and attaches their main-content text:
+
+- MainTextParser: streaming ``html.parser`` that keeps paragraph-level text and
+  skips scripts, navigation, headers, footers and forms
+- get_page_session: session used for page fetches only, separate from the CSE
+  session (no retries, its own connection pools and pool metrics)
+- fetch_page_text: download one page (byte cap + overall deadline), parse it
+  chunk by chunk and cache the extracted text by URL
+- enrich_with_page_text: fetch the top N results concurrently and add a
+  ``content`` field to each
+
+Configuration: ``WEB_FETCH_TOP_N`` (0 disables the stage), ``WEB_FETCH_MAX_BYTES``,
+``WEB_FETCH_TIMEOUT``, ``WEB_FETCH_MAX_CHARS``, ``WEB_FETCH_CACHE_TTL`` and
+``WEB_FETCH_POOL_CONNECTIONS``.
+"""
+from __future__ import annotations
+
+import codecs
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from typing import Optional, Dict, Any, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_SKIP_TAGS = {'title', 'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer',
+              'aside', 'form', 'button', 'select', 'iframe'}
+_BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'br', 'tr', 'table',
+               'blockquote', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'dt', 'figcaption'}
+_VOID_TAGS = {'br', 'img', 'hr', 'meta', 'link', 'input', 'source', 'wbr', 'area', 'base', 'col'}
+_MIN_BLOCK_CHARS = 40  # shorter blocks are usually menus, buttons or bylines
+
+
+class MainTextParser(HTMLParser):
+    """Incremental HTML-to-text parser that keeps main-content blocks.
+
+    Feed it chunks as they arrive; ``text()`` returns the blocks found so far.
+    When the page has ``<main>`` or ``<article>`` elements only their content
+    is kept, otherwise every substantive block outside skipped elements is.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.blocks: List[str] = []
+        self.main_blocks: List[str] = []
+        self._current: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _VOID_TAGS:
+            if tag == 'br':
+                self._flush()
+            return
+        if tag in _SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in ('main', 'article'):
+            self._flush()
+            self.main_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in ('main', 'article'):
+            self._flush()
+            self.main_depth = max(0, self.main_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self._current.append(data)
+
+    def _flush(self):
+        block = re.sub(r'\s+', ' ', ''.join(self._current)).strip()
+        self._current = []
+        if self.skip_depth or len(block) < _MIN_BLOCK_CHARS:
+            return
+        self.blocks.append(block)
+        if self.main_depth:
+            self.main_blocks.append(block)
+
+    def text(self) -> str:
+        self._flush()
+        return '\n\n'.join(self.main_blocks or self.blocks)
+
+
+def extract_main_text(html: str) -> str:
+    """Extract main-content text from a complete HTML document."""
+    parser = MainTextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+class PageTextCache:
+    """Small LRU + TTL cache of extracted page text keyed by URL."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: int = 256):
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None else os.getenv('WEB_FETCH_CACHE_TTL', '3600'))
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[str]:
+        with self._lock:
+            item = self.entries.get(url)
+            if item and time.time() - item['ts'] <= self.ttl_seconds:
+                self.entries.move_to_end(url)
+                self.hits += 1
+                return item['value']
+            if item:
+                del self.entries[url]
+            self.misses += 1
+            return None
+
+    def set(self, url: str, text: str):
+        with self._lock:
+            self.entries[url] = {'ts': time.time(), 'value': text}
+            self.entries.move_to_end(url)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+page_cache = PageTextCache()
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_page_session() -> requests.Session:
+    """Process-wide session for page fetches.
+
+    Pages live on arbitrary third-party hosts, so they don't share the CSE
+    session: no retries or ``Retry-After`` waits (a failed page keeps its
+    snippet), and their host pools can't evict the googleapis connection or
+    show up in ``web_search.get_pool_metrics``.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                adapter = HTTPAdapter(pool_connections=int(os.getenv('WEB_FETCH_POOL_CONNECTIONS', '10')),
+                                      pool_maxsize=4, max_retries=0)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'User-Agent': 'yes-dear-agent/1.0'})
+                _session = session
+    return _session
+
+
+def reset_page_session():
+    """Close and drop the page session (tests, config changes)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def fetch_page_text(url: str, max_bytes: Optional[int] = None, timeout: Optional[float] = None,
+                    max_chars: Optional[int] = None) -> str:
+    """Download ``url`` and return its main-content text ('' if unavailable).
+
+    The body is streamed: at most ``max_bytes`` are read, the whole fetch is
+    abandoned after ``timeout`` seconds, and each chunk is decoded and parsed
+    as it arrives. Non-HTML responses are skipped. Results (including empty
+    ones) are cached by URL so repeated searches don't refetch pages.
+    """
+    cached = page_cache.get(url)
+    if cached is not None:
+        return cached
+
+    max_bytes = max_bytes or int(os.getenv('WEB_FETCH_MAX_BYTES', '500000'))
+    timeout = timeout or float(os.getenv('WEB_FETCH_TIMEOUT', '5'))
+    max_chars = max_chars or int(os.getenv('WEB_FETCH_MAX_CHARS', '2000'))
+
+    text = ''
+    deadline = time.monotonic() + timeout
+    try:
+        with get_page_session().get(url, stream=True, timeout=timeout) as response:
+            content_type = response.headers.get('Content-Type', '')
+            if response.ok and ('html' in content_type or not content_type):
+                decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+                parser = MainTextParser()
+                received = 0
+                for chunk in response.iter_content(chunk_size=16384):
+                    received += len(chunk)
+                    parser.feed(decoder.decode(chunk[:max(0, max_bytes - received + len(chunk))]))
+                    if received >= max_bytes or time.monotonic() > deadline:
+                        break
+                text = parser.text()[:max_chars]
+    except Exception:
+        # unreachable pages just keep their snippet; don't cache transient failures
+        return ''
+
+    page_cache.set(url, text)
+    return text
+
+
+def enrich_with_page_text(results: List[Dict[str, str]], top_n: Optional[int] = None,
+                          timeout: Optional[float] = None) -> List[Dict[str, str]]:
+    """Return copies of ``results`` with ``content`` added for the top N links.
+
+    Pages are fetched concurrently; any page not finished within ``timeout``
+    (plus a small grace period) is left without content.
+    """
+    top_n = int(os.getenv('WEB_FETCH_TOP_N', '0')) if top_n is None else top_n
+    enriched = [dict(result) for result in results]
+    targets = [r for r in enriched[:top_n] if r.get('link', '').startswith(('http://', 'https://'))]
+    if not targets:
+        return enriched
+
+    timeout = timeout or float(os.getenv('WEB_FETCH_TIMEOUT', '5'))
+    pool = ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix='page-fetch')
+    futures = {pool.submit(fetch_page_text, r['link'], timeout=timeout): r for r in targets}
+    done, _ = wait(futures, timeout=timeout + 1)
+    pool.shutdown(wait=False)
+    for future in done:
+        text = future.result()
+        if text:
+            futures[future]['content'] = text
+    return enriched
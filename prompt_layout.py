@@ -0,0 +1,157 @@
+"""Prefix-stable layout of the chat completion requests in ``app.py``.
+
+OpenAI caches prompts by their exact prefix: tool definitions, then the
+messages in order. ``app.py`` used to switch between two system prompts
+depending on which search tools were ticked, added the tool schemas in
+selection order (and dropped them for the forced final answer), and sent
+fallback calls a prompt of their own, so consecutive requests rarely shared
+a cacheable prefix. Requests are now laid out as:
+
+1. ``TOOL_DEFINITIONS``: both search tools, always, in a fixed order
+2. ``SYSTEM_PROMPT``: one system prompt for every request
+3. the conversation summary and history (conversation_window.py), which only
+   grow at the end
+4. ``turn_note``: the volatile part (which tools this turn may use), last
+
+The per-turn tool selection is applied through the note and ``tool_choice``
+instead of the tool list. Calls to a tool that isn't enabled get a
+``disabled_tool_result`` rather than a search. ``PromptCacheStats`` adds up
+``prompt_tokens_details.cached_tokens`` so the hit rate can be checked.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Optional, Dict, Any, List, Iterable
+
+from response_contract import RESPONSE_CONTRACT
+from tool_results import document_tool_result, web_tool_result
+
+TOOL_DEFINITIONS: List[Dict[str, Any]] = [
+    {
+        "type": "function",
+        "function": {
+            "name": "search_documents",
+            "description": "Search through the private document collection to find relevant information",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The search query to find relevant documents"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "search_web",
+            "description": "Search the internet for current information",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The search query to find information on the web"
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "Number of results to return (default 5, up to 30 for deep research)"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+]
+TOOL_NAMES = [tool["function"]["name"] for tool in TOOL_DEFINITIONS]
+
+# Kept as short physical lines to satisfy linters
+SYSTEM_PROMPT = (
+    "You are a helpful research assistant with access to search tools. Which tools you may use "
+    "is stated in the last system message of the conversation.\n\n"
+    "WHEN SEARCH TOOLS ARE ENABLED you MUST use them before answering:\n"
+    "- For questions about company policies, procedures, documentation: USE search_documents FIRST\n"
+    "- For current events, recent information, general web queries: USE search_web FIRST\n"
+    "- When user explicitly asks to \"search documents\" or \"find in documents\": use search_documents\n"
+    "- When user explicitly asks to \"search web\" or \"look online\": use search_web\n"
+    "- Never answer from general knowledge when a relevant tool is enabled; search first, then "
+    "respond based on findings and cite your sources.\n\n"
+    "WHEN NO SEARCH TOOLS ARE ENABLED answer directly from your knowledge with comprehensive, "
+    "well-structured responses, and acknowledge uncertainty when you're not sure.\n\n"
+    "TOOL RESULTS: one record per line, \"W1 title | text | url\" (web) or \"D1 title (score) | text\" "
+    "(documents); \"note:\" lines flag mock or failed searches.\n\n"
+    "OUTPUT: Clear, well-formatted answers using markdown.\n\n"
+    + RESPONSE_CONTRACT
+)
+
+
+def system_message() -> Dict[str, Any]:
+    return {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def turn_note(enabled_tools: Iterable[str]) -> Dict[str, Any]:
+    """The volatile tail of the prompt: which tools this turn may use."""
+    enabled = [name for name in TOOL_NAMES if name in set(enabled_tools)]
+    if not enabled:
+        content = "No search tools are enabled for this turn. Answer directly."
+    else:
+        content = f"Search tools enabled for this turn: {', '.join(enabled)}. Do not call any other tool."
+    return {"role": "system", "content": content}
+
+
+def request_params(model: str, messages: List[Any], enabled_tools: Iterable[str],
+                   allow_tools: bool = True, max_completion_tokens: int = 1500) -> Dict[str, Any]:
+    """Chat completion parameters with the fixed tool list.
+
+    ``allow_tools=False`` (forced answer, fallbacks) and an empty selection
+    set ``tool_choice="none"`` instead of removing the tools from the prefix.
+    """
+    params = {
+        "model": model,
+        "messages": messages,
+        "max_completion_tokens": max_completion_tokens,
+        "tools": TOOL_DEFINITIONS,
+    }
+    # Only add temperature for models that support it (not GPT-5)
+    if model != "gpt-5":
+        params["temperature"] = 0.7
+    if not allow_tools or not list(enabled_tools):
+        params["tool_choice"] = "none"
+    return params
+
+
+def disabled_tool_result(name: str, args: Dict[str, Any]):
+    """Result for a call to a tool the user didn't enable this turn."""
+    make_result = document_tool_result if name == "search_documents" else web_tool_result
+    return make_result((args or {}).get("query", ""), [], note=f"⚠️ {name} is disabled for this turn; not searched.")
+
+
+class PromptCacheStats:
+    """Prompt tokens served from the provider's prompt cache, per model (thread-safe)."""
+
+    def __init__(self):
+        self.models: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tokens_by_model: Dict[str, Dict[str, int]]):
+        """Add a turn's ``TurnLedger.totals()['tokens_by_model']``."""
+        with self._lock:
+            for model, tokens in tokens_by_model.items():
+                if 'cached_tokens' not in tokens:
+                    continue  # embeddings and calls without usage details
+                totals = self.models.setdefault(model, {'prompt_tokens': 0, 'cached_tokens': 0})
+                totals['prompt_tokens'] += tokens.get('prompt_tokens', 0)
+                totals['cached_tokens'] += tokens.get('cached_tokens', 0)
+
+    def get_metrics(self, model: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            models = [self.models[model]] if model in self.models else ([] if model else list(self.models.values()))
+            prompt = sum(m['prompt_tokens'] for m in models)
+            cached = sum(m['cached_tokens'] for m in models)
+        return {'prompt_tokens': prompt, 'cached_tokens': cached, 'hit_rate': cached / prompt if prompt else 0.0}
+
+
+prompt_cache_stats = PromptCacheStats()
@@ -0,0 +1,123 @@
+"""Process-wide resources shared across Streamlit reruns.
+
+Streamlit reruns the whole script on every interaction, and each rerun of
+``app.py`` used to read ``assets/css/app_styles.css`` and
+``assets/templates/header.html`` from disk, read a template file on every
+``_load_template`` call and build a new ``OpenAI`` client (with its own
+connection pool, so no keep-alive reuse between turns). This module holds
+them once per process:
+
+- read_asset / load_template: file contents cached by path and invalidated
+  when the file's mtime or size changes, so edits still show up
+- get_openai_client: one client per API key and base URL
+- RerunTimer: per-phase timing of a rerun (``mark`` closes the phase that
+  ran since the previous mark); the last reruns are kept in
+  ``rerun_history`` so the sidebar can show whether overhead shrinks
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Tuple
+
+from openai import OpenAI
+
+ASSET_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+_assets: Dict[str, Tuple[Tuple[int, int], str]] = {}
+_clients: Dict[Tuple[Optional[str], Optional[str]], OpenAI] = {}
+_lock = threading.Lock()
+asset_stats = {'hits': 0, 'loads': 0, 'missing': 0}
+
+
+def read_asset(*parts: str) -> Optional[str]:
+    """Text of ``assets/<parts>``, re-read only when the file changes; None if missing."""
+    path = os.path.join(ASSET_ROOT, *parts)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        asset_stats['missing'] += 1
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _assets.get(path)
+    if cached is not None and cached[0] == version:
+        asset_stats['hits'] += 1
+        return cached[1]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        asset_stats['missing'] += 1
+        return None
+    with _lock:
+        _assets[path] = (version, text)
+    asset_stats['loads'] += 1
+    return text
+
+
+def load_template(name: str, /, **kwargs) -> str:
+    """``assets/templates/<name>`` formatted with ``kwargs``; '' if missing or malformed."""
+    content = read_asset("templates", name)
+    if not content:
+        return ""
+    if not kwargs:
+        return content
+    try:
+        return content.format(**kwargs)
+    except (KeyError, IndexError, ValueError):
+        return ""
+
+
+def get_openai_client(api_key: Optional[str] = None) -> OpenAI:
+    """The shared OpenAI client for ``api_key`` (default ``OPENAI_API_KEY``).
+
+    ``OPENAI_BASE_URL`` (e.g. fake_openai.py) is part of the key, so changing
+    it gets a new client.
+    """
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    key = (api_key, os.environ.get("OPENAI_BASE_URL"))
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = OpenAI(api_key=api_key, base_url=key[1] or None)
+    return client
+
+
+rerun_history: deque = deque(maxlen=50)
+
+
+class RerunTimer:
+    """Wall time of the named phases of one script rerun."""
+
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        """Attribute the time since the previous mark (or the start) to ``name``."""
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def finish(self) -> Dict[str, Any]:
+        """Record this rerun in ``rerun_history`` and return it."""
+        record = {'total': time.perf_counter() - self.start, 'phases': dict(self.phases)}
+        rerun_history.append(record)
+        return record
+
+
+def rerun_summary() -> Dict[str, Any]:
+    """Average phase times over the recorded reruns."""
+    history = list(rerun_history)
+    if not history:
+        return {'reruns': 0, 'avg_total': 0.0, 'avg_phases': {}}
+    phases: Dict[str, float] = {}
+    for record in history:
+        for name, seconds in record['phases'].items():
+            phases[name] = phases.get(name, 0.0) + seconds
+    return {'reruns': len(history), 'avg_total': sum(r['total'] for r in history) / len(history),
+            'avg_phases': {name: total / len(history) for name, total in phases.items()}}
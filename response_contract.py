@@ -0,0 +1,76 @@
+"""Response contract separating model reasoning from the final answer.
+
+``app.py`` used to guess whether a reply was "thinking" by scanning it for
+phrases like "let me" or "i'll" (or a length over 800 characters), and on a
+match paid for a whole second GPT-4o completion to "generate a proper
+response". Plain answers that happened to say "let me explain" doubled
+latency and cost.
+
+The system prompts now ask the model to put any reasoning inside
+``<thinking>...</thinking>`` before the answer, so one call carries both
+channels:
+
+- split_response: ``(reasoning, answer)`` from a complete or partial reply
+  (an unclosed ``<thinking>`` while streaming counts as reasoning)
+- ContractStats: how many replies followed the contract and how often the
+  regeneration fallback still fired (answer empty after splitting)
+
+Tags were chosen over JSON mode because the answer is markdown streamed
+straight into the UI; a tag can be split off a partial stream.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from typing import Dict, Tuple
+
+RESPONSE_CONTRACT = (
+    "RESPONSE FORMAT: If you want to plan or reason before answering, put it inside "
+    "<thinking>...</thinking> at the start of your reply. Everything after it is shown to the "
+    "user as the final answer, so never leave the answer out."
+)
+
+_THINKING = re.compile(r'<thinking>(.*?)(?:</thinking>|$)', re.DOTALL | re.IGNORECASE)
+
+
+def split_response(text: str) -> Tuple[str, str]:
+    """Split a reply into ``(reasoning, answer)``; both stripped, either may be ''."""
+    if not text:
+        return '', ''
+    reasoning = [m.group(1).strip() for m in _THINKING.finditer(text)]
+    answer = _THINKING.sub('', text)
+    # a stream can stop partway through an opening tag ("<thin")
+    tail = answer.rfind('<')
+    if tail != -1 and '<thinking>'.startswith(answer[tail:].lower()):
+        answer = answer[:tail]
+    return '\n\n'.join(r for r in reasoning if r), answer.strip()
+
+
+class ContractStats:
+    """Counts of contract use and fallback regenerations (thread-safe)."""
+
+    def __init__(self):
+        self.counts = {'responses': 0, 'with_reasoning': 0, 'fallbacks': 0}
+        self._lock = threading.Lock()
+
+    def record(self, reasoning: str, answer: str):
+        """Record one reply; returns True if it carried no answer."""
+        with self._lock:
+            self.counts['responses'] += 1
+            if reasoning:
+                self.counts['with_reasoning'] += 1
+        return not answer
+
+    def record_fallback(self):
+        """Count a regeneration actually made for a reply without an answer."""
+        with self._lock:
+            self.counts['fallbacks'] += 1
+
+    def get_metrics(self) -> Dict[str, float]:
+        with self._lock:
+            counts = dict(self.counts)
+        counts['fallback_rate'] = counts['fallbacks'] / counts['responses'] if counts['responses'] else 0.0
+        return counts
+
+
+contract_stats = ContractStats()
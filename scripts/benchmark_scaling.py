@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+📈 Retrieval Scaling Benchmark
+==============================
+Expands the seeded documents into synthetic corpora of increasing size and
+measures ingestion time, index memory and query latency (plus recall@k
+against the generated labels) for each size, producing scaling curves.
+
+Backends:
+    local     In-process BM25 index (no network, no API keys)
+    pinecone  OpenAI embeddings + Pinecone, through scripts/seed_data.py
+
+Usage:
+    python scripts/benchmark_scaling.py --sizes 10000,100000,1000000
+    python scripts/benchmark_scaling.py --backend pinecone --sizes 10000 --index-name synthetic-docs
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_corpus import (  # noqa: E402
+    InMemoryIndex,
+    SyntheticCorpus,
+    generate_queries,
+    load_seed_templates,
+)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def run_local(corpus, queries, top_k, batch_size):
+    """Ingest into the in-memory BM25 index and time queries"""
+    index = InMemoryIndex()
+    start = time.perf_counter()
+    for batch in corpus.batches(batch_size):
+        index.add(batch)
+    ingest_seconds = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for q in queries:
+        t0 = time.perf_counter()
+        results = index.search(q["query"], top_k=top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += q["doc_id"] in [doc_id for doc_id, _ in results]
+
+    return {
+        "ingest_seconds": ingest_seconds,
+        "index_memory_mb": index.memory_bytes() / (1024 * 1024),
+        "latencies_ms": latencies,
+        "hits": hits,
+    }
+
+
+def run_pinecone(corpus, queries, top_k, batch_size, index_name):
+    """Ingest through the Pinecone seeding pipeline and time real queries"""
+    sys.path.insert(0, os.path.join(ROOT, "scripts"))
+    from seed_data import seed_pinecone
+    from openai import OpenAI
+    from pinecone import Pinecone
+
+    start = time.perf_counter()
+    if not seed_pinecone(documents=corpus, index_name=index_name, batch_size=batch_size):
+        raise RuntimeError("Pinecone seeding failed")
+    ingest_seconds = time.perf_counter() - start
+
+    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name)
+
+    latencies, hits = [], 0
+    for q in queries:
+        t0 = time.perf_counter()
+        emb = openai_client.embeddings.create(input=q["query"], model="text-embedding-ada-002")
+        res = index.query(vector=emb.data[0].embedding, top_k=top_k, include_metadata=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += q["doc_id"] in [m.id for m in res.matches]
+
+    stats = index.describe_index_stats()
+    fullness = getattr(stats, "index_fullness", None)
+    return {
+        "ingest_seconds": ingest_seconds,
+        "index_memory_mb": None,
+        "index_fullness": fullness,
+        "latencies_ms": latencies,
+        "hits": hits,
+    }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Synthetic corpus scaling benchmark")
+    parser.add_argument("--sizes", default="10000,50000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument("--backend", choices=["local", "pinecone"], default="local")
+    parser.add_argument("--queries", type=int, default=200, help="Labeled queries per size")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--index-name", default="synthetic-docs", help="Pinecone index (pinecone backend)")
+    parser.add_argument("--output", default="scaling_results.json")
+    args = parser.parse_args()
+
+    templates = load_seed_templates()
+    if not templates:
+        print("❌ No seed templates found (scripts/seed_data.py, week3 seed scripts)")
+        sys.exit(1)
+
+    sizes = [int(s.replace("_", "")) for s in args.sizes.split(",") if s.strip()]
+    print(f"📈 {args.backend} backend, {len(templates)} templates, sizes: {sizes}\n")
+    print(f"{'docs':>10} {'ingest s':>10} {'docs/s':>10} {'mem MB':>10} {'p50 ms':>9} {'p95 ms':>9} {'recall':>7}")
+
+    rows = []
+    for size in sizes:
+        corpus = SyntheticCorpus(templates, size, seed=args.seed)
+        queries = generate_queries(corpus, args.queries, seed=args.seed)
+        if args.backend == "local":
+            res = run_local(corpus, queries, args.top_k, args.batch_size)
+        else:
+            res = run_pinecone(corpus, queries, args.top_k, args.batch_size, args.index_name)
+
+        lat = res.pop("latencies_ms")
+        row = {
+            "backend": args.backend,
+            "documents": size,
+            "ingest_seconds": round(res["ingest_seconds"], 3),
+            "docs_per_second": round(size / res["ingest_seconds"], 1) if res["ingest_seconds"] else None,
+            "index_memory_mb": round(res["index_memory_mb"], 2) if res["index_memory_mb"] is not None else None,
+            "query_p50_ms": round(statistics.median(lat), 3) if lat else None,
+            "query_p95_ms": round(percentile(lat, 95), 3),
+            "query_mean_ms": round(statistics.mean(lat), 3) if lat else None,
+            f"recall_at_{args.top_k}": round(res["hits"] / len(queries), 3) if queries else None,
+        }
+        if "index_fullness" in res:
+            row["index_fullness"] = res["index_fullness"]
+        rows.append(row)
+
+        mem = f"{row['index_memory_mb']:.1f}" if row["index_memory_mb"] is not None else "n/a"
+        print(
+            f"{size:>10,} {row['ingest_seconds']:>10.2f} {row['docs_per_second'] or 0:>10,.0f} {mem:>10} "
+            f"{row['query_p50_ms'] or 0:>9.2f} {row['query_p95_ms']:>9.2f} {row[f'recall_at_{args.top_k}']:>7.2f}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump({"seed": args.seed, "templates": len(templates), "results": rows}, f, indent=2)
+    print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nBenchmark cancelled by user")
+        sys.exit(1)
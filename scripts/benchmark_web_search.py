@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+🔎 Web Search Load Benchmark
+============================
+Drives the web search path (pooled session, result cache, quota scheduler,
+pagination and retries) with concurrent queries and reports latency
+percentiles, pool reuse, retries, cache hit rate and quota use.
+
+By default an in-process fake CSE server (fake_cse.py) is started, so no
+network access or CSE quota is used (quota is simulated with --daily-quota
+in a throwaway ledger). Pass --url to target a running fake
+server, or --real to spend real quota.
+
+Usage:
+    python scripts/benchmark_web_search.py --requests 500 --concurrency 16
+    python scripts/benchmark_web_search.py --latency lognormal:150:0.6 --rate-limit-rate 0.05 --num 25
+    python scripts/benchmark_web_search.py --url http://127.0.0.1:8765/customsearch/v1 --no-cache
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+import web_search  # noqa: E402
+from cse_scheduler import get_cse_scheduler, reset_cse_scheduler  # noqa: E402
+from fake_cse import FakeCSEServer  # noqa: E402
+from benchmark_scaling import percentile  # noqa: E402
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Web search load benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--distinct-queries", type=int, default=50, help="Size of the query pool (repeats hit the cache)")
+    parser.add_argument("--num", type=int, default=5, help="Results per search (>10 paginates)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    parser.add_argument("--latency", default="lognormal:120:0.4", help="Fake server latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--daily-quota", type=int, default=1_000_000, help="CSE quota simulated for fake servers")
+    parser.add_argument("--url", help="Use an already running CSE-compatible server")
+    parser.add_argument("--real", action="store_true", help="Use the real Google API (spends quota)")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        os.environ["GOOGLE_CSE_URL"] = args.url
+    elif not args.real:
+        server = FakeCSEServer(latency=args.latency, error_rate=args.error_rate,
+                               rate_limit_rate=args.rate_limit_rate, retry_after=0, seed=args.seed).start()
+        os.environ["GOOGLE_CSE_URL"] = server.url
+    if not args.real:
+        os.environ.setdefault("GOOGLE_API_KEY", "fake")
+        os.environ.setdefault("GOOGLE_CSE_ID", "fake")
+        # keep fake traffic out of the shared real-quota ledger
+        os.environ["CSE_QUOTA_PATH"] = os.path.join(tempfile.mkdtemp(), "fake_quota.sqlite3")
+        os.environ["CSE_DAILY_QUOTA"] = str(args.daily_quota)
+    web_search.reset_http_session()
+    web_search.reset_web_cache()
+    reset_cse_scheduler()
+
+    rng = random.Random(args.seed)
+    pool = [f"benchmark query {i}" for i in range(args.distinct_queries)]
+    queries = [rng.choice(pool) for _ in range(args.requests)]
+
+    def one(query):
+        t0 = time.perf_counter()
+        try:
+            web_search.fetch_web_results(query, num=args.num, use_cache=not args.no_cache)
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - t0) * 1000, ok
+
+    print(f"🔎 {args.requests} searches, concurrency {args.concurrency}, target {web_search.get_cse_url()}\n")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(one, queries))
+    elapsed = time.perf_counter() - start
+
+    latencies = [ms for ms, _ in outcomes]
+    failures = sum(1 for _, ok in outcomes if not ok)
+    pool_metrics = web_search.get_pool_metrics()
+    cache_metrics = web_search.get_web_cache().get_metrics()
+
+    print(f"Throughput:        {args.requests / elapsed:,.1f} searches/s ({elapsed:.2f}s total)")
+    print(f"Latency p50/p95:   {statistics.median(latencies):.1f} / {percentile(latencies, 95):.1f} ms")
+    print(f"Failures:          {failures}")
+    print(f"HTTP requests:     {pool_metrics['requests']} ({pool_metrics['retries']} retries)")
+    print(f"Connections:       {pool_metrics['connections_opened']} opened, {pool_metrics['reuse_ratio']:.0%} reuse")
+    print(f"Cache hit rate:    {cache_metrics['hit_rate']:.0%}")
+    if not args.no_cache:
+        sched = get_cse_scheduler().get_metrics()
+        print(f"Scheduler:         {sched['live']} live, {sched['merged']} merged, {sched['cache']} cached, "
+              f"{sched['stale']} stale, {sched['exhausted']} exhausted; quota left {sched['quota']['remaining']}")
+    if server is not None:
+        print(f"Fake server stats: {server.get_stats()}")
+        server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nBenchmark cancelled by user")
+        sys.exit(1)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+❓ Build the FAQ Answer Index
+=============================
+Generates likely question/answer pairs from the seeded document corpus and
+writes them to the FAQ index used by the assistant to answer frequent
+questions directly (no model or search round trip).
+
+The default corpus is the one seeded into the "documents" Pinecone index by
+week3/seed_and_test_pinecone.py. Run this again whenever that corpus changes.
+
+Usage:
+    python scripts/build_faq_index.py
+    python scripts/build_faq_index.py --with-company-docs --output faq_index.json
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "week3"))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+from faq_index import FAQIndex, DEFAULT_INDEX_PATH  # noqa: E402
+
+
+def load_corpus(with_company_docs=False):
+    """Collect seeded documents as a list of {id, title, content} dicts"""
+    from seed_and_test_pinecone import SAMPLE_DOCUMENTS as WEEK3_DOCUMENTS
+
+    documents = [{"id": doc_id, **doc} for doc_id, doc in WEEK3_DOCUMENTS.items()]
+
+    if with_company_docs:
+        from seed_data import SAMPLE_DOCUMENTS as COMPANY_DOCUMENTS
+        documents.extend(
+            {"id": f"doc_{i}", **doc} for i, doc in enumerate(COMPANY_DOCUMENTS, 1)
+        )
+
+    return documents
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Build the FAQ answer index")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH, help="Index file to write")
+    parser.add_argument(
+        "--with-company-docs",
+        action="store_true",
+        help="Also index scripts/seed_data.py documents (the 'company-docs' index)",
+    )
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("❓ FAQ Index Builder")
+    print("=" * 60 + "\n")
+
+    documents = load_corpus(with_company_docs=args.with_company_docs)
+    index = FAQIndex.from_documents(documents)
+    index.save(args.output)
+
+    print(f"✅ Indexed {len(index.entries)} questions from {len(documents)} documents")
+    print(f"💾 Saved to {args.output}")
+    for entry in index.entries[:5]:
+        print(f"   • {entry['question']}  →  {entry['title']} / {entry['section']}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nBuild cancelled by user")
+        sys.exit(1)
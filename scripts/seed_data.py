@@ -392,8 +392,14 @@ def check_environment():
     print_status("Environment variables configured", "success")
     return True
 
-def seed_pinecone():
-    """Seed Pinecone with sample documents"""
+def seed_pinecone(documents=None, index_name="company-docs", batch_size=1):
+    """Seed Pinecone with sample documents
+
+    ``documents`` defaults to SAMPLE_DOCUMENTS; any iterable of
+    {id?, title, content, metadata} dicts works, e.g. a
+    synthetic_corpus.SyntheticCorpus for scale testing. With ``batch_size`` > 1
+    embeddings and upserts are sent in batches instead of one per document.
+    """
     try:
         from pinecone import Pinecone, ServerlessSpec
         from openai import OpenAI
@@ -402,6 +408,9 @@ def seed_pinecone():
         print_status("Run: pip install pinecone-client openai", "info")
         return False
 
+    if documents is None:
+        documents = SAMPLE_DOCUMENTS
+
     print_status("Connecting to Pinecone...", "info")
 
     # Initialize Pinecone
@@ -410,9 +419,6 @@ def seed_pinecone():
     # Initialize OpenAI
     openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
 
-    # Define index name
-    index_name = "company-docs"
-
     # Check if index exists
     existing_indexes = [idx.name for idx in pc.list_indexes()]
 
@@ -434,49 +440,62 @@ def seed_pinecone():
     # Connect to index
     index = pc.Index(index_name)
 
-    print_status(f"Seeding {len(SAMPLE_DOCUMENTS)} documents...", "info")
+    total = len(documents) if hasattr(documents, '__len__') else None
+    print_status(f"Seeding {total if total is not None else 'streamed'} documents...", "info")
 
-    # Process and upload each document
-    for i, doc in enumerate(SAMPLE_DOCUMENTS, 1):
-        print_status(f"Processing document {i}/{len(SAMPLE_DOCUMENTS)}: {doc['title']}", "info")
+    # Process and upload documents in batches
+    batch = []
+    for i, doc in enumerate(documents, 1):
+        batch.append((doc.get('id', f"doc_{i}"), doc))
+        if len(batch) >= batch_size:
+            _upload_batch(openai_client, index, batch, i, total)
+            batch = []
+    if batch:
+        _upload_batch(openai_client, index, batch, i, total)
 
-        # Create embedding
-        try:
-            response = openai_client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=doc['content']
-            )
-            embedding = response.data[0].embedding
+    # Get index stats
+    stats = index.describe_index_stats()
+    print_status(f"\nSeeding complete! Total vectors: {stats.total_vector_count}", "success")
 
+    return True
+
+def _upload_batch(openai_client, index, batch, position, total):
+    """Embed and upsert one batch of (id, document) pairs"""
+    if len(batch) == 1:
+        print_status(f"Processing document {position}/{total}: {batch[0][1]['title']}", "info")
+    else:
+        print_status(f"Processing documents {position - len(batch) + 1}-{position}/{total}", "info")
+
+    try:
+        response = openai_client.embeddings.create(
+            model="text-embedding-ada-002",
+            input=[doc['content'] for _, doc in batch]
+        )
+
+        vectors = []
+        for (doc_id, doc), item in zip(batch, response.data):
             # Prepare metadata
             metadata = {
                 "title": doc['title'],
                 "content": doc['content'][:1000],  # Store first 1000 chars in metadata
-                **doc['metadata']
+                **doc.get('metadata', {})
             }
+            vectors.append({
+                "id": doc_id,
+                "values": item.embedding,
+                "metadata": metadata
+            })
 
-            # Upsert to Pinecone
-            index.upsert(
-                vectors=[
-                    {
-                        "id": f"doc_{i}",
-                        "values": embedding,
-                        "metadata": metadata
-                    }
-                ]
-            )
-
-            print_status(f"✓ Uploaded: {doc['title']}", "success")
-
-        except Exception as e:
-            print_status(f"Failed to process {doc['title']}: {e}", "error")
-            continue
+        # Upsert to Pinecone
+        index.upsert(vectors=vectors)
 
-    # Get index stats
-    stats = index.describe_index_stats()
-    print_status(f"\nSeeding complete! Total vectors: {stats.total_vector_count}", "success")
+        if len(batch) == 1:
+            print_status(f"✓ Uploaded: {batch[0][1]['title']}", "success")
+        else:
+            print_status(f"✓ Uploaded {len(batch)} documents", "success")
 
-    return True
+    except Exception as e:
+        print_status(f"Failed to process batch ending at {position}: {e}", "error")
 
 def main():
     """Main function"""
@@ -0,0 +1,276 @@
+"""Synthetic corpus and labeled query generator for scale benchmarking.
+
+The hand-written corpora (``SAMPLE_DOCUMENTS`` in scripts/seed_data.py and
+week3/seed_and_test_pinecone.py, ``VACATION_DOC`` in week3/quick_seed.py) are
+far too small to show scaling problems in retrieval, caching or
+summarization. This module expands them deterministically into corpora of any
+size (10k - 10M documents) with labeled queries:
+
+- load_seed_templates: collect the hand-written documents as templates
+- SyntheticCorpus: lazy, random-access corpus; document ``i`` is always the same
+  for a given seed, so nothing has to be materialized up front
+- generate_queries: labeled queries (query text -> relevant document id)
+- InMemoryIndex: BM25 inverted index used as the local retrieval backend for
+  scaling curves without network access
+
+Documents use the same shape as the seeding scripts (``id``, ``title``,
+``content``, ``metadata``), so they can be passed straight to
+``scripts/seed_data.py``'s ``seed_pinecone(documents=...)``. See
+``scripts/benchmark_scaling.py`` for the benchmark driver.
+"""
+from __future__ import annotations
+
+import math
+import os
+import random
+import re
+import sys
+from array import array
+from collections import Counter
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from faq_index import build_faq_entries, tokenize
+
+_SYLLABLES = [
+    'ac', 'bel', 'cor', 'dan', 'el', 'fen', 'gal', 'hal', 'ix', 'jor', 'kel', 'lum', 'mar', 'nor',
+    'oct', 'pra', 'quin', 'ros', 'sol', 'tor', 'ul', 'ven', 'wes', 'xan', 'yor', 'zen', 'bra',
+    'cal', 'dru', 'tev',
+]
+_COMPANY_SUFFIXES = ['Labs', 'Systems', 'Group', 'Holdings', 'Works', 'Partners', 'Industries',
+                     'Networks', 'Dynamics', 'Logistics']
+_REGIONS = ['North America', 'EMEA', 'APAC', 'LATAM', 'Nordics', 'DACH', 'ANZ', 'India']
+_DEPARTMENTS = ['Human Resources', 'Engineering', 'Finance', 'Sales', 'Operations', 'Legal',
+                'Customer Success', 'Marketing']
+_TEMPLATE_COMPANY_RE = re.compile(r'\bACME(?: Corporation| Corp\.?)?', re.IGNORECASE)
+# numbers to perturb; clock times ("10 AM") and ordinals ("31st") are left alone
+_NUMBER_RE = re.compile(r'(?<![\w.:])(\d+(?:\.\d+)?)(?![\w.:])(?!\s*[AP]M\b)')
+
+
+def load_seed_templates() -> List[Dict[str, Any]]:
+    """Collect the repository's hand-written documents as generator templates.
+
+    Sources that cannot be imported (e.g. the OpenAI package is not installed
+    for the week3 scripts) are skipped.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    for sub in ('scripts', 'week3'):
+        path = os.path.join(root, sub)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    templates: List[Dict[str, Any]] = []
+    try:
+        from seed_data import SAMPLE_DOCUMENTS as company_docs  # type: ignore
+        for i, doc in enumerate(company_docs, 1):
+            templates.append({'id': f'company_doc_{i}', **doc})
+    except Exception:
+        pass
+    try:
+        from seed_and_test_pinecone import SAMPLE_DOCUMENTS as week3_docs  # type: ignore
+        for doc_id, doc in week3_docs.items():
+            templates.append({'id': doc_id, **doc})
+    except Exception:
+        pass
+    try:
+        from quick_seed import VACATION_DOC  # type: ignore
+        templates.append({'id': 'quick_seed_vacation', 'title': 'Vacation Policy 2024', 'content': VACATION_DOC})
+    except Exception:
+        pass
+    return templates
+
+
+class SyntheticCorpus:
+    """Deterministic, lazily generated corpus of ``size`` documents.
+
+    Document ``i`` is derived from template ``i % len(templates)`` with a
+    per-document RNG seeded from ``(seed, i)``: the company name, region,
+    department, numbers and years are varied, sections are lightly shuffled,
+    and a unique reference line is added.
+    """
+
+    def __init__(self, templates: List[Dict[str, Any]], size: int, seed: int = 0):
+        if not templates:
+            raise ValueError('SyntheticCorpus needs at least one template document')
+        self.templates = templates
+        self.size = int(size)
+        self.seed = seed
+        self._questions: Dict[int, List[Dict[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.size):
+            yield self[i]
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        if i < 0 or i >= self.size:
+            raise IndexError(i)
+        rng = self._rng(i)
+        t_idx = i % len(self.templates)
+        template = self.templates[t_idx]
+        company = self._company(rng)
+        region = rng.choice(_REGIONS)
+        department = rng.choice(_DEPARTMENTS)
+        year = 2018 + rng.randrange(9)
+
+        content = (template.get('content') or '').strip()
+        content = _TEMPLATE_COMPANY_RE.sub(company, content)
+        content = self._vary_numbers(content, rng, year)
+        content = self._shuffle_sections(content, rng)
+        content = (
+            f"{company} - {template.get('title', 'Document')}\n"
+            f"Applies to: {region} region, {department}\n"
+            f"Reference: SYN-{t_idx:03d}-{i:08d}\n\n{content}"
+        )
+        return {
+            'id': self.doc_id(i),
+            'title': f"{template.get('title', 'Document')} - {company} ({region})",
+            'content': content,
+            'metadata': {
+                **(template.get('metadata') or {}),
+                'template_id': str(template.get('id', t_idx)),
+                'company': company,
+                'region': region,
+                'department': department,
+                'synthetic': True,
+            },
+        }
+
+    @staticmethod
+    def doc_id(i: int) -> str:
+        return f'syn_{i:08d}'
+
+    def batches(self, batch_size: int = 100, start: int = 0, stop: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+        """Yield consecutive document batches (for batched embedding/upsert)."""
+        stop = self.size if stop is None else min(stop, self.size)
+        for lo in range(start, stop, batch_size):
+            yield [self[i] for i in range(lo, min(lo + batch_size, stop))]
+
+    def template_questions(self, t_idx: int) -> List[Dict[str, str]]:
+        if t_idx not in self._questions:
+            self._questions[t_idx] = build_faq_entries([self.templates[t_idx]])
+        return self._questions[t_idx]
+
+    def _rng(self, i: int) -> random.Random:
+        return random.Random(f'{self.seed}:{i}')
+
+    @staticmethod
+    def _company(rng: random.Random) -> str:
+        name = ''.join(rng.choice(_SYLLABLES) for _ in range(3)).capitalize()
+        return f'{name} {rng.choice(_COMPANY_SUFFIXES)}'
+
+    @staticmethod
+    def _vary_numbers(content: str, rng: random.Random, year: int) -> str:
+        factor = rng.uniform(0.5, 1.5)
+
+        def repl(match: re.Match) -> str:
+            raw = match.group(1)
+            value = float(raw)
+            if '.' not in raw and 1990 <= value <= 2100:
+                return str(year)
+            scaled = value * factor
+            return f'{scaled:.1f}' if '.' in raw else str(max(1, int(round(scaled))))
+
+        return _NUMBER_RE.sub(repl, content)
+
+    @staticmethod
+    def _shuffle_sections(content: str, rng: random.Random) -> str:
+        blocks = [b for b in re.split(r'\n\s*\n', content) if b.strip()]
+        if len(blocks) > 3:
+            head, body = blocks[:1], blocks[1:]
+            # swap a couple of adjacent sections rather than fully shuffling
+            for _ in range(min(2, len(body) - 1)):
+                j = rng.randrange(len(body) - 1)
+                body[j], body[j + 1] = body[j + 1], body[j]
+            blocks = head + body
+        return '\n\n'.join(blocks)
+
+
+def generate_queries(corpus: SyntheticCorpus, n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Generate ``n`` labeled queries against ``corpus``.
+
+    Each query asks one of the template's FAQ-style questions, scoped to the
+    target document's company so that exactly one document is relevant:
+    ``{"query", "doc_id", "template_id", "section"}``.
+    """
+    rng = random.Random(f'queries:{seed}')
+    queries: List[Dict[str, Any]] = []
+    for _ in range(n):
+        i = rng.randrange(len(corpus))
+        doc = corpus[i]
+        questions = corpus.template_questions(i % len(corpus.templates))
+        company = doc['metadata']['company']
+        if questions:
+            entry = rng.choice(questions)
+            text = f"{entry['question'].rstrip('?')} at {company}?"
+            section = entry['section']
+        else:
+            text = f"{corpus.templates[i % len(corpus.templates)].get('title', '')} at {company}"
+            section = ''
+        queries.append({
+            'query': text,
+            'doc_id': doc['id'],
+            'template_id': doc['metadata']['template_id'],
+            'section': section,
+        })
+    return queries
+
+
+class InMemoryIndex:
+    """BM25 inverted index used as a local retrieval backend.
+
+    Postings are stored in compact ``array`` buffers so index memory grows
+    roughly linearly with corpus size and can be measured in benchmarks.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.doc_lengths = array('I')
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, documents: List[Dict[str, Any]]):
+        for doc in documents:
+            idx = len(self.doc_ids)
+            tokens = tokenize(f"{doc.get('title', '')} {doc.get('content', '')}")
+            self.doc_ids.append(doc['id'])
+            self.doc_lengths.append(len(tokens))
+            self._total_length += len(tokens)
+            for token, tf in Counter(tokens).items():
+                plist = self.postings.get(token)
+                if plist is None:
+                    plist = self.postings[token] = (array('I'), array('H'))
+                plist[0].append(idx)
+                plist[1].append(min(tf, 65535))
+
+    def memory_bytes(self) -> int:
+        """Approximate index footprint (postings, vocabulary and doc table)."""
+        total = sys.getsizeof(self.postings) + sys.getsizeof(self.doc_ids) + sys.getsizeof(self.doc_lengths)
+        for token, (docs, tfs) in self.postings.items():
+            total += sys.getsizeof(token) + sys.getsizeof(docs) + sys.getsizeof(tfs)
+        total += sum(sys.getsizeof(doc_id) for doc_id in self.doc_ids)
+        return total
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        n = len(self.doc_ids)
+        if n == 0:
+            return []
+        avg_len = self._total_length / n
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            plist = self.postings.get(token)
+            if plist is None:
+                continue
+            docs, tfs = plist
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for idx, tf in zip(docs, tfs):
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / avg_len)
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.k1 + 1) / norm
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.doc_ids[idx], score) for idx, score in best]
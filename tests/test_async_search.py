@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+import async_search
+import web_search
+
+
+def _run_with_transport(handler, coro_factory):
+    async def main():
+        loop = asyncio.get_running_loop()
+        async_search._http_clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await coro_factory()
+        finally:
+            await async_search.close_async_clients()
+    return asyncio.run(main())
+
+
+def test_async_search_retries_429_with_retry_after(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={'Retry-After': '0'})
+        return httpx.Response(200, json={'items': [{'title': 'T', 'snippet': 'S', 'link': 'L'}]})
+
+    results = _run_with_transport(
+        handler, lambda: async_search.async_search_google_cse('q', api_key='k', cse_id='cx'))
+
+    assert results == [{'title': 'T', 'snippet': 'S', 'link': 'L'}]
+    assert len(calls) == 2
+
+
+def test_async_search_caps_retry_after(monkeypatch):
+    monkeypatch.setenv('WEB_SEARCH_MAX_RETRY_AFTER', '0.05')
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={'Retry-After': '3600'})
+        if len(calls) == 2:
+            return httpx.Response(503, headers={'Retry-After': 'Fri, 31 Dec 2100 23:59:59 GMT'})
+        return httpx.Response(200, json={'items': []})
+
+    async def search():
+        return await asyncio.wait_for(async_search.async_search_google_cse('q', api_key='k', cse_id='cx'), 2)
+
+    assert _run_with_transport(handler, search) == []
+    assert len(calls) == 3
+
+
+def test_async_pages_run_concurrently_on_one_loop():
+    in_flight = {'now': 0, 'max': 0}
+
+    async def handler(request):
+        start = int(request.url.params.get('start', '1'))
+        num = int(request.url.params['num'])
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        await asyncio.sleep(0.05)
+        in_flight['now'] -= 1
+        items = [{'title': f'R{n}', 'snippet': '', 'link': f'https://e.com/{n}'} for n in range(start, start + num)]
+        return httpx.Response(200, json={'items': items})
+
+    results = _run_with_transport(
+        handler, lambda: async_search.async_search_google_cse_pages('q', num=25, api_key='k', cse_id='cx'))
+
+    assert [r['title'] for r in results] == [f'R{n}' for n in range(1, 26)]
+    assert in_flight['max'] == 3
+
+
+def test_async_fetch_shares_sync_cache(monkeypatch):
+    monkeypatch.delenv('WEB_SEARCH_CACHE_PATH', raising=False)
+    web_search.reset_web_cache()
+    web_search.get_web_cache().set('cached query', 5, [{'title': 'C', 'snippet': '', 'link': 'x'}])
+
+    def handler(request):
+        raise AssertionError('cache hit should not reach the network')
+
+    results = _run_with_transport(handler, lambda: async_search.async_fetch_web_results('Cached  Query', num=5))
+    assert results[0]['title'] == 'C'
+    web_search.reset_web_cache()
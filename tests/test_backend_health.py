@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+import cse_scheduler
+from backend_health import BackendUnavailableError, NegativeCache, classify_error
+from cse_scheduler import CSEScheduler, QuotaExhaustedError, QuotaTracker
+from web_search import WebResultCache
+
+
+def _http_error(status, body='', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode()
+    response.headers.update(headers or {})
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+def test_classify_error_by_status_and_type():
+    assert classify_error(_http_error(401)) == 'auth'
+    assert classify_error(_http_error(400, '{"error": {"message": "API key not valid. Please pass a valid API key."}}')) == 'auth'
+    assert classify_error(_http_error(429)) == 'rate_limit'
+    assert classify_error(_http_error(403, '{"reason": "dailyLimitExceeded"}')) == 'quota'
+    assert classify_error(_http_error(503)) == 'server'
+    assert classify_error(requests.ConnectTimeout('slow')) == 'timeout'
+    assert classify_error(requests.ConnectionError('refused')) == 'connection'
+    assert classify_error(Exception("Index 'documents' not found")) == 'not_found'
+    assert classify_error(QuotaExhaustedError('gone')) == 'quota'
+
+
+def test_cooldown_skips_then_allows_a_single_probe(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('backend_health.time.time', lambda: clock[0])
+    cache = NegativeCache(cooldowns={'auth': 60})
+    cache.record_failure('pinecone', _http_error(401))
+
+    assert cache.check('pinecone')['error_class'] == 'auth'
+    clock[0] += 61
+    assert cache.check('pinecone') is None          # this caller probes
+    assert cache.check('pinecone') is not None      # others wait for the probe
+    cache.record_success('pinecone')
+    assert cache.check('pinecone') is None
+    assert cache.get_status() == {}
+
+
+def test_rate_limit_cooldown_uses_retry_after():
+    cache = NegativeCache()
+    entry = cache.record_failure('google_cse', _http_error(429, headers={'Retry-After': '5'}))
+    assert 4 < cache.get_status()['google_cse']['retry_in'] <= 5
+    assert entry['error_class'] == 'rate_limit'
+
+
+def test_scheduler_skips_failing_backend_without_calling_it(monkeypatch):
+    calls = []
+
+    def failing(query, num=5, api_key=None, cse_id=None):
+        calls.append(query)
+        raise _http_error(401, 'API key not valid')
+
+    negative = NegativeCache()
+    monkeypatch.setattr(cse_scheduler, 'negative_cache', negative)
+    monkeypatch.setattr(cse_scheduler, 'search_google_cse_pages', failing)
+    cache = WebResultCache(ttl_seconds=0, stale_ttl_seconds=3600)
+    cache.set('cached', 5, [{'title': 'old', 'snippet': '', 'link': 'x'}])
+    scheduler = CSEScheduler(cache=cache, quota=QuotaTracker(daily_limit=100))
+
+    with pytest.raises(requests.HTTPError):
+        scheduler.search('first')
+    with pytest.raises(BackendUnavailableError) as excinfo:
+        scheduler.search('second')
+    assert excinfo.value.error_class == 'auth'
+    assert scheduler.search('cached')[0]['title'] == 'old'   # stale entry still served
+
+    assert calls == ['first']
+    assert scheduler.quota.used() == 1
+
+
+def test_probe_slot_is_released_when_no_call_is_made(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('backend_health.time.time', lambda: clock[0])
+    negative = NegativeCache(cooldowns={'server': 60})
+    negative.record_failure('google_cse', _http_error(503))
+    monkeypatch.setattr(cse_scheduler, 'negative_cache', negative)
+    scheduler = CSEScheduler(cache=WebResultCache(), quota=QuotaTracker(daily_limit=1))
+    assert scheduler.quota.try_acquire(1)
+
+    clock[0] += 61
+    with pytest.raises(QuotaExhaustedError):
+        scheduler.search('q')                         # took the probe, then had no quota
+    assert negative.check('google_cse') is None      # the next caller may probe right away
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+import requests
+
+from cassette import Cassette, CassetteMiss, install, uninstall
+from fake_cse import FakeCSEServer
+
+
+def _fetch_all(url):
+    """One request per client stack: requests/urllib3, httpx, httpx async."""
+    session = requests.Session()
+    via_requests = session.get(url, params={'q': 'pooling', 'key': 'secret', 'cx': 'cx'}).json()
+    with httpx.Client() as client:
+        via_httpx = client.get(url, params={'q': 'caching', 'key': 'secret', 'cx': 'cx'}).json()
+
+    async def fetch():
+        async with httpx.AsyncClient() as client:
+            return (await client.get(url, params={'q': 'async', 'key': 'secret', 'cx': 'cx'})).json()
+    return via_requests, via_httpx, asyncio.run(fetch())
+
+
+def test_record_then_replay_offline_with_timing(tmp_path):
+    path = str(tmp_path / 'session.jsonl')
+    server = FakeCSEServer(latency='fixed:100').start()
+    try:
+        install(Cassette(path, mode='record'))
+        recorded = _fetch_all(server.url)
+    finally:
+        uninstall()
+        server.stop()
+    assert 'secret' not in open(path).read()
+
+    replay = install(Cassette(path, mode='replay', time_scale=1.0))
+    try:
+        start = time.perf_counter()
+        assert _fetch_all(server.url) == recorded  # server is gone
+        assert time.perf_counter() - start >= 0.25  # three recorded ~100 ms responses
+        assert replay.get_metrics()['replayed'] == 3
+
+        replay.time_scale = 0
+        start = time.perf_counter()
+        assert _fetch_all(server.url) == recorded  # repeats cycle through the recordings
+        assert time.perf_counter() - start < 0.2
+
+        with pytest.raises(CassetteMiss):
+            httpx.get('http://127.0.0.1:9/never-recorded')
+    finally:
+        uninstall()
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from chat_stream import stream_chat_completion
+
+
+def _chunk(text=None, finish=None, usage=None):
+    choices = [] if usage is not None else [
+        SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish)
+    ]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeCompletions:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.kwargs = None
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        return iter(self.chunks)
+
+
+def test_streams_text_and_reads_usage_from_final_chunk():
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3, total_tokens=15)
+    completions = FakeCompletions([
+        _chunk(''), _chunk('Hel'), _chunk('lo'), _chunk(None, finish='stop'), _chunk(usage=usage),
+    ])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    seen = []
+
+    result = stream_chat_completion(client, on_text=seen.append, min_interval=0, model='gpt-4o', messages=[])
+
+    assert completions.kwargs['stream'] is True
+    assert completions.kwargs['stream_options'] == {'include_usage': True}
+    assert result.content == 'Hello'
+    assert result.usage is usage
+    assert result.finish_reason == 'stop'
+    assert result.first_token_seconds is not None
+    assert seen[0] == 'Hel' and seen[-1] == 'Hello'
+
+
+def test_tool_calls_are_rebuilt_from_deltas():
+    def tool_chunk(index, call_id=None, name=None, arguments=None):
+        delta = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(
+            index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))])
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+    completions = FakeCompletions([
+        tool_chunk(0, 'call_a', 'search_web', '{"query": '),
+        tool_chunk(1, 'call_b', 'search_documents', '{"query": "pto"}'),
+        tool_chunk(0, arguments='"ai news"}'),
+        _chunk(None, finish='tool_calls'),
+    ])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    result = stream_chat_completion(client, model='gpt-4o', messages=[])
+
+    assert [(c.id, c.function.name, c.function.arguments) for c in result.tool_calls] == [
+        ('call_a', 'search_web', '{"query": "ai news"}'),
+        ('call_b', 'search_documents', '{"query": "pto"}'),
+    ]
+    message = result.assistant_message()
+    assert message['content'] is None and message['tool_calls'][0]['function']['name'] == 'search_web'
@@ -0,0 +1,43 @@
+from context_packer import count_tokens, pack_results
+from tool_results import document_tool_result, web_tool_result
+
+
+def _web(n):
+    return web_tool_result('ai agents', [
+        {'title': f'Result {i}', 'snippet': 'word ' * 60, 'link': f'https://example.com/{i}'} for i in range(1, n + 1)
+    ])
+
+
+def _docs(n):
+    return document_tool_result('pto policy', [
+        {'title': f'Doc {i}', 'content': 'policy ' * 60, 'score': 0.9 - i / 100} for i in range(1, n + 1)
+    ])
+
+
+def test_everything_fits_under_a_large_budget():
+    packed = pack_results([_web(3), _docs(2)], budget=10_000)
+    assert packed.dropped_items == 0 and packed.dropped_tokens == 0
+    assert packed.texts[0].startswith('web "ai agents" 3') and 'W3 Result 3' in packed.texts[0]
+    assert packed.kept_tokens >= count_tokens(packed.text)  # overhead is reserved up front
+
+
+def test_budget_is_respected_with_per_source_quotas():
+    results = [_web(10), _docs(10)]
+    packed = pack_results(results, budget=600)
+    assert count_tokens(packed.text) <= 600
+    assert packed.dropped_items > 0 and packed.dropped_tokens > 0
+    # both sources keep their best results, with original IDs
+    assert 'W1 Result 1' in packed.texts[0] and 'D1 Doc 1' in packed.texts[1]
+    assert 'omitted for length' in packed.texts[0]
+    web, docs = packed.per_source['web'], packed.per_source['docs']
+    assert web['kept_items'] > 0 and docs['kept_items'] > 0
+
+
+def test_unused_quota_goes_to_other_sources_and_strings_pass_through():
+    packed = pack_results([_web(10), document_tool_result('q', []), 'plain text result'], budget=800,
+                          quotas={'web': 0.5, 'docs': 0.5})
+    assert packed.texts[2] == 'plain text result'
+    assert packed.texts[1].startswith('docs "q" 0')
+    # the empty docs source leaves its half to web
+    assert packed.per_source['web']['kept_items'] >= 5
+    assert count_tokens(packed.text) <= 800
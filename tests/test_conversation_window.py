@@ -0,0 +1,62 @@
+import threading
+
+from conversation_window import ConversationWindow
+
+SYSTEM = {'role': 'system', 'content': 'sys'}
+
+
+def _history(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({'role': 'user', 'content': f'q{i}'})
+        messages.append({'role': 'assistant', 'content': f'a{i}'})
+    return messages
+
+
+def test_short_history_is_sent_verbatim_without_errors():
+    window = ConversationWindow(lambda previous, messages: 'unused', keep_turns=3)
+    messages = _history(2) + [{'role': 'assistant', 'content': '❌ Error: boom'}, {'role': 'user', 'content': 'q2'}]
+    assert not window.schedule_compaction(messages)
+    built = window.build_messages(SYSTEM, messages)
+    assert built[0] is SYSTEM
+    assert [m['content'] for m in built[1:]] == ['q0', 'a0', 'q1', 'a1', 'q2']
+
+
+def test_old_turns_fold_into_summary_incrementally():
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append((previous, [m['content'] for m in messages]))
+        return (previous + ' ' if previous else '') + '+'.join(m['content'] for m in messages)
+
+    window = ConversationWindow(summarize, keep_turns=2, batch_turns=1)
+    messages = _history(4)
+    assert window.schedule_compaction(messages)
+    window.wait(timeout=5)
+    built = window.build_messages(SYSTEM, messages)
+    assert built[1]['content'].endswith('q0+a0+q1+a1')
+    assert [m['content'] for m in built[2:]] == ['q2', 'a2', 'q3', 'a3']
+
+    messages += _history(6)[8:] + [{'role': 'user', 'content': 'q6'}]  # q4, a4, q5, a5, q6
+    assert window.schedule_compaction(messages)
+    window.wait(timeout=5)
+    # only the newly evicted turns are sent, with the previous summary
+    assert calls[1] == ('q0+a0+q1+a1', ['q2', 'a2', 'q3', 'a3', 'q4', 'a4'])
+    assert [m['content'] for m in window.build_messages(SYSTEM, messages)[2:]] == ['q5', 'a5', 'q6']
+
+
+def test_turns_stay_verbatim_until_the_background_summary_lands():
+    release = threading.Event()
+
+    def summarize(previous, messages):
+        release.wait(5)
+        return 'summary'
+
+    window = ConversationWindow(summarize, keep_turns=1, batch_turns=0)
+    messages = _history(3)
+    assert window.schedule_compaction(messages)
+    assert len(window.build_messages(SYSTEM, messages)) == 1 + len(messages)
+    assert not window.schedule_compaction(messages)  # one at a time
+    release.set()
+    window.wait(timeout=5)
+    assert [m['content'] for m in window.build_messages(SYSTEM, messages)] == ['sys', 'Summary of the earlier conversation:\nsummary', 'q2', 'a2']
@@ -0,0 +1,76 @@
+import threading
+import time
+
+import pytest
+
+import cse_scheduler
+from cse_scheduler import CSEScheduler, QuotaExhaustedError, QuotaTracker
+from web_search import WebResultCache
+
+
+def _fake_pages(calls, delay=0.0):
+    def fetch(query, num=5, api_key=None, cse_id=None):
+        calls.append((query, num))
+        time.sleep(delay)
+        return [{'title': f'{query} {n}', 'snippet': '', 'link': f'https://e.com/{n}'} for n in range(1, num + 1)]
+    return fetch
+
+
+def test_quota_is_shared_through_the_state_file(tmp_path):
+    path = str(tmp_path / 'quota.sqlite3')
+    a, b = QuotaTracker(daily_limit=3, path=path), QuotaTracker(daily_limit=3, path=path)
+
+    assert a.try_acquire(2)
+    assert not b.try_acquire(2)
+    assert b.try_acquire(1)
+    assert a.remaining() == 0
+
+
+def test_only_cache_misses_spend_quota_and_inflight_queries_merge(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cse_scheduler, 'search_google_cse_pages', _fake_pages(calls, delay=0.2))
+    quota = QuotaTracker(daily_limit=10)
+    scheduler = CSEScheduler(cache=WebResultCache(), quota=quota)
+
+    threads = [threading.Thread(target=scheduler.search, args=('agents',)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    scheduler.search('Agents')
+
+    assert calls == [('agents', 5)]
+    assert quota.used() == 1
+    assert scheduler.stats['merged'] == 4 and scheduler.stats['cache'] == 1
+
+
+def test_degrades_to_single_page_then_stale_then_error(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cse_scheduler, 'search_google_cse_pages', _fake_pages(calls))
+    cache = WebResultCache(ttl_seconds=60, stale_ttl_seconds=3600)
+    scheduler = CSEScheduler(cache=cache, quota=QuotaTracker(daily_limit=4), reserve_fraction=0.5)
+
+    assert len(scheduler.search('deep', num=30)) == 30    # 3 pages, 1 unit left (below reserve)
+    assert len(scheduler.search('wide', num=30)) == 10    # reduced to one page
+    assert calls[-1] == ('wide', 10)
+
+    cache.memory[cache.get_cache_key('deep', 30)]['ts'] -= 120   # expired but within stale window
+    assert len(scheduler.search('deep', num=30)) == 30
+    assert scheduler.stats['stale'] == 1
+
+    with pytest.raises(QuotaExhaustedError):
+        scheduler.search('never seen', num=5)
+
+
+def test_prefetch_only_when_cached_or_above_reserve():
+    cache = WebResultCache(ttl_seconds=60)
+    quota = QuotaTracker(daily_limit=10)
+    scheduler = CSEScheduler(cache=cache, quota=quota, reserve_fraction=0.2)
+
+    assert scheduler.can_prefetch('pto policy')
+    assert quota.try_acquire(8)
+    assert not scheduler.can_prefetch('pto policy')
+
+    cache.set('pto policy', 5, [{'title': 't', 'snippet': '', 'link': 'l'}])
+    assert scheduler.can_prefetch('PTO policy')
+    assert cache.get_metrics()['memory_hits'] == 0
@@ -0,0 +1,34 @@
+import requests
+
+import web_search
+from fake_cse import FakeCSEServer, LatencyModel
+
+
+def test_latency_model_is_seeded():
+    a = [LatencyModel('lognormal:100:0.5', seed=7).sample_ms() for _ in range(3)]
+    b = [LatencyModel('lognormal:100:0.5', seed=7).sample_ms() for _ in range(3)]
+    assert a == b
+    assert LatencyModel('fixed:25').sample() == 0.025
+
+
+def test_web_search_targets_fake_server_via_base_url(monkeypatch):
+    server = FakeCSEServer(rate_limit_rate=0.5, retry_after=0, seed=3).start()
+    try:
+        monkeypatch.setenv('GOOGLE_CSE_URL', server.url)
+        monkeypatch.setenv('WEB_SEARCH_BACKOFF', '0')
+        monkeypatch.setenv('WEB_SEARCH_MAX_RETRIES', '10')
+        web_search.reset_http_session()
+
+        results = web_search.search_google_cse_pages('pooling', num=15, api_key='k', cse_id='cx')
+
+        assert [r['link'].rsplit('/', 1)[1] for r in results] == [str(n) for n in range(1, 16)]
+        stats = server.get_stats()
+        assert stats['ok'] == 2 and stats['rate_limited'] > 0
+        assert web_search.get_pool_metrics()['retries'] == stats['rate_limited']
+
+        missing_key = requests.get(server.url, params={'q': 'x'})
+        assert missing_key.status_code == 400
+        assert missing_key.json()['error']['errors'][0]['reason'] == 'badRequest'
+    finally:
+        server.stop()
+        web_search.reset_http_session()
@@ -0,0 +1,63 @@
+import time
+
+import openai
+import pytest
+from openai import OpenAI
+
+import resources
+from chat_stream import stream_chat_completion
+from fake_openai import FakeOpenAIServer
+from prompt_layout import TOOL_DEFINITIONS
+
+SCRIPT = [{'match': 'pto', 'tool_calls': [{'name': 'search_documents', 'arguments': {'query': '{user} handbook'}}]},
+          {'match': 'hello', 'content': 'Hi there!'}]
+
+
+@pytest.fixture
+def server():
+    server = FakeOpenAIServer(token_rate='fixed:200', answer_tokens='fixed:20', script=SCRIPT).start()
+    yield server
+    server.stop()
+
+
+def test_chat_tool_calls_and_streamed_answer(server, monkeypatch):
+    monkeypatch.setenv('OPENAI_BASE_URL', server.url)
+    client = resources.get_openai_client('fake')
+    assert client.base_url.host == '127.0.0.1'
+
+    messages = [{'role': 'system', 'content': 'You are helpful. ' * 400}, {'role': 'user', 'content': 'pto policy'}]
+    first = client.chat.completions.create(model='gpt-4o', messages=messages, tools=TOOL_DEFINITIONS)
+    call = first.choices[0].message.tool_calls[0]
+    assert call.function.name == 'search_documents' and 'pto policy handbook' in call.function.arguments
+
+    messages += [first.choices[0].message.model_dump(exclude_none=True),
+                 {'role': 'tool', 'tool_call_id': call.id, 'content': 'D1 PTO | 20 days'}]
+    start = time.perf_counter()
+    streamed = stream_chat_completion(client, model='gpt-4o', messages=messages, tools=TOOL_DEFINITIONS)
+    assert streamed.content.startswith('Mock answer to "pto policy" based on 1 search results')
+    assert streamed.usage.completion_tokens > 20 and streamed.finish_reason == 'stop'
+    assert time.perf_counter() - start >= 20 / 200  # token rate is honoured
+    # same system prompt and tools as the first call: reported as cached
+    assert streamed.usage.prompt_tokens_details.cached_tokens >= 1024
+
+    scripted = client.chat.completions.create(model='gpt-4o', messages=[{'role': 'user', 'content': 'hello'}])
+    assert scripted.choices[0].message.content == 'Hi there!'
+
+
+def test_embeddings_moderations_and_429s():
+    server = FakeOpenAIServer(rate_limit_rate=1.0, retry_after=0, flag_pattern='attack').start()
+    try:
+        client = OpenAI(api_key='fake', base_url=server.url, max_retries=0)
+        with pytest.raises(openai.RateLimitError):
+            client.embeddings.create(input='x', model='text-embedding-ada-002')
+        server.rate_limit_rate = 0.0
+
+        emb = client.embeddings.create(input=['a', 'b'], model='text-embedding-ada-002')
+        assert len(emb.data) == 2 and len(emb.data[0].embedding) == 1536
+        assert emb.data[0].embedding == client.embeddings.create(input='a', model='x').data[0].embedding
+
+        mod = client.moderations.create(model='omni-moderation-latest', input='plan the attack')
+        assert mod.results[0].flagged and mod.results[0].categories.violence
+        assert server.get_stats()['rate_limited'] == 1
+    finally:
+        server.stop()
@@ -0,0 +1,73 @@
+from faq_index import FAQIndex, build_faq_entries, format_faq_answer, load_faq_index
+
+
+CORPUS = [
+    {
+        "id": "vacation_policy_2024",
+        "title": "Vacation Policy 2024",
+        "content": """ACME Corporation - Vacation and Time Off Policy 2024
+
+VACATION ACCRUAL:
+All full-time employees accrue 2.5 vacation days per month, totaling 30 days annually.
+
+CARRYOVER POLICY:
+- Up to 5 unused vacation days can be carried over to the next calendar year
+- Excess days are forfeited (use-it-or-lose-it policy)
+""",
+    },
+    {
+        "id": "hr_faqs_vacation",
+        "title": "HR FAQs - Vacation and Time Off",
+        "content": """Frequently Asked Questions: Vacation and Time Off
+
+Q: How do I check my vacation balance?
+A: Log into the HR portal and click "My Time Off" in the dashboard.
+""",
+    },
+]
+
+
+def test_build_entries_from_sections_and_explicit_qa():
+    entries = build_faq_entries(CORPUS)
+    questions = [e['question'] for e in entries]
+
+    assert 'How many vacation days do I get?' in questions
+    assert 'How do I check my vacation balance?' in questions
+
+    accrual = next(e for e in entries if e['question'] == 'How many vacation days do I get?')
+    assert accrual['title'] == 'Vacation Policy 2024'
+    assert accrual['section'] == 'Vacation Accrual'
+    assert '30 days annually' in accrual['answer']
+
+
+def test_match_answers_frequent_question_with_citation():
+    index = FAQIndex.from_documents(CORPUS)
+
+    hit = index.match('how many vacation days do i get')
+    assert hit is not None
+    assert hit['score'] >= index.threshold
+
+    answer = format_faq_answer(hit)
+    assert '2.5 vacation days per month' in answer
+    assert 'Source: Vacation Policy 2024 — Vacation Accrual' in answer
+
+
+def test_match_rejects_unrelated_and_ambiguous_queries():
+    index = FAQIndex.from_documents(CORPUS)
+
+    assert index.match('latest news on AI agents') is None
+    # "vacation days" alone is equally close to the accrual and carryover answers
+    assert index.match('vacation days') is None
+    assert index.misses == 2
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    path = tmp_path / 'faq_index.json'
+    FAQIndex.from_documents(CORPUS).save(str(path))
+
+    loaded = load_faq_index(str(path))
+    assert loaded is not None
+    assert loaded.match('How do I check my vacation balance?') is not None
+    # same object while the file is unchanged
+    assert load_faq_index(str(path)) is loaded
+    assert load_faq_index(str(tmp_path / 'missing.json')) is None
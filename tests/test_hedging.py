@@ -0,0 +1,104 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from hedging import HedgeStats, LatencyTracker, hedged_stream_completion
+
+
+def _chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=None)],
+                           usage=None)
+
+
+class ScriptedCompletions:
+    """Per-model (first-token delay, chunks) scripts; records closed streams."""
+
+    def __init__(self, scripts):
+        self.scripts = scripts
+        self.closed = []
+
+    def create(self, model, **kwargs):
+        delay, chunks = self.scripts[model]
+        if isinstance(chunks, Exception):
+            time.sleep(delay)
+            raise chunks
+        completions = self
+
+        class Stream:
+            def __iter__(self):
+                time.sleep(delay)
+                for text in chunks:
+                    yield _chunk(text)
+                    time.sleep(0.01)
+
+            def close(self):
+                completions.closed.append(model)
+
+        return Stream()
+
+
+def _client(scripts):
+    return SimpleNamespace(chat=SimpleNamespace(completions=ScriptedCompletions(scripts)))
+
+
+def test_fast_primary_is_not_hedged():
+    client = _client({'gpt-5': (0.0, ['Hi', ' there']), 'gpt-4o': (0.0, ['fallback'])})
+    stats = HedgeStats()
+    result = hedged_stream_completion(client, {'model': 'gpt-5'}, {'model': 'gpt-4o'},
+                                      tracker=LatencyTracker(), stats=stats, deadline=0.5)
+    assert result.content == 'Hi there' and result.model == 'gpt-5' and not result.hedged
+    assert stats.get_metrics()['hedged'] == 0
+
+
+def test_slow_primary_is_hedged_and_loses():
+    client = _client({'gpt-5': (1.0, ['late']), 'gpt-4o': (0.05, ['quick ', 'answer'])})
+    stats = HedgeStats()
+    start = time.perf_counter()
+    result = hedged_stream_completion(client, {'model': 'gpt-5'}, {'model': 'gpt-4o'},
+                                      tracker=LatencyTracker(), stats=stats, deadline=0.1)
+    assert time.perf_counter() - start < 0.6
+    assert result.content == 'quick answer' and result.model == 'gpt-4o' and result.hedged
+    metrics = stats.get_metrics()
+    assert metrics['hedged'] == 1 and metrics['fallback_wins'] == 1
+    # the primary was cancelled unanswered, so the saving is estimated, not zero
+    assert metrics['saved_seconds'] > 0
+    assert result.hedge_reason == 'slow'
+    primary, fallback = result.attempts
+    assert primary['model'] == 'gpt-5' and primary['cancelled'] and primary['end'] > primary['start']
+    assert fallback['model'] == 'gpt-4o' and not fallback['cancelled']
+    time.sleep(1.0)
+    assert 'gpt-5' in client.chat.completions.closed
+
+
+def test_primary_streaming_reasoning_past_the_deadline_is_not_hedged():
+    thinking = ['<thinking>'] + ['step '] * 30 + ['</thinking>', 'answer']
+    client = _client({'gpt-5': (0.0, thinking), 'gpt-4o': (0.0, ['fallback'])})
+    stats = HedgeStats()
+    result = hedged_stream_completion(client, {'model': 'gpt-5'}, {'model': 'gpt-4o'},
+                                      tracker=LatencyTracker(), stats=stats, deadline=0.1)
+    assert result.model == 'gpt-5' and not result.hedged and len(result.attempts) == 1
+    assert stats.get_metrics()['hedged'] == 0
+
+
+def test_empty_primary_starts_fallback_immediately():
+    client = _client({'gpt-5': (0.0, ['<thinking>hmm</thinking>']), 'gpt-4o': (0.0, ['answer'])})
+    result = hedged_stream_completion(client, {'model': 'gpt-5'}, {'model': 'gpt-4o'},
+                                      tracker=LatencyTracker(), stats=HedgeStats(), deadline=5)
+    assert result.content == 'answer' and result.model == 'gpt-4o'
+    assert result.hedge_reason == 'empty' and len(result.attempts) == 2
+
+
+def test_both_failing_raises_primary_error():
+    client = _client({'gpt-5': (0.0, ValueError('primary down')), 'gpt-4o': (0.0, ValueError('fallback down'))})
+    with pytest.raises(ValueError, match='primary down'):
+        hedged_stream_completion(client, {'model': 'gpt-5'}, {'model': 'gpt-4o'},
+                                 tracker=LatencyTracker(), stats=HedgeStats(), deadline=5)
+
+
+def test_deadline_learns_from_observed_latencies():
+    tracker = LatencyTracker(quantile=0.9, default_deadline=8, min_samples=5, floor=0.5)
+    assert tracker.deadline('gpt-5') == 8
+    for seconds in [1, 1, 2, 2, 3, 3, 3, 4, 4, 6]:
+        tracker.record('gpt-5', seconds)
+    assert tracker.deadline('gpt-5') == 6
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+from fake_cse import LatencyModel
+from mock_backends import MockBackend, MockBackendError, get_mock_backend, reset_mock_backends
+from tool_results import document_tool_result, web_tool_result
+
+
+def _web(query):
+    return web_tool_result(query, [{'title': 'Fixed', 'snippet': 'hand-written'}], note='mock')
+
+
+def test_unconfigured_backend_behaves_like_the_old_mock(monkeypatch):
+    for name in ('LATENCY', 'RESULTS', 'ERROR_RATE', 'TIMEOUT_RATE'):
+        monkeypatch.delenv('MOCK_SEARCH_' + name, raising=False)
+        monkeypatch.delenv('MOCK_WEB_' + name, raising=False)
+    reset_mock_backends()
+    backend = get_mock_backend('web')
+    assert not backend.simulated
+    assert backend.search('pto', _web) == _web('pto')
+
+
+def test_payload_is_sized_and_stable_per_query():
+    backend = MockBackend('docs', results='fixed:12', words='fixed:200', seed=4)
+    build = lambda q: document_tool_result(q, [], note='mock')
+    result = backend.search('pto policy', build)
+    assert len(result['items']) == 12 and result['note'] == 'mock'
+    assert len(result['items'][0]['content'].split()) == 201  # two query words + 199 filler
+    assert backend.search('pto policy', build) == result
+    assert len(MockBackend('web', results='fixed:12').search('x', _web, max_results=5)['items']) == 5
+
+
+def test_seeded_latency_and_failures_are_reproducible():
+    def outcomes(seed):
+        backend = MockBackend('web', latency='pareto:1:1.5', error_rate=0.3, timeout_rate=0.1, timeout=0, seed=seed)
+        seen = []
+        for _ in range(30):
+            try:
+                backend.search('q', _web)
+                seen.append('ok')
+            except MockBackendError:
+                seen.append('error')
+            except TimeoutError:
+                seen.append('timeout')
+        return seen, backend.get_metrics()
+
+    first, metrics = outcomes(7)
+    assert outcomes(7)[0] == first
+    assert {'ok', 'error', 'timeout'} <= set(first)
+    assert metrics['errors'] == first.count('error') and metrics['timeouts'] == first.count('timeout')
+    assert LatencyModel('pareto:50:1.5', seed=1).sample_ms() >= 50
+
+
+def test_async_search_waits_without_blocking_the_loop():
+    backend = MockBackend('web', latency='fixed:100')
+
+    async def run():
+        return await asyncio.gather(*(backend.asearch(f'q{i}', _web) for i in range(5)))
+
+    start = time.perf_counter()
+    assert len(asyncio.run(run())) == 5
+    assert time.perf_counter() - start < 0.4  # concurrent, not 5 x 100 ms
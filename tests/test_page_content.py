@@ -0,0 +1,87 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+import page_content
+import web_search
+
+ARTICLE = (
+    '<html><head><title>Vacation rules</title><script>var x = "ignore me please, this is code";</script></head>'
+    '<body><nav><a href="/">Home</a> <a href="/about">About us and our long navigation menu</a></nav>'
+    '<article><h1>Policy</h1><p>Employees accrue 2.5 vacation days per month, 30 days per year in total.</p>'
+    '<p>Up to five unused days carry over into the next calendar year automatically.</p></article>'
+    '<footer>Copyright notice that is definitely long enough to count as a block</footer></body></html>'
+)
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    calls = 0
+
+    def do_GET(self):
+        type(self).calls += 1
+        path = urlparse(self.path).path
+        if path == '/slow':
+            time.sleep(0.3)
+        if path == '/big':
+            body = ('<p>' + 'word ' * 40 + '</p>') * 5000
+        else:
+            body = ARTICLE
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def page_server(monkeypatch):
+    _PageHandler.calls = 0
+    monkeypatch.setattr(page_content, 'page_cache', page_content.PageTextCache())
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    page_content.reset_page_session()
+    web_search.reset_http_session()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+    page_content.reset_page_session()
+
+
+def test_extract_main_text_keeps_article_blocks():
+    text = page_content.extract_main_text(ARTICLE)
+    assert '2.5 vacation days per month' in text
+    assert 'carry over' in text
+    assert 'ignore me' not in text and 'navigation menu' not in text and 'Copyright' not in text
+
+
+def test_fetch_page_text_caps_bytes_and_caches(page_server):
+    text = page_content.fetch_page_text(f'{page_server}/big', max_bytes=20000, max_chars=100000)
+    assert 0 < len(text) <= 20000
+
+    page_content.fetch_page_text(f'{page_server}/a')
+    page_content.fetch_page_text(f'{page_server}/a')
+    assert _PageHandler.calls == 2
+    assert page_content.page_cache.hits == 1
+    # pages don't go through the CSE session or its pool metrics
+    assert web_search.get_pool_metrics()['requests'] == 0
+
+
+def test_enrich_fetches_top_results_concurrently(page_server):
+    results = [{'title': f'R{i}', 'snippet': '', 'link': f'{page_server}/slow?{i}'} for i in range(4)]
+
+    t0 = time.perf_counter()
+    enriched = page_content.enrich_with_page_text(results, top_n=3)
+    elapsed = time.perf_counter() - t0
+
+    assert [('content' in r) for r in enriched] == [True, True, True, False]
+    assert 'content' not in results[0]
+    assert elapsed < 0.8
+    assert 'Page content: ' in web_search.format_web_results('q', enriched)
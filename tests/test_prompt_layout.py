@@ -0,0 +1,53 @@
+import json
+from types import SimpleNamespace
+
+from prompt_layout import (PromptCacheStats, disabled_tool_result, request_params, system_message,
+                           turn_note)
+from turn_ledger import TurnLedger
+
+
+def _prefix(params):
+    """What the provider caches on: tools, then every message but the volatile last one."""
+    return json.dumps([params['tools'], params['messages'][:-1]], sort_keys=True)
+
+
+def test_prefix_is_identical_whatever_tools_are_enabled():
+    history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'},
+               {'role': 'user', 'content': 'pto policy?'}]
+    layouts = []
+    for enabled in ([], ['search_web'], ['search_web', 'search_documents']):
+        messages = [system_message()] + history + [turn_note(enabled)]
+        layouts.append(request_params('gpt-4o', messages, enabled))
+    assert len({_prefix(p) for p in layouts}) == 1
+    assert layouts[0]['tool_choice'] == 'none' and 'tool_choice' not in layouts[1]
+    # selection order doesn't leak into the note
+    assert turn_note(['search_web', 'search_documents']) == turn_note(['search_documents', 'search_web'])
+
+    forced = request_params('gpt-5', layouts[2]['messages'], ['search_web'], allow_tools=False)
+    assert forced['tools'] == layouts[2]['tools'] and forced['tool_choice'] == 'none'
+    assert 'temperature' not in forced
+
+
+def test_disabled_tool_gets_a_note_instead_of_a_search():
+    result = disabled_tool_result('search_documents', {'query': 'pto'})
+    assert result['kind'] == 'docs' and result['items'] == [] and 'disabled' in result['note']
+
+
+def test_cached_tokens_are_recorded_per_model():
+    ledger = TurnLedger('q')
+    with ledger.span('first completion', 'model', model='gpt-4o') as span:
+        span['usage'] = SimpleNamespace(prompt_tokens=2000, completion_tokens=50, total_tokens=2050,
+                                        prompt_tokens_details=SimpleNamespace(cached_tokens=1536))
+    with ledger.span('synthesis', 'model', model='gpt-4o') as span:
+        span['usage'] = {'prompt_tokens': 3000, 'completion_tokens': 100, 'total_tokens': 3100,
+                         'prompt_tokens_details': {'cached_tokens': 1920}}
+    ledger.finish()
+    tokens = ledger.totals()['tokens_by_model']['gpt-4o']
+    assert tokens['cached_tokens'] == 3456 and tokens['prompt_tokens'] == 5000
+
+    stats = PromptCacheStats()
+    stats.record(ledger.totals()['tokens_by_model'])
+    stats.record({'text-embedding-ada-002': {'prompt_tokens': 5, 'completion_tokens': 0, 'total_tokens': 5}})
+    metrics = stats.get_metrics()
+    assert metrics['cached_tokens'] == 3456 and abs(metrics['hit_rate'] - 3456 / 5000) < 1e-9
+    assert stats.get_metrics('gpt-5')['prompt_tokens'] == 0
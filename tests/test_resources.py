@@ -0,0 +1,41 @@
+import os
+
+import resources
+from resources import RerunTimer, get_openai_client, load_template, read_asset, rerun_history, rerun_summary
+
+
+def test_assets_are_cached_until_the_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, 'ASSET_ROOT', str(tmp_path))
+    (tmp_path / 'templates').mkdir()
+    path = tmp_path / 'templates' / 'note.md'
+    path.write_text('Hello {name}')
+    loads = resources.asset_stats['loads']
+
+    assert load_template('note.md', name='Ada') == 'Hello Ada'
+    assert read_asset('templates', 'note.md') == 'Hello {name}'
+    assert resources.asset_stats['loads'] == loads + 1  # second read was a hit
+
+    path.write_text('Goodbye {name}')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert load_template('note.md', name='Ada') == 'Goodbye Ada'
+    assert read_asset('templates', 'missing.md') is None and load_template('missing.md') == ''
+    assert load_template('note.md', other='x') == ''  # malformed template args
+
+
+def test_openai_client_is_shared_per_key():
+    client = get_openai_client('sk-test-a')
+    assert get_openai_client('sk-test-a') is client
+    assert get_openai_client('sk-test-b') is not client
+
+
+def test_rerun_timer_records_phases():
+    rerun_history.clear()
+    timer = RerunTimer()
+    timer.mark('assets')
+    timer.mark('chat')
+    record = timer.finish()
+    assert set(record['phases']) == {'assets', 'chat'}
+    assert record['total'] >= sum(record['phases'].values())
+    summary = rerun_summary()
+    assert summary['reruns'] == 1 and set(summary['avg_phases']) == {'assets', 'chat'}
@@ -0,0 +1,27 @@
+from response_contract import ContractStats, split_response
+
+
+def test_split_response_separates_reasoning_from_answer():
+    assert split_response('<thinking>check the docs</thinking>\n\nThe policy allows 20 days.') == (
+        'check the docs', 'The policy allows 20 days.')
+    # no tags: the whole reply is the answer, even if it says "let me"
+    assert split_response("Let me explain: RAG retrieves documents first.") == (
+        '', "Let me explain: RAG retrieves documents first.")
+    assert split_response('') == ('', '')
+
+
+def test_split_response_handles_partial_streams():
+    assert split_response('<thinking>still planning') == ('still planning', '')
+    assert split_response('<thin') == ('', '')
+    assert split_response('<thinking>x</thinking>Answer so far') == ('x', 'Answer so far')
+
+
+def test_contract_stats_count_fallbacks():
+    stats = ContractStats()
+    assert stats.record('', 'answer') is False
+    assert stats.record('only reasoning', '') is True
+    assert stats.record('', '') is True  # no regeneration made for this one
+    stats.record_fallback()
+    metrics = stats.get_metrics()
+    assert metrics['responses'] == 3 and metrics['fallbacks'] == 1 and metrics['with_reasoning'] == 1
+    assert metrics['fallback_rate'] == 1 / 3
@@ -0,0 +1,68 @@
+from synthetic_corpus import InMemoryIndex, SyntheticCorpus, generate_queries
+
+
+TEMPLATES = [
+    {
+        "id": "vacation_policy_2024",
+        "title": "Vacation Policy 2024",
+        "content": """ACME Corporation - Vacation and Time Off Policy 2024
+
+VACATION ACCRUAL:
+All full-time employees accrue 2.5 vacation days per month, totaling 30 days annually.
+
+CARRYOVER POLICY:
+- Up to 5 unused vacation days can be carried over to the next calendar year
+""",
+        "metadata": {"category": "HR Policy"},
+    },
+    {
+        "id": "remote_work",
+        "title": "Company Remote Work Policy",
+        "content": """Remote Work Policy
+
+Working Hours: Core hours 10 AM - 3 PM (your timezone).
+Home office stipend: $500 annually for desk, chair, or other office equipment.
+""",
+    },
+]
+
+
+def test_corpus_is_deterministic_and_random_access():
+    corpus = SyntheticCorpus(TEMPLATES, 1000, seed=7)
+    again = SyntheticCorpus(TEMPLATES, 1000, seed=7)
+
+    assert len(corpus) == 1000
+    assert corpus[123] == again[123]
+    assert corpus[123] != SyntheticCorpus(TEMPLATES, 1000, seed=8)[123]
+
+    doc = corpus[3]
+    assert doc['id'] == 'syn_00000003'
+    assert doc['metadata']['template_id'] == 'remote_work'
+    assert doc['metadata']['synthetic'] is True
+    # clock times are not perturbed, template company names are replaced
+    assert '10 AM - 3 PM' in doc['content']
+    assert 'ACME' not in corpus[0]['content']
+
+
+def test_batches_cover_corpus_in_order():
+    corpus = SyntheticCorpus(TEMPLATES, 25, seed=1)
+    ids = [doc['id'] for batch in corpus.batches(batch_size=10) for doc in batch]
+    assert ids == [SyntheticCorpus.doc_id(i) for i in range(25)]
+
+
+def test_labeled_queries_are_retrievable_from_local_index():
+    corpus = SyntheticCorpus(TEMPLATES, 500, seed=3)
+    index = InMemoryIndex()
+    for batch in corpus.batches(100):
+        index.add(batch)
+    assert len(index) == 500
+    assert index.memory_bytes() > 0
+
+    queries = generate_queries(corpus, 20, seed=3)
+    assert queries == generate_queries(corpus, 20, seed=3)
+
+    hits = 0
+    for q in queries:
+        assert q['doc_id'].startswith('syn_')
+        hits += q['doc_id'] in [doc_id for doc_id, _ in index.search(q['query'], top_k=5)]
+    assert hits / len(queries) >= 0.8
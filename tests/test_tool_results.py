@@ -0,0 +1,41 @@
+from tool_results import (
+    document_tool_result,
+    encode_tool_result,
+    render_tool_markdown,
+    shorten_url,
+    web_tool_result,
+)
+from web_search import format_web_results
+
+RESULTS = [
+    {'title': f'Result {i}', 'snippet': f'Snippet number {i} about AI agents.', 'link': f'https://www.example.com/post/{i}/?utm=x'}
+    for i in range(1, 6)
+]
+
+
+def test_compact_encoding_uses_short_source_ids():
+    text = encode_tool_result(web_tool_result('ai agents', RESULTS, note='mock data'))
+    lines = text.splitlines()
+
+    assert lines[0] == 'web "ai agents" 5'
+    assert lines[1] == 'W1 Result 1 | Snippet number 1 about AI agents. | example.com/post/1'
+    assert lines[-1] == 'note: mock data'
+    assert '**' not in text and '🌐' not in text
+
+
+def test_compact_encoding_is_smaller_than_markdown():
+    result = web_tool_result('ai agents', RESULTS)
+    compact = encode_tool_result(result)
+    markdown = format_web_results('ai agents', RESULTS)
+
+    assert len(compact) < 0.8 * len(markdown)
+    # UI rendering keeps the markdown shape
+    assert render_tool_markdown(result).startswith("🌐 **Web search results for 'ai agents':**")
+    assert '*Source: https://www.example.com/post/1/?utm=x*' in render_tool_markdown(result)
+
+
+def test_document_results_carry_scores():
+    result = document_tool_result('vacation', [{'title': 'Vacation Policy', 'content': 'Thirty days.', 'score': 0.8731}])
+    assert encode_tool_result(result).splitlines()[1] == 'D1 Vacation Policy (0.87) | Thirty days.'
+    assert '**1. Vacation Policy** (Score: 0.873)' in render_tool_markdown(result)
+    assert shorten_url('http://docs.example.org/a#frag') == 'docs.example.org/a'
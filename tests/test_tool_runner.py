@@ -0,0 +1,96 @@
+import json
+import time
+from types import SimpleNamespace
+
+from tool_runner import SpeculativeSearch, ToolLoopBudget, queries_match, run_tool_calls
+
+
+def _call(call_id, name, **args):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+def _sleepy(name, args):
+    time.sleep(args['delay'])
+    if args.get('fail'):
+        raise ValueError('boom')
+    return f"{name}:{args['delay']}"
+
+
+def test_runs_concurrently_and_keeps_order():
+    calls = [_call('a', 'slow', delay=0.3), _call('b', 'fast', delay=0.05), _call('c', 'mid', delay=0.2)]
+    start = time.perf_counter()
+    outcomes = run_tool_calls(calls, _sleepy, timeout=5)
+    elapsed = time.perf_counter() - start
+
+    assert [o['tool_call_id'] for o in outcomes] == ['a', 'b', 'c']
+    assert [o['result'] for o in outcomes] == ['slow:0.3', 'fast:0.05', 'mid:0.2']
+    assert elapsed < 0.5  # slowest call, not the 0.55s sum
+    assert outcomes[1]['seconds'] < outcomes[0]['seconds']
+
+
+def test_failures_and_timeouts_are_reported_per_call():
+    calls = [_call('a', 'ok', delay=0.0), _call('b', 'bad', delay=0.0, fail=True), _call('c', 'hung', delay=1.0)]
+    start = time.perf_counter()
+    outcomes = run_tool_calls(calls, _sleepy, timeout=0.2)
+
+    assert time.perf_counter() - start < 0.6
+    assert outcomes[0]['result'] == 'ok:0.0' and outcomes[0]['error'] is None
+    assert 'boom' in outcomes[1]['error'] and not outcomes[1]['timed_out']
+    assert outcomes[2]['timed_out'] and outcomes[2]['result'] is None
+
+
+def test_queries_match_tolerates_case_punctuation_and_small_rewording():
+    assert queries_match('What is RAG?', 'what is rag')
+    assert queries_match('latest ai agent frameworks 2025', 'latest AI agent frameworks in 2025', threshold=0.8)
+    assert not queries_match('pinecone pricing', 'weather in paris')
+
+
+def test_speculative_results_are_reused_only_when_the_call_matches():
+    executed = []
+
+    def execute(name, args):
+        executed.append((name, args['query']))
+        time.sleep(0.2)
+        return f"{name}:{args['query']}"
+
+    prefetch = SpeculativeSearch(execute, {'search_web': {'query': 'What is RAG?', 'max_results': 5},
+                                           'search_documents': {'query': 'What is RAG?'}})
+    time.sleep(0.2)  # the first completion
+    calls = [_call('a', 'search_web', query='what is rag'),
+             _call('b', 'search_documents', query='pinecone index setup')]
+    start = time.perf_counter()
+    outcomes = run_tool_calls(calls, execute, timeout=5, prefetch=prefetch)
+    prefetch.close()
+
+    assert outcomes[0]['prefetched'] and outcomes[0]['result'] == 'search_web:What is RAG?'
+    assert not outcomes[1]['prefetched'] and outcomes[1]['result'] == 'search_documents:pinecone index setup'
+    assert time.perf_counter() - start < 0.35  # only the mismatched search was waited for
+    assert ('search_documents', 'pinecone index setup') in executed
+
+
+def test_speculative_result_not_reused_for_different_arguments():
+    prefetch = SpeculativeSearch(lambda name, args: 'guess', {'search_web': {'query': 'q', 'max_results': 5}})
+    assert prefetch.take('search_web', {'query': 'q', 'max_results': 20}) is None
+    assert prefetch.take('search_web', {'query': 'q'}) is not None
+    prefetch.close()
+
+
+def test_tool_loop_budget_forces_an_answer():
+    budget = ToolLoopBudget(max_rounds=2, time_budget=60, token_budget=10_000)
+    budget.add_usage(SimpleNamespace(total_tokens=1_000))
+    outcome = {'name': 'search_web', 'seconds': 0.5, 'error': None, 'prefetched': True}
+    assert budget.record_tools([outcome])['round'] == 1
+    assert budget.exhausted() is None
+    budget.record_model(1.0, SimpleNamespace(total_tokens=4_000))
+    assert budget.rounds[0]['tokens'] == 4_000
+    assert budget.exhausted() == 'token budget'  # 5k used, next calls predicted at 4k each
+
+    budget = ToolLoopBudget(max_rounds=2, time_budget=60, token_budget=100_000)
+    budget.record_tools([outcome])
+    budget.record_tools([outcome])
+    assert budget.exhausted() == 'round limit'
+
+    budget = ToolLoopBudget(max_rounds=5, time_budget=1.0, token_budget=100_000)
+    budget.record_tools([dict(outcome, seconds=1.2)])
+    assert budget.exhausted() == 'time budget'
+    assert budget.tool_timeout() == 1.0
@@ -0,0 +1,77 @@
+import json
+import time
+from types import SimpleNamespace
+
+from chat_stream import StreamedCompletion
+from tool_runner import run_tool_calls
+from turn_ledger import TurnLedger, timed_call
+
+
+def _search(name, args):
+    calls = []
+    with timed_call(calls, 'embedding', 'embedding', model='text-embedding-ada-002') as call:
+        time.sleep(0.01)
+        call['usage'] = SimpleNamespace(prompt_tokens=5, completion_tokens=0, total_tokens=5)
+    return {'kind': 'docs', 'query': args['query'], 'items': [], 'note': None, 'calls': calls}
+
+
+def test_ledger_records_model_tool_and_backend_calls(tmp_path):
+    ledger = TurnLedger('what is our pto policy?')
+    with ledger.span('first completion', 'model', model='gpt-4o') as span:
+        span['usage'] = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120)
+    call = SimpleNamespace(id='c1', function=SimpleNamespace(name='search_documents', arguments='{"query": "pto"}'))
+    for outcome in run_tool_calls([call], _search, timeout=5):
+        ledger.add_tool_outcome(outcome)
+    ledger.add_streamed('synthesis', StreamedCompletion(
+        content='answer', usage=SimpleNamespace(prompt_tokens=300, completion_tokens=80, total_tokens=380),
+        first_token_seconds=0.2, total_seconds=0.5, model='gpt-4o'))
+    ledger.finish()
+
+    totals = ledger.totals()
+    assert totals['tokens_by_model']['gpt-4o']['total_tokens'] == 500
+    assert totals['tokens_by_model']['text-embedding-ada-002']['total_tokens'] == 5
+    assert set(totals['seconds_by_kind']) == {'model', 'tool', 'embedding'}
+
+    record = ledger.to_record()
+    names = [c['name'] for c in record['calls']]
+    assert 'search_documents(pto)' in names and 'embedding' in names
+    embedding = next(c for c in record['calls'] if c['name'] == 'embedding')
+    assert embedding['parent'] == 'search_documents(pto)'
+
+    path = tmp_path / 'turns.jsonl'
+    ledger.write(str(path))
+    assert json.loads(path.read_text())['turn_id'] == ledger.turn_id
+    assert 'search_documents(pto)' in ledger.waterfall_html()
+
+
+def test_failed_span_is_recorded_as_error():
+    ledger = TurnLedger()
+    try:
+        with ledger.span('fallback', 'model', model='gpt-4o'):
+            raise RuntimeError('boom')
+    except RuntimeError:
+        pass
+    assert ledger.entries[0]['status'] == 'error'
+
+
+def test_hedged_completion_records_every_attempt():
+    ledger = TurnLedger()
+    start = time.perf_counter()
+    completion = StreamedCompletion(
+        content='answer', usage=SimpleNamespace(prompt_tokens=300, completion_tokens=80, total_tokens=380),
+        first_token_seconds=1.3, total_seconds=2.0, model='gpt-4o', hedged=True, hedge_reason='slow',
+        attempts=[
+            {'model': 'gpt-5', 'start': start, 'end': start + 1.5, 'usage': None, 'first_token_seconds': None,
+             'cancelled': True, 'error': None},
+            {'model': 'gpt-4o', 'start': start + 1.0, 'end': start + 2.0,
+             'usage': SimpleNamespace(prompt_tokens=300, completion_tokens=80, total_tokens=380),
+             'first_token_seconds': 0.3, 'cancelled': False, 'error': None},
+        ])
+    entry = ledger.add_streamed('synthesis', completion)
+
+    assert entry['model'] == 'gpt-4o' and entry['status'] == 'ok' and entry['hedge_reason'] == 'slow'
+    assert len(ledger.entries) == 2
+    primary = next(e for e in ledger.entries if e['model'] == 'gpt-5')
+    assert primary['status'] == 'cancelled' and primary['name'] == 'synthesis [gpt-5 attempt]'
+    assert round(primary['end'] - primary['start'], 6) == 1.5
+    assert ledger.totals()['tokens_by_model']['gpt-4o']['total_tokens'] == 380
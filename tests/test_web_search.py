@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import cse_scheduler
+from backend_health import NegativeCache
+import web_search
+
+
+class _CSEHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    fail_first = 0
+    calls = 0
+    total_items = None  # when set, serve numbered results honoring start/num
+    delay = 0.0
+    starts = []
+
+    def do_GET(self):
+        cls = type(self)
+        cls.calls += 1
+        if cls.total_items is not None:
+            params = parse_qs(urlparse(self.path).query)
+            start, num = int(params.get('start', ['1'])[0]), int(params['num'][0])
+            cls.starts.append(start)
+            time.sleep(cls.delay)
+            items = [
+                {'title': f'Result {n}', 'snippet': '', 'link': f'https://example.com/{n}'}
+                for n in range(start, min(start + num, cls.total_items + 1))
+            ]
+            body = json.dumps({'items': items}).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if cls.calls <= cls.fail_first:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'items': [
+            {'title': 'Result', 'snippet': 'Snippet text', 'link': 'https://example.com/a'},
+        ]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cse_server(monkeypatch, tmp_path):
+    _CSEHandler.calls = 0
+    _CSEHandler.fail_first = 0
+    _CSEHandler.total_items = None
+    _CSEHandler.delay = 0.0
+    _CSEHandler.starts = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _CSEHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('WEB_SEARCH_BACKOFF', '0')
+    monkeypatch.setenv('CSE_QUOTA_PATH', str(tmp_path / 'quota.sqlite3'))
+    cse_scheduler.reset_cse_scheduler()
+    monkeypatch.setattr(cse_scheduler, 'negative_cache', NegativeCache())
+    monkeypatch.setattr(web_search, 'GOOGLE_CSE_URL', f'http://127.0.0.1:{server.server_port}/customsearch/v1')
+    web_search.reset_http_session()
+    yield _CSEHandler
+    server.shutdown()
+    server.server_close()
+    web_search.reset_http_session()
+
+
+def test_session_is_shared_and_connections_reused(cse_server):
+    assert web_search.get_http_session() is web_search.get_http_session()
+
+    for _ in range(5):
+        results = web_search.search_google_cse('ai agents', num=3, api_key='k', cse_id='cx')
+        assert results == [{'title': 'Result', 'snippet': 'Snippet text', 'link': 'https://example.com/a'}]
+
+    metrics = web_search.get_pool_metrics()
+    assert metrics['requests'] == 5
+    assert metrics['connections_opened'] == 1
+    assert metrics['reuse_ratio'] == pytest.approx(0.8)
+
+
+def test_retries_429_honoring_retry_after(cse_server):
+    cse_server.fail_first = 2
+
+    results = web_search.search_google_cse('quota', api_key='k', cse_id='cx')
+
+    assert len(results) == 1
+    assert cse_server.calls == 3
+    assert web_search.get_pool_metrics()['retries'] == 2
+
+
+def test_retry_after_is_capped():
+    retry = web_search.CappedRetry(total=3, max_retry_after=2.0)
+    response = SimpleNamespace(headers={'Retry-After': '3600'})
+
+    assert retry.get_retry_after(response) == 2.0
+    assert retry.increment().get_retry_after(response) == 2.0
+    assert retry.get_retry_after(SimpleNamespace(headers={'Retry-After': '1'})) == 1.0
+    assert retry.get_retry_after(SimpleNamespace(headers={})) is None
+    assert retry.get_retry_after(SimpleNamespace(headers={'Retry-After': 'Fri, 31 Dec 2100 23:59:59 GMT'})) == 2.0
+    assert web_search.parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT') == 0.0
+    assert web_search.parse_retry_after('soon') is None
+
+
+def test_pages_are_fetched_concurrently_and_merged_in_order(cse_server):
+    cse_server.total_items = 100
+    cse_server.delay = 0.3
+
+    t0 = time.perf_counter()
+    results = web_search.search_google_cse_pages('deep research', num=25, api_key='k', cse_id='cx')
+    elapsed = time.perf_counter() - t0
+
+    assert [r['title'] for r in results] == [f'Result {n}' for n in range(1, 26)]
+    assert sorted(cse_server.starts) == [1, 11, 21]
+    assert elapsed < 0.8  # three pages in about one request's time
+
+
+def test_pages_stop_at_short_page(cse_server):
+    cse_server.total_items = 14
+
+    results = web_search.search_google_cse_pages('niche', num=30, api_key='k', cse_id='cx')
+
+    assert len(results) == 14
+
+
+def test_format_web_results_markdown():
+    text = web_search.format_web_results('q', [{'title': 'T', 'snippet': 'S', 'link': 'L'}])
+    assert text.startswith("🌐 **Real web search results for 'q':**")
+    assert '**1. T**\nS\n*Source: L*' in text
+
+
+def test_fetch_web_results_caches_normalized_queries(cse_server, monkeypatch):
+    monkeypatch.delenv('WEB_SEARCH_CACHE_PATH', raising=False)
+    web_search.reset_web_cache()
+
+    first = web_search.fetch_web_results('AI  Agents?', num=3, api_key='k', cse_id='cx')
+    again = web_search.fetch_web_results(' ai agents', num=3, api_key='k', cse_id='cx')
+    web_search.fetch_web_results('ai agents', num=5, api_key='k', cse_id='cx')
+
+    assert first == again
+    assert cse_server.calls == 2  # different num is a different entry
+    metrics = web_search.get_web_cache().get_metrics()
+    assert metrics['memory_hits'] == 1 and metrics['misses'] == 2
+    web_search.reset_web_cache()
+
+
+def test_web_cache_disk_tier_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / 'web_cache.sqlite3')
+    writer = web_search.WebResultCache(ttl_seconds=60, disk_path=path)
+    writer.set('Pinecone pricing', 5, [{'title': 'T', 'snippet': 'S', 'link': 'L'}])
+
+    reader = web_search.WebResultCache(ttl_seconds=60, disk_path=path)
+    assert reader.get('pinecone pricing', 5) == [{'title': 'T', 'snippet': 'S', 'link': 'L'}]
+    assert reader.get_metrics()['disk_hits'] == 1
+
+    expired = web_search.WebResultCache(ttl_seconds=0, disk_path=path)
+    writer.memory.clear()
+    with writer._connect() as conn:
+        conn.execute('UPDATE web_cache SET ts = ts - 10')
+    assert expired.get('pinecone pricing', 5) is None
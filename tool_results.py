@@ -0,0 +1,115 @@
+"""Structured search results: compact encoding for the model, markdown for the UI.
+
+Search tools used to hand the model the same markdown the UI shows (emoji
+headers, bold titles, a "*Source:*" label per result), spending prompt tokens
+on decoration every turn. Searches now produce a small structured result and
+it is rendered twice:
+
+- encode_tool_result: compact line records with short source IDs (``W1``,
+  ``D1``) for tool messages and summarizer context
+- render_tool_markdown: the original markdown, for display only
+
+A result is ``{"kind": "web" | "docs", "query", "items", "note"}`` (plus an
+optional display ``heading``) where each item has ``title``, ``text`` and
+optionally ``url`` and ``score``. Compact form::
+
+    web "ai agents" 2
+    W1 Agent frameworks compared | LangGraph vs AutoGen vs CrewAI... | example.com/agents
+    W2 ...
+    note: mock data
+"""
+from __future__ import annotations
+
+import re
+from typing import Optional, Dict, Any, List
+
+_PREFIX = {'web': 'W', 'docs': 'D'}
+_HEADINGS = {'web': '🌐 **{heading} for \'{query}\':**', 'docs': '📚 **{heading} for \'{query}\':**'}
+
+
+def web_tool_result(query: str, results: List[Dict[str, str]], note: Optional[str] = None) -> Dict[str, Any]:
+    """Structured result from ``web_search`` result dicts (title/snippet/link[/content])."""
+    items = []
+    for r in results:
+        item = {'title': r.get('title', ''), 'text': r.get('snippet', ''), 'url': r.get('link', '')}
+        if r.get('content'):
+            item['content'] = r['content']
+        items.append(item)
+    return {'kind': 'web', 'query': query, 'items': items, 'note': note}
+
+
+def document_tool_result(query: str, matches: List[Dict[str, Any]], note: Optional[str] = None) -> Dict[str, Any]:
+    """Structured result from document matches (title/content/score dicts)."""
+    items = [
+        {'title': m.get('title', f'Document {i}'), 'text': m.get('content', ''), 'score': m.get('score')}
+        for i, m in enumerate(matches, 1)
+    ]
+    return {'kind': 'docs', 'query': query, 'items': items, 'note': note}
+
+
+def shorten_url(url: str) -> str:
+    """Drop scheme, ``www.``, query string and trailing slash: enough to cite."""
+    url = re.sub(r'^https?://(www\.)?', '', url or '')
+    return url.split('?', 1)[0].split('#', 1)[0].rstrip('/')
+
+
+def _clip(text: str, limit: int) -> str:
+    text = re.sub(r'\s+', ' ', text or '').strip()
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+def encode_item(kind: str, position: int, item: Dict[str, Any], max_text: int = 300,
+                max_content: int = 1200) -> str:
+    """One result record (plus its ``page:`` line), e.g. ``W2 title | text | url``."""
+    fields = [f"{_PREFIX.get(kind, 'R')}{position} {_clip(item.get('title', ''), 120)}"]
+    if item.get('score') is not None:
+        fields[0] += f" ({item['score']:.2f})"
+    fields.append(_clip(item.get('text', ''), max_text))
+    if item.get('url'):
+        fields.append(shorten_url(item['url']))
+    record = ' | '.join(f for f in fields if f)
+    if item.get('content'):
+        record += f"\n  page: {_clip(item['content'], max_content)}"
+    return record
+
+
+def encode_header(result: Dict[str, Any], count: int) -> str:
+    return f'{result.get("kind", "web")} "{result.get("query", "")}" {count}'
+
+
+def encode_tool_result(result: Dict[str, Any], max_text: int = 300, max_content: int = 1200) -> str:
+    """Compact line-record encoding of a structured result for the model."""
+    kind = result.get('kind', 'web')
+    items = result.get('items') or []
+    lines = [encode_header(result, len(items))]
+    lines.extend(encode_item(kind, i, item, max_text, max_content) for i, item in enumerate(items, 1))
+    if result.get('note'):
+        lines.append(f"note: {result['note']}")
+    return '\n'.join(lines)
+
+
+def render_tool_markdown(result: Dict[str, Any], heading: Optional[str] = None) -> str:
+    """Markdown rendering of a structured result for the UI."""
+    kind = result.get('kind', 'web')
+    heading = heading or result.get('heading') or ('Web search results' if kind == 'web' else 'Document search results')
+    query = result.get('query', '')
+    items = result.get('items') or []
+    parts = [_HEADINGS.get(kind, '**{heading} for \'{query}\':**').format(heading=heading, query=query), '']
+    if not items:
+        parts.append(f"No results found for '{query}'")
+        parts.append('')
+    for i, item in enumerate(items, 1):
+        title = f"**{i}. {item.get('title', '')}**"
+        if item.get('score') is not None:
+            title += f" (Score: {item['score']:.3f})"
+        parts.append(title)
+        text = item.get('text', '')
+        parts.append(text[:200] + ('...' if len(text) > 200 else '') if kind == 'docs' else text)
+        if item.get('content'):
+            parts.append(f"Page content: {item['content']}")
+        if item.get('url'):
+            parts.append(f"*Source: {item['url']}*")
+        parts.append('')
+    if result.get('note'):
+        parts.append(f"*{result['note']}*")
+    return '\n'.join(parts).rstrip() + '\n'
@@ -0,0 +1,249 @@
+"""Concurrent execution of one assistant turn's tool calls.
+
+When the model asks for ``search_documents`` and ``search_web`` in the same
+turn they used to run one after the other, so the tool phase took the sum of
+both searches. ``run_tool_calls`` runs them on a thread pool with a per-call
+timeout and returns the outcomes in the original order, so each tool message
+still pairs with its ``tool_call_id``. The tool phase then takes as long as
+the slowest call.
+
+``SpeculativeSearch`` goes one step further: the model almost always calls
+the search tools with the user's own question, so those searches are started
+with the raw prompt alongside the first completion. When the model's tool
+call asks for (nearly) the same query the prefetched result is reused;
+otherwise it is discarded and the call runs normally. With real APIs app.py
+only speculates web searches the CSE scheduler can serve from cache or
+without touching the quota reserve (``CSEScheduler.can_prefetch``).
+
+``ToolLoopBudget`` bounds the agent loop in ``app.py``: the model may ask for
+follow-up searches after seeing results, and each round's calls run
+concurrently, until a round, time or token limit is about to be hit and a
+final answer is forced (the last call is made without tools).
+
+Tool functions run in worker threads and must not touch ``st.*``.
+``TOOL_CALL_TIMEOUT`` (seconds, default 20) sets the default per-call timeout
+and ``SPECULATIVE_SEARCH=0`` turns prefetching off. The loop limits are
+``TOOL_LOOP_MAX_ROUNDS`` (default 3), ``TOOL_LOOP_TIME_BUDGET`` (seconds,
+default 60) and ``TOOL_LOOP_TOKEN_BUDGET`` (total tokens, default 30000).
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional, Dict, Any, List, Callable
+
+
+def normalize_query(query: str) -> List[str]:
+    """Lowercased word tokens, punctuation dropped."""
+    return re.findall(r'[a-z0-9]+', (query or '').lower())
+
+
+def queries_match(a: str, b: str, threshold: float = 0.8) -> bool:
+    """True if two queries are the same up to case/punctuation, or share most words."""
+    ta, tb = normalize_query(a), normalize_query(b)
+    if ta == tb:
+        return True
+    sa, sb = set(ta), set(tb)
+    if not sa or not sb:
+        return False
+    return len(sa & sb) / len(sa | sb) >= threshold
+
+
+speculation_stats = {'started': 0, 'reused': 0, 'discarded': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, n: int = 1):
+    with _stats_lock:
+        speculation_stats[key] += n
+
+
+def speculation_enabled() -> bool:
+    return os.getenv('SPECULATIVE_SEARCH', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+class SpeculativeSearch:
+    """Tool calls started before the model asks for them.
+
+    ``calls`` maps tool name to the arguments we guess the model will use.
+    ``take`` hands back the running future when the real call matches (same
+    arguments, query compared with ``queries_match``); ``close`` discards the
+    rest. Discarded searches still finish in the background and warm the
+    caches, they just aren't waited for.
+    """
+
+    def __init__(self, execute: Callable[[str, Dict[str, Any]], Any], calls: Dict[str, Dict[str, Any]],
+                 max_workers: int = 4):
+        self.calls = dict(calls)
+        self._futures: Dict[str, Future] = {}
+        self._pool = None
+        if not self.calls:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=min(max_workers, len(self.calls)),
+                                        thread_name_prefix='speculative-search')
+        for name, args in self.calls.items():
+            self._futures[name] = self._pool.submit(_timed, execute, name, args, time.perf_counter())
+        _count('started', len(self._futures))
+
+    def take(self, name: str, args: Dict[str, Any]) -> Optional[Future]:
+        """The prefetched future for this call, or None if the guess was wrong."""
+        guess = self.calls.get(name)
+        if guess is None or name not in self._futures:
+            return None
+        # other arguments must agree; ones the model left out take the guessed (default) value
+        if any(k not in guess or guess[k] != v for k, v in args.items() if k != 'query'):
+            return None
+        if not queries_match(guess.get('query', ''), args.get('query', '')):
+            return None
+        _count('reused')
+        return self._futures.pop(name)
+
+    def close(self):
+        """Discard prefetched results that no tool call claimed."""
+        if self._futures:
+            _count('discarded', len(self._futures))
+            self._futures.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+def _timed(execute: Callable[[str, Dict[str, Any]], Any], name: str, args: Dict[str, Any], submitted: float):
+    """Worker body: ``(result, seconds, started, queue_seconds)``."""
+    started = time.perf_counter()
+    result = execute(name, args)
+    return result, time.perf_counter() - started, started, started - submitted
+
+
+def run_tool_calls(tool_calls: List[Any], execute: Callable[[str, Dict[str, Any]], Any],
+                   timeout: Optional[float] = None, max_workers: int = 8,
+                   prefetch: Optional[SpeculativeSearch] = None) -> List[Dict[str, Any]]:
+    """Run ``execute(name, args)`` for every tool call concurrently.
+
+    ``tool_calls`` are OpenAI tool call objects (``.id``, ``.function.name``,
+    ``.function.arguments``). Returns one dict per call, in order::
+
+        {"tool_call_id", "name", "args", "result", "error", "timed_out", "seconds", "prefetched",
+         "started", "queue_seconds"}
+
+    ``started`` is the ``perf_counter`` time the call began on a worker and
+    ``queue_seconds`` how long it waited for one.
+
+    Calls matching a ``prefetch`` entry reuse its running search instead of
+    starting a new one.
+    A call that raises or exceeds ``timeout`` gets ``result=None`` and an
+    ``error`` message; the caller decides what to send the model. Timed-out
+    calls keep running in the background but are not waited for.
+    """
+    timeout = timeout if timeout is not None else float(os.getenv('TOOL_CALL_TIMEOUT', '20'))
+    outcomes = []
+    for call in tool_calls:
+        try:
+            args = json.loads(call.function.arguments or '{}')
+        except json.JSONDecodeError:
+            args = {}
+        outcomes.append({'tool_call_id': call.id, 'name': call.function.name, 'args': args,
+                         'result': None, 'error': None, 'timed_out': False, 'seconds': 0.0,
+                         'prefetched': False, 'started': None, 'queue_seconds': 0.0})
+    if not outcomes:
+        return outcomes
+
+    pool = ThreadPoolExecutor(max_workers=min(max_workers, len(outcomes)), thread_name_prefix='tool-call')
+    start = time.perf_counter()
+    futures = []
+    for o in outcomes:
+        future = prefetch.take(o['name'], o['args']) if prefetch is not None else None
+        o['prefetched'] = future is not None
+        futures.append(future or pool.submit(_timed, execute, o['name'], o['args'], time.perf_counter()))
+    try:
+        for outcome, future in zip(outcomes, futures):
+            # every call started together, so each one's deadline is start + timeout
+            remaining = max(0.0, timeout - (time.perf_counter() - start))
+            try:
+                (outcome['result'], outcome['seconds'],
+                 outcome['started'], outcome['queue_seconds']) = future.result(timeout=remaining)
+            except FutureTimeout:
+                outcome['timed_out'] = True
+                outcome['error'] = f"{outcome['name']} timed out after {timeout:.0f}s"
+                outcome['seconds'] = time.perf_counter() - start
+            except Exception as e:
+                outcome['error'] = f"{outcome['name']} failed: {e}"
+                outcome['seconds'] = time.perf_counter() - start
+    finally:
+        pool.shutdown(wait=False)
+    return outcomes
+
+
+class ToolLoopBudget:
+    """Round, time and token limits for a multi-round tool loop, with per-round timing."""
+
+    def __init__(self, max_rounds: Optional[int] = None, time_budget: Optional[float] = None,
+                 token_budget: Optional[int] = None):
+        self.max_rounds = int(max_rounds if max_rounds is not None else os.getenv('TOOL_LOOP_MAX_ROUNDS', '3'))
+        self.time_budget = float(time_budget if time_budget is not None
+                                 else os.getenv('TOOL_LOOP_TIME_BUDGET', '60'))
+        self.token_budget = int(token_budget if token_budget is not None
+                                else os.getenv('TOOL_LOOP_TOKEN_BUDGET', '30000'))
+        self.start = time.perf_counter()
+        self.tokens = 0
+        self.last_call_tokens = 0
+        self.rounds: List[Dict[str, Any]] = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def remaining(self) -> float:
+        return max(0.0, self.time_budget - self.elapsed())
+
+    def add_usage(self, usage):
+        """Count a completion's tokens (``usage`` may be None)."""
+        total = getattr(usage, 'total_tokens', None) or 0
+        self.tokens += total
+        self.last_call_tokens = total
+
+    def tool_timeout(self) -> float:
+        """Per-call timeout for the next round: the usual one, capped by the time left."""
+        return min(float(os.getenv('TOOL_CALL_TIMEOUT', '20')), max(1.0, self.remaining()))
+
+    def record_tools(self, outcomes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Start a round record from ``run_tool_calls`` outcomes."""
+        record = {
+            'round': len(self.rounds) + 1,
+            'tools': [o['name'] for o in outcomes],
+            'tool_seconds': max((o['seconds'] for o in outcomes), default=0.0),
+            'errors': sum(1 for o in outcomes if o['error']),
+            'prefetched': sum(1 for o in outcomes if o.get('prefetched')),
+            'model_seconds': 0.0,
+            'tokens': 0,
+        }
+        self.rounds.append(record)
+        return record
+
+    def record_model(self, seconds: float, usage=None):
+        """Attach the follow-up completion's time and tokens to the latest round."""
+        self.add_usage(usage)
+        if self.rounds:
+            self.rounds[-1]['model_seconds'] = seconds
+            self.rounds[-1]['tokens'] = self.last_call_tokens
+
+    def exhausted(self) -> Optional[str]:
+        """Why the next completion must answer without tools, or None to allow another round.
+
+        Checked before each follow-up call; a round is predicted to cost about
+        as much time as the average round so far and as many tokens as the
+        last call.
+        """
+        if len(self.rounds) >= self.max_rounds:
+            return 'round limit'
+        if self.rounds:
+            average = sum(r['tool_seconds'] + r['model_seconds'] for r in self.rounds) / len(self.rounds)
+            if self.elapsed() + average > self.time_budget:
+                return 'time budget'
+        if self.tokens + 2 * self.last_call_tokens > self.token_budget:
+            # the follow-up call and the round after it each cost at least the last call
+            return 'token budget'
+        return None
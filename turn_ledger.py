@@ -0,0 +1,229 @@
+"""Per-turn ledger of every model, tool and backend call.
+
+The chat's "📊 Usage Stats" only showed the first completion's usage; the
+synthesis and fallback calls, embeddings and all tool latency were
+invisible, so a slow turn couldn't be explained. A ``TurnLedger`` records
+each call of one turn with its model, tokens, wall time and queue time:
+
+- span: context manager around a call made on the current thread
+- add_streamed / add_tool_outcome: record calls timed elsewhere (streamed
+  completions, ``run_tool_calls`` outcomes); backend calls a tool made are
+  taken from the result's ``calls`` list (see ``timed_call``)
+- waterfall_html: offsets and durations as bars, for the UI
+- write: one JSON line per turn (``TURN_LEDGER_PATH``, default
+  ``turn_ledger.jsonl``), like ``moderation_log.jsonl``
+
+Times are ``time.perf_counter()`` values, so spans recorded on worker
+threads line up with the turn's own clock. ``queue_seconds`` is time spent
+waiting for a worker thread before the call started.
+"""
+from __future__ import annotations
+
+import html
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+_KIND_COLORS = {'model': '#6f42c1', 'tool': '#0d6efd', 'search': '#20c997', 'embedding': '#fd7e14',
+                'fetch': '#adb5bd'}
+
+
+def _usage_fields(usage) -> Dict[str, int]:
+    if usage is None:
+        return {}
+    fields = {}
+    for name in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+        value = getattr(usage, name, None)
+        if value is None and isinstance(usage, dict):
+            value = usage.get(name)
+        if value is not None:
+            fields[name] = int(value)
+    # prompt tokens served from the provider's prompt cache (prompt_layout.py)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    if details is None and isinstance(usage, dict):
+        details = usage.get('prompt_tokens_details')
+    cached = getattr(details, 'cached_tokens', None)
+    if cached is None and isinstance(details, dict):
+        cached = details.get('cached_tokens')
+    if cached is not None:
+        fields['cached_tokens'] = int(cached)
+    return fields
+
+
+@contextmanager
+def timed_call(calls: List[Dict[str, Any]], name: str, kind: str, model: Optional[str] = None):
+    """Time a backend call inside a tool and append it to ``calls``.
+
+    Yields the record so the caller can attach ``usage`` (or other fields).
+    """
+    record = {'name': name, 'kind': kind, 'model': model, 'start': time.perf_counter(), 'status': 'ok'}
+    try:
+        yield record
+    except Exception:
+        record['status'] = 'error'
+        raise
+    finally:
+        record['end'] = time.perf_counter()
+        record.update(_usage_fields(record.pop('usage', None)))
+        calls.append(record)
+
+
+class TurnLedger:
+    """Calls made while answering one chat turn."""
+
+    def __init__(self, prompt: str = '', turn_id: Optional[str] = None):
+        self.turn_id = turn_id or uuid.uuid4().hex[:12]
+        self.prompt = prompt
+        self.timestamp = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.entries: List[Dict[str, Any]] = []
+
+    def add(self, name: str, kind: str, start: float, end: float, model: Optional[str] = None,
+            usage=None, queue_seconds: float = 0.0, parent: Optional[str] = None, **extra) -> Dict[str, Any]:
+        entry = {'name': name, 'kind': kind, 'model': model, 'start': start, 'end': end,
+                 'queue_seconds': queue_seconds, 'status': 'ok', **_usage_fields(usage), **extra}
+        if parent:
+            entry['parent'] = parent
+        self.entries.append(entry)
+        return entry
+
+    @contextmanager
+    def span(self, name: str, kind: str, model: Optional[str] = None):
+        """Record the wrapped call; set ``entry['usage']`` to count its tokens."""
+        entry = {'usage': None}
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield entry
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            extra = {k: v for k, v in entry.items() if k != 'usage'}
+            recorded = self.add(name, kind, start, time.perf_counter(), model=model, usage=entry['usage'], **extra)
+            recorded['status'] = status
+
+    def add_streamed(self, name: str, completion, end: Optional[float] = None) -> Dict[str, Any]:
+        """Record a ``StreamedCompletion`` (chat_stream.py) that just finished.
+
+        A hedged completion (hedging.py) records every attempt it started; the
+        losing ones are named after their model with status ``cancelled`` (or
+        ``error``). Returns the winning attempt's entry.
+        """
+        attempts = getattr(completion, 'attempts', None) or []
+        if not attempts:
+            end = end if end is not None else time.perf_counter()
+            return self.add(name, 'model', end - completion.total_seconds, end, model=completion.model,
+                            usage=completion.usage, first_token_seconds=completion.first_token_seconds,
+                            hedged=completion.hedged)
+        winner = next((a for a in attempts if a['model'] == completion.model and not a['cancelled']),
+                      next((a for a in attempts if a['model'] == completion.model), attempts[0]))
+        entry = None
+        for attempt in attempts:
+            recorded = self.add(name if attempt is winner else f"{name} [{attempt['model']} attempt]", 'model',
+                                attempt['start'], attempt['end'], model=attempt['model'], usage=attempt['usage'],
+                                first_token_seconds=attempt['first_token_seconds'], hedged=completion.hedged)
+            if attempt is winner:
+                entry = recorded
+            elif attempt['cancelled']:
+                recorded['status'] = 'cancelled'
+            elif attempt['error']:
+                recorded['status'] = 'error'
+        if completion.hedge_reason:
+            entry['hedge_reason'] = completion.hedge_reason
+        return entry
+
+    def add_tool_outcome(self, outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a ``run_tool_calls`` outcome and the backend calls its result lists."""
+        start = outcome.get('started') or (time.perf_counter() - outcome['seconds'])
+        name = f"{outcome['name']}({(outcome.get('args') or {}).get('query', '')[:40]})"
+        entry = self.add(name, 'tool', start, start + outcome['seconds'],
+                         queue_seconds=outcome.get('queue_seconds', 0.0),
+                         prefetched=outcome.get('prefetched', False))
+        if outcome.get('error'):
+            entry['status'] = 'timeout' if outcome.get('timed_out') else 'error'
+        result = outcome.get('result')
+        for call in (result.get('calls') or []) if isinstance(result, dict) else []:
+            call = dict(call)
+            self.add(call.pop('name'), call.pop('kind'), call.pop('start'), call.pop('end'),
+                     model=call.pop('model', None), parent=name, **call)
+        return entry
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def totals(self) -> Dict[str, Any]:
+        """Tokens by model and wall time (whole turn and summed per kind)."""
+        tokens: Dict[str, Dict[str, int]] = {}
+        seconds: Dict[str, float] = {}
+        for e in self.entries:
+            seconds[e['kind']] = seconds.get(e['kind'], 0.0) + (e['end'] - e['start'])
+            if e.get('total_tokens') is not None:
+                per_model = tokens.setdefault(e.get('model') or e['kind'], {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0})
+                if 'cached_tokens' in e:
+                    per_model.setdefault('cached_tokens', 0)
+                for key in per_model:
+                    per_model[key] += e.get(key, 0)
+        end = self.end if self.end is not None else time.perf_counter()
+        return {'wall_seconds': end - self.start, 'seconds_by_kind': seconds, 'tokens_by_model': tokens,
+                'total_tokens': sum(t['total_tokens'] for t in tokens.values())}
+
+    def to_record(self) -> Dict[str, Any]:
+        """JSON-serializable record with offsets relative to the turn start."""
+        calls = []
+        for e in sorted(self.entries, key=lambda e: e['start']):
+            call = {k: v for k, v in e.items() if k not in ('start', 'end')}
+            call['offset'] = round(e['start'] - self.start, 4)
+            call['seconds'] = round(e['end'] - e['start'], 4)
+            calls.append(call)
+        totals = self.totals()
+        return {'turn_id': self.turn_id, 'timestamp': self.timestamp, 'prompt': self.prompt[:200],
+                'wall_seconds': round(totals['wall_seconds'], 4), 'total_tokens': totals['total_tokens'],
+                'tokens_by_model': totals['tokens_by_model'], 'calls': calls}
+
+    def write(self, path: Optional[str] = None):
+        """Append the turn as one JSON line (failures are ignored)."""
+        path = path or os.getenv('TURN_LEDGER_PATH', 'turn_ledger.jsonl')
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.to_record(), ensure_ascii=False) + "\n")
+        except Exception:
+            pass
+
+    def waterfall_html(self) -> str:
+        """Waterfall of the turn's calls as HTML bars (offset and duration to scale)."""
+        record = self.to_record()
+        total = max(record['wall_seconds'], 1e-6)
+        rows = []
+        for call in record['calls']:
+            left = 100 * call['offset'] / total
+            width = max(0.5, 100 * call['seconds'] / total)
+            queue = 100 * call.get('queue_seconds', 0.0) / total
+            label = html.escape(('↳ ' if call.get('parent') else '') + call['name'])
+            detail = f"{call['seconds']:.2f}s"
+            if call.get('total_tokens') is not None:
+                detail += f" · {call['total_tokens']} tok"
+            if call.get('cached_tokens'):
+                detail += f" ({call['cached_tokens']} cached)"
+            if call.get('queue_seconds'):
+                detail += f" · queued {call['queue_seconds']:.2f}s"
+            if call.get('model'):
+                detail += f" · {html.escape(call['model'])}"
+            if call.get('status') != 'ok':
+                detail += f" · {call['status']}"
+            color = _KIND_COLORS.get(call['kind'], '#6c757d')
+            rows.append(
+                '<div style="display:flex;align-items:center;font-size:12px;margin:2px 0">'
+                f'<div style="width:38%;overflow:hidden;white-space:nowrap;text-overflow:ellipsis">{label}</div>'
+                '<div style="position:relative;width:62%;height:14px;background:#f1f3f5">'
+                f'<div style="position:absolute;left:{max(0.0, left - queue):.2f}%;width:{queue:.2f}%;height:100%;background:#dee2e6"></div>'
+                f'<div title="{detail}" style="position:absolute;left:{left:.2f}%;width:{width:.2f}%;height:100%;background:{color}"></div>'
+                '</div></div>'
+                f'<div style="font-size:11px;color:#6c757d;margin-left:38%">{detail}</div>'
+            )
+        return '<div>' + ''.join(rows) + '</div>'
@@ -0,0 +1,472 @@
+"""Google Custom Search backend shared by app.py and week3/app_multi_agent.py.
+
+Every web search used to call the module-level ``requests.get``, paying a new
+TCP + TLS handshake per query. Searches now go through one process-wide
+``requests.Session``:
+
+- get_http_session: shared session with a tuned connection pool, keep-alive and
+  a retry adapter (429/5xx, honors ``Retry-After`` up to a cap)
+- get_pool_metrics: pool usage (requests, new connections, reuse ratio, retries)
+- search_google_cse: query the CSE API and return structured result dicts
+- search_google_cse_pages: fetch more than one page (CSE caps ``num`` at 10)
+  with the page requests issued concurrently, merged in rank order
+- WebResultCache: TTL cache of structured results keyed by normalized query +
+  ``num``, with an optional SQLite tier shared by all sessions and processes
+- fetch_web_results: cache-first, quota-aware web search used by both apps
+  (see cse_scheduler.py)
+- format_web_results: render results as the markdown shown in the apps
+
+Pool sizing and retries are configurable through environment variables
+(``WEB_SEARCH_POOL_CONNECTIONS``, ``WEB_SEARCH_POOL_MAXSIZE``,
+``WEB_SEARCH_MAX_RETRIES``, ``WEB_SEARCH_BACKOFF``, ``WEB_SEARCH_MAX_RETRY_AFTER``,
+``WEB_SEARCH_TIMEOUT``), the
+cache through ``WEB_SEARCH_CACHE_TTL`` and ``WEB_SEARCH_CACHE_PATH``.
+``GOOGLE_CSE_URL`` overrides the API endpoint (see fake_cse.py).
+"""
+from __future__ import annotations
+
+import email.utils
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GOOGLE_CSE_URL = "https://www.googleapis.com/customsearch/v1"
+CSE_PAGE_SIZE = 10      # maximum ``num`` per CSE request
+CSE_MAX_RESULTS = 100   # CSE never serves results past start=91
+
+
+def max_retry_after() -> float:
+    """Longest ``Retry-After`` wait honored, in seconds (``WEB_SEARCH_MAX_RETRY_AFTER``)."""
+    return float(os.getenv('WEB_SEARCH_MAX_RETRY_AFTER', '10'))
+
+
+def parse_retry_after(value: Optional[str], cap: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait for a ``Retry-After`` value (delta-seconds or HTTP date).
+
+    The wait is cut to ``cap`` (default ``max_retry_after()``); None when the
+    header is missing or malformed.
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if re.fullmatch(r'\d+(\.\d+)?', value):
+        seconds = float(value)
+    else:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError, IndexError):
+            return None
+        if when is None:
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    return min(seconds, max_retry_after() if cap is None else cap)
+
+
+class CappedRetry(Retry):
+    """Retry that waits at most ``max_retry_after`` seconds for a ``Retry-After``.
+
+    A 429 can ask for minutes (or a date hours away); honoring that would hang
+    the chat turn, so longer waits are cut to the cap.
+    """
+
+    def __init__(self, *args, max_retry_after: float = 10.0, **kwargs):
+        self.max_retry_after = max_retry_after
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kw):
+        kw.setdefault('max_retry_after', self.max_retry_after)
+        return super().new(**kw)
+
+    def get_retry_after(self, response):
+        return parse_retry_after(response.headers.get('Retry-After'), self.max_retry_after)
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests, retries and time spent on the wire."""
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.requests_sent += 1
+                self.total_seconds += time.perf_counter() - start
+        history = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+        if history:
+            with self._lock:
+                self.retries += len(history)
+        return response
+
+
+def get_cse_url() -> str:
+    """CSE endpoint; ``GOOGLE_CSE_URL`` points searches at another server (e.g. fake_cse.py)."""
+    return os.getenv('GOOGLE_CSE_URL') or GOOGLE_CSE_URL
+
+
+_session: Optional[requests.Session] = None
+_adapter: Optional[InstrumentedAdapter] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    global _adapter
+    retry = CappedRetry(
+        total=int(os.getenv('WEB_SEARCH_MAX_RETRIES', '3')),
+        backoff_factor=float(os.getenv('WEB_SEARCH_BACKOFF', '0.5')),
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        max_retry_after=max_retry_after(),
+    )
+    _adapter = InstrumentedAdapter(
+        pool_connections=int(os.getenv('WEB_SEARCH_POOL_CONNECTIONS', '10')),
+        pool_maxsize=int(os.getenv('WEB_SEARCH_POOL_MAXSIZE', '20')),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('https://', _adapter)
+    session.mount('http://', _adapter)
+    session.headers.update({'Connection': 'keep-alive', 'User-Agent': 'yes-dear-agent/1.0'})
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Return the process-wide HTTP session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def reset_http_session():
+    """Close and drop the shared session (tests, config changes)."""
+    global _session, _adapter
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _adapter = None
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Connection-pool usage for the shared session.
+
+    ``connections_opened`` counts new TCP connections across all host pools;
+    ``reuse_ratio`` is the share of requests served on an existing connection.
+    """
+    if _adapter is None:
+        return {'requests': 0, 'connections_opened': 0, 'idle_connections': 0, 'pools': 0,
+                'reuse_ratio': 0.0, 'retries': 0, 'errors': 0, 'avg_request_ms': 0.0}
+
+    opened = 0
+    pool_requests = 0
+    idle = 0
+    container = _adapter.poolmanager.pools
+    pools = [p for p in (container.get(key) for key in container.keys()) if p is not None]
+    for pool in pools:
+        opened += getattr(pool, 'num_connections', 0)
+        pool_requests += getattr(pool, 'num_requests', 0)
+        queue = getattr(pool, 'pool', None)
+        if queue is not None:
+            idle += sum(1 for conn in list(queue.queue) if conn is not None)
+
+    sent = _adapter.requests_sent
+    return {
+        'requests': sent,
+        'connections_opened': opened,
+        'idle_connections': idle,
+        'pools': len(pools),
+        'reuse_ratio': max(0.0, 1 - opened / pool_requests) if pool_requests else 0.0,
+        'retries': _adapter.retries,
+        'errors': _adapter.errors,
+        'avg_request_ms': (_adapter.total_seconds / sent * 1000) if sent else 0.0,
+    }
+
+
+def search_google_cse(query: str, num: int = 5, api_key: Optional[str] = None,
+                      cse_id: Optional[str] = None, timeout: Optional[float] = None,
+                      start: int = 1) -> List[Dict[str, str]]:
+    """Run one Google Custom Search request and return ``[{title, snippet, link}]``.
+
+    ``num`` is capped at 10 by the API; use ``search_google_cse_pages`` for more.
+    Raises ``requests.HTTPError`` (after retries) on a failed request.
+    """
+    params = {
+        'key': api_key or os.environ.get('GOOGLE_API_KEY'),
+        'cx': cse_id or os.environ.get('GOOGLE_CSE_ID'),
+        'q': query,
+        'num': min(num, CSE_PAGE_SIZE),
+    }
+    if start > 1:
+        params['start'] = start
+    timeout = timeout if timeout is not None else float(os.getenv('WEB_SEARCH_TIMEOUT', '10'))
+    response = get_http_session().get(get_cse_url(), params=params, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    return [
+        {
+            'title': item.get('title', ''),
+            'snippet': item.get('snippet', ''),
+            'link': item.get('link', ''),
+        }
+        for item in data.get('items', [])
+    ]
+
+
+def search_google_cse_pages(query: str, num: int, api_key: Optional[str] = None,
+                            cse_id: Optional[str] = None, timeout: Optional[float] = None) -> List[Dict[str, str]]:
+    """Fetch up to ``num`` results across pages (``start=1, 11, 21...``).
+
+    The page requests run concurrently on the shared session, so 30 results
+    take about as long as one request. Pages are merged in rank order and
+    links already seen on an earlier page are dropped. A page that comes back
+    short ends the result list; a failed page raises like a single search.
+    """
+    num = max(0, min(num, CSE_MAX_RESULTS))
+    starts = list(range(1, num + 1, CSE_PAGE_SIZE))
+    if len(starts) <= 1:
+        return search_google_cse(query, num=num, api_key=api_key, cse_id=cse_id, timeout=timeout)
+
+    def fetch(start: int) -> List[Dict[str, str]]:
+        page_size = min(CSE_PAGE_SIZE, num - start + 1)
+        return search_google_cse(query, num=page_size, api_key=api_key, cse_id=cse_id,
+                                 timeout=timeout, start=start)
+
+    with ThreadPoolExecutor(max_workers=len(starts), thread_name_prefix='cse-page') as pool:
+        pages = list(pool.map(fetch, starts))
+
+    merged: List[Dict[str, str]] = []
+    seen = set()
+    for start, page in zip(starts, pages):
+        for item in page:
+            if item['link'] in seen:
+                continue
+            seen.add(item['link'])
+            merged.append(item)
+        if len(page) < min(CSE_PAGE_SIZE, num - start + 1):
+            break
+    return merged[:num]
+
+
+class WebResultCache:
+    """TTL cache for structured web results.
+
+    Keys are the normalized query text plus ``num``, so "AI Agents " and
+    "ai agents" share an entry. The in-memory tier is a bounded LRU; when
+    ``disk_path`` is set, entries are also written to a SQLite file that every
+    session and process on the machine reads from.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: int = 512,
+                 disk_path: Optional[str] = None, stale_ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None else os.getenv('WEB_SEARCH_CACHE_TTL', '3600'))
+        # expired entries are kept this long for stale-if-quota-exhausted reads
+        self.stale_ttl_seconds = max(self.ttl_seconds, float(
+            stale_ttl_seconds if stale_ttl_seconds is not None else os.getenv('WEB_SEARCH_CACHE_STALE_TTL', '86400')))
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'misses': 0, 'writes': 0}
+        self._lock = threading.Lock()
+        if self.disk_path:
+            self._init_disk()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        text = unicodedata.normalize('NFKC', query or '').casefold()
+        text = re.sub(r'\s+', ' ', text).strip()
+        return text.rstrip('?!. ')
+
+    def get_cache_key(self, query: str, num: int) -> str:
+        combined = f'{self.normalize_query(query)}\n{int(num)}'
+        return hashlib.md5(combined.encode('utf-8')).hexdigest()
+
+    def get(self, query: str, num: int, allow_stale: bool = False) -> Optional[List[Dict[str, str]]]:
+        """Return cached results, or None.
+
+        With ``allow_stale`` an expired entry still inside the stale window is
+        returned (used when no quota is left to refresh it).
+        """
+        key = self.get_cache_key(query, num)
+        now = time.time()
+        max_age = self.stale_ttl_seconds if allow_stale else self.ttl_seconds
+        hit = 'stale_hits' if allow_stale else None
+        with self._lock:
+            item = self.memory.get(key)
+            if item and now - item['ts'] <= max_age:
+                self.memory.move_to_end(key)
+                self.stats[hit or 'memory_hits'] += 1
+                return item['value']
+            if item and now - item['ts'] > self.stale_ttl_seconds:
+                del self.memory[key]
+
+        if self.disk_path:
+            row = self._disk_get(key)
+            if row and now - row[0] <= max_age:
+                value = json.loads(row[1])
+                with self._lock:
+                    self._remember(key, value, row[0])
+                    self.stats[hit or 'disk_hits'] += 1
+                return value
+
+        if not allow_stale:  # the fresh lookup already counted this miss
+            with self._lock:
+                self.stats['misses'] += 1
+        return None
+
+    def contains(self, query: str, num: int) -> bool:
+        """True if a fresh entry exists (no stats are counted, nothing is promoted)."""
+        key = self.get_cache_key(query, num)
+        now = time.time()
+        with self._lock:
+            item = self.memory.get(key)
+            if item and now - item['ts'] <= self.ttl_seconds:
+                return True
+        row = self._disk_get(key) if self.disk_path else None
+        return bool(row and now - row[0] <= self.ttl_seconds)
+
+    def set(self, query: str, num: int, results: List[Dict[str, str]]):
+        key = self.get_cache_key(query, num)
+        ts = time.time()
+        with self._lock:
+            self._remember(key, results, ts)
+            self.stats['writes'] += 1
+        if self.disk_path:
+            self._disk_set(key, ts, self.normalize_query(query), num, results)
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM web_cache')
+
+    def get_metrics(self) -> Dict[str, Any]:
+        hits = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['stale_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'entries': len(self.memory),
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'disk_enabled': bool(self.disk_path),
+        }
+
+    def _remember(self, key: str, value: List[Dict[str, str]], ts: float):
+        self.memory[key] = {'ts': ts, 'value': value}
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.disk_path, timeout=5)
+
+    def _init_disk(self):
+        directory = os.path.dirname(os.path.abspath(self.disk_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS web_cache ('
+                'key TEXT PRIMARY KEY, ts REAL NOT NULL, query TEXT, num INTEGER, results TEXT NOT NULL)'
+            )
+
+    def _disk_get(self, key: str):
+        try:
+            with self._connect() as conn:
+                return conn.execute('SELECT ts, results FROM web_cache WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+
+    def _disk_set(self, key: str, ts: float, query: str, num: int, results: List[Dict[str, str]]):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO web_cache (key, ts, query, num, results) VALUES (?, ?, ?, ?, ?)',
+                    (key, ts, query, int(num), json.dumps(results, ensure_ascii=False)),
+                )
+                conn.execute('DELETE FROM web_cache WHERE ts < ?', (ts - self.stale_ttl_seconds,))
+        except sqlite3.Error:
+            pass
+
+
+_web_cache: Optional[WebResultCache] = None
+
+
+def get_web_cache() -> WebResultCache:
+    """Return the process-wide web result cache (configured from the environment)."""
+    global _web_cache
+    if _web_cache is None:
+        with _session_lock:
+            if _web_cache is None:
+                _web_cache = WebResultCache(disk_path=os.getenv('WEB_SEARCH_CACHE_PATH') or None)
+    return _web_cache
+
+
+def reset_web_cache():
+    """Drop the process-wide cache so it is rebuilt from the environment."""
+    global _web_cache
+    with _session_lock:
+        _web_cache = None
+
+
+def fetch_web_results(query: str, num: int = 5, api_key: Optional[str] = None,
+                      cse_id: Optional[str] = None, use_cache: bool = True) -> List[Dict[str, str]]:
+    """Cache-first, quota-aware web search returning structured results.
+
+    Goes through ``cse_scheduler``: cache hits and merged in-flight queries
+    cost no quota, and more than 10 results are fetched as concurrent pages.
+    Only successful responses are cached; errors propagate to the caller
+    (``QuotaExhaustedError`` when nothing can be served). ``use_cache=False``
+    bypasses both the cache and the scheduler.
+    """
+    if not use_cache:
+        return search_google_cse_pages(query, num=num, api_key=api_key, cse_id=cse_id)
+    from cse_scheduler import get_cse_scheduler
+    return get_cse_scheduler().search(query, num=num, api_key=api_key, cse_id=cse_id)
+
+
+def format_web_results(query: str, results: List[Dict[str, str]], heading: str = "Real web search results") -> str:
+    """Render structured results as the markdown block shown to users.
+
+    Results enriched by ``page_content.enrich_with_page_text`` also show the
+    extracted page text.
+    """
+    formatted = f"🌐 **{heading} for '{query}':**\n\n"
+    for i, result in enumerate(results, 1):
+        formatted += f"**{i}. {result['title']}**\n"
+        formatted += f"{result['snippet']}\n"
+        if result.get('content'):
+            formatted += f"Page content: {result['content']}\n"
+        formatted += f"*Source: {result['link']}*\n\n"
+    return formatted
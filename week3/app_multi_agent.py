@@ -26,6 +26,17 @@ from datetime import datetime
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 from week4_features import init_session_state_defaults
+from faq_index import load_faq_index, format_faq_answer
+from page_content import enrich_with_page_text
+from async_search import async_fetch_web_results, async_embed_query, async_query_pinecone, close_async_clients
+from tool_results import web_tool_result, document_tool_result, encode_tool_result, render_tool_markdown
+from context_packer import pack_results
+from resources import get_openai_client
+from web_search import fetch_web_results, get_pool_metrics, get_web_cache
+from cse_scheduler import get_cse_scheduler
+from backend_health import negative_cache
+from cassette import install_from_env
+from mock_backends import get_mock_backend
 
 # Microsoft Agent Framework imports
 from agent_framework import (
@@ -45,6 +56,9 @@ from openai import OpenAI
 # Load environment variables
 load_dotenv(override=True)
 
+# Record or replay HTTP traffic when CASSETTE_MODE is set (cassette.py)
+install_from_env()
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -53,6 +67,7 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.environ.get("GOOGLE_CSE_ID")
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
+SUMMARIZER_CONTEXT_TOKENS = int(os.environ.get("SUMMARIZER_CONTEXT_TOKENS", "4000"))
 
 # ============================================================================
 # SHARED MEMORY SYSTEM
@@ -148,63 +163,90 @@ _ = get_shared_memory()
 # SEARCH UTILITY FUNCTIONS
 # ============================================================================
 
-def mock_web_search(query: str) -> str:
-    """Mock web search for demo purposes"""
-    return f"🌐 **Mock Web Search Results for '{query}':**\n\n" + \
-           f"• Latest information on {query} from reputable sources\n" + \
-           f"• Recent updates as of {datetime.now().strftime('%B %Y')}\n" + \
-           "• Expert analysis and professional insights\n\n" + \
-           "*Mock data for demonstration*"
+# Searches return structured results (tool_results.py): executors render them
+# as markdown for the UI and as compact records for the summarizer prompt.
 
-def mock_document_search(query: str) -> str:
+def mock_web_search(query: str, note: str = "Mock data for demonstration") -> Dict[str, Any]:
+    """Mock web search for demo purposes"""
+    result = web_tool_result(query, [
+        {'title': 'Latest information', 'snippet': f"Latest information on {query} from reputable sources"},
+        {'title': 'Recent updates', 'snippet': f"Recent updates as of {datetime.now().strftime('%B %Y')}"},
+        {'title': 'Expert analysis', 'snippet': "Expert analysis and professional insights"},
+    ], note=note)
+    result['heading'] = "Mock Web Search Results"
+    return result
+
+def mock_document_search(query: str, note: str = "Mock data for demonstration") -> Dict[str, Any]:
     """Mock document search for demo purposes"""
-    return f"📚 **Mock Document Search Results for '{query}':**\n\n" + \
-           "• Relevant information from your private collection\n" + \
-           "• Additional context from knowledge base\n" + \
-           "• Related findings from archived materials\n\n" + \
-           "*Mock data for demonstration*"
-
-def real_web_search(query: str) -> str:
-    """Real Google Custom Search API integration"""
+    result = document_tool_result(query, [
+        {'title': 'Private collection', 'content': "Relevant information from your private collection"},
+        {'title': 'Knowledge base', 'content': "Additional context from knowledge base"},
+        {'title': 'Archive', 'content': "Related findings from archived materials"},
+    ], note=note)
+    result['heading'] = "Mock Document Search Results"
+    return result
+
+def real_web_search(query: str) -> Dict[str, Any]:
+    """Real Google Custom Search API integration (cached, pooled keep-alive session)"""
     if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
         return mock_web_search(query)
     
     try:
-        import requests
-        url = "https://www.googleapis.com/customsearch/v1"
-        params = {
-            'key': GOOGLE_API_KEY,
-            'cx': GOOGLE_CSE_ID,
-            'q': query,
-            'num': 5
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        for item in data.get('items', []):
-            results.append({
-                'title': item.get('title', ''),
-                'snippet': item.get('snippet', ''),
-                'link': item.get('link', '')
-            })
-        
-        formatted = f"🌐 **Real Web Search Results for '{query}':**\n\n"
-        for i, result in enumerate(results, 1):
-            formatted += f"**{i}. {result['title']}**\n"
-            formatted += f"{result['snippet']}\n"
-            formatted += f"*Source: {result['link']}*\n\n"
-        
-        return formatted
+        results = fetch_web_results(query, num=5, api_key=GOOGLE_API_KEY, cse_id=GOOGLE_CSE_ID)
+        results = enrich_with_page_text(results)
+        return {**web_tool_result(query, results), 'heading': "Real Web Search Results"}
     except Exception as e:
-        return f"⚠️ Web search error: {str(e)}\n\n{mock_web_search(query)}"
+        return mock_web_search(query, note=f"⚠️ Web search error: {str(e)} (mock data shown)")
+
+def _track_embedding_cost(embedding_response, query: str):
+    """Record embedding usage with the session cost monitor, if available"""
+    try:
+        if 'cost_monitor' in st.session_state:
+            usage = getattr(embedding_response, 'usage', None)
+            if usage is None and isinstance(embedding_response, dict):
+                usage = embedding_response.get('usage')
+            # embeddings responses sometimes don't include prompt/completion tokens; try total_tokens
+            input_tokens = 0
+            output_tokens = 0
+            if usage:
+                input_tokens = int(getattr(usage, 'prompt_tokens', usage.get('prompt_tokens', 0) if isinstance(usage, dict) else 0) or 0)
+                output_tokens = int(getattr(usage, 'completion_tokens', usage.get('completion_tokens', 0) if isinstance(usage, dict) else 0) or 0)
+            else:
+                # fallback: estimate tokens from input length (naive)
+                input_tokens = max(1, len(query.split()))
+            st.session_state.cost_monitor.track_request('document', {'input_tokens': input_tokens, 'output_tokens': output_tokens})
+    except Exception:
+        pass
 
-def real_document_search(query: str) -> str:
+def _document_result(query: str, search_results) -> Dict[str, Any]:
+    """Structured result from Pinecone matches (or the mock fallback when there are none)"""
+    if search_results.matches:
+        matches = [
+            {
+                'title': match.metadata.get('title', f'Document {i}'),
+                'content': match.metadata.get('content', 'No content'),
+                'score': match.score,
+            }
+            for i, match in enumerate(search_results.matches, 1)
+        ]
+        return {**document_tool_result(query, matches), 'heading': "Real Document Search Results"}
+    else:
+        return mock_document_search(query, note=f"No documents found for '{query}' (mock data shown)")
+
+def _pinecone_skipped(query: str) -> Optional[Dict[str, Any]]:
+    """Mock fallback when Pinecone failed recently and is still cooling down"""
+    failure = negative_cache.check("pinecone")
+    if failure is None:
+        return None
+    return mock_document_search(query, note=f"⚠️ {negative_cache.unavailable_error('pinecone', failure)} (mock data shown)")
+
+def real_document_search(query: str) -> Dict[str, Any]:
     """Real Pinecone document search"""
     if not PINECONE_API_KEY:
         return mock_document_search(query)
+    skipped = _pinecone_skipped(query)
+    if skipped:
+        return skipped
     
     try:
         from pinecone import Pinecone
@@ -216,29 +258,12 @@ def real_document_search(query: str) -> str:
             index = pc.Index(index_name)
             
             # Generate embedding
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            client = get_openai_client(OPENAI_API_KEY)
             embedding_response = client.embeddings.create(
                 input=query,
                 model="text-embedding-ada-002"
             )
-            # Track embedding cost if cost_monitor available
-            try:
-                if 'cost_monitor' in st.session_state:
-                    usage = getattr(embedding_response, 'usage', None)
-                    if usage is None and isinstance(embedding_response, dict):
-                        usage = embedding_response.get('usage')
-                    # embeddings responses sometimes don't include prompt/completion tokens; try total_tokens
-                    input_tokens = 0
-                    output_tokens = 0
-                    if usage:
-                        input_tokens = int(getattr(usage, 'prompt_tokens', usage.get('prompt_tokens', 0) if isinstance(usage, dict) else 0) or 0)
-                        output_tokens = int(getattr(usage, 'completion_tokens', usage.get('completion_tokens', 0) if isinstance(usage, dict) else 0) or 0)
-                    else:
-                        # fallback: estimate tokens from input length (naive)
-                        input_tokens = max(1, len(query.split()))
-                    st.session_state.cost_monitor.track_request('document', {'input_tokens': input_tokens, 'output_tokens': output_tokens})
-            except Exception:
-                pass
+            _track_embedding_cost(embedding_response, query)
             query_embedding = embedding_response.data[0].embedding
             
             # Search
@@ -247,22 +272,53 @@ def real_document_search(query: str) -> str:
                 top_k=5,
                 include_metadata=True
             )
-            
-            if search_results.matches:
-                formatted = f"📚 **Real Document Search Results for '{query}':**\n\n"
-                for i, match in enumerate(search_results.matches, 1):
-                    title = match.metadata.get('title', f'Document {i}')
-                    content = match.metadata.get('content', 'No content')
-                    score = match.score
-                    formatted += f"**{i}. {title}** (Score: {score:.3f})\n"
-                    formatted += f"{content[:200]}{'...' if len(content) > 200 else ''}\n\n"
-                return formatted
-            else:
-                return f"📚 No documents found for '{query}'\n\n{mock_document_search(query)}"
+            negative_cache.record_success("pinecone")
+            return _document_result(query, search_results)
         else:
-            return f"⚠️ Index '{index_name}' not found\n\n{mock_document_search(query)}"
+            negative_cache.record_failure("pinecone", error_class="not_found", message=f"index '{index_name}' not found")
+            return mock_document_search(query, note=f"⚠️ Index '{index_name}' not found (mock data shown)")
     except Exception as e:
-        return f"⚠️ Document search error: {str(e)}\n\n{mock_document_search(query)}"
+        negative_cache.record_failure("pinecone", e)
+        return mock_document_search(query, note=f"⚠️ Document search error: {str(e)} (mock data shown)")
+
+async def async_real_web_search(query: str) -> Dict[str, Any]:
+    """Non-blocking twin of real_web_search for the async executors"""
+    if not GOOGLE_API_KEY or not GOOGLE_CSE_ID:
+        return mock_web_search(query)
+    
+    try:
+        results = await async_fetch_web_results(query, num=5, api_key=GOOGLE_API_KEY, cse_id=GOOGLE_CSE_ID)
+        results = await asyncio.to_thread(enrich_with_page_text, results)
+        return {**web_tool_result(query, results), 'heading': "Real Web Search Results"}
+    except Exception as e:
+        return mock_web_search(query, note=f"⚠️ Web search error: {str(e)} (mock data shown)")
+
+async def async_real_document_search(query: str) -> Dict[str, Any]:
+    """Non-blocking twin of real_document_search (AsyncOpenAI + PineconeAsyncio)"""
+    if not PINECONE_API_KEY:
+        return mock_document_search(query)
+    skipped = _pinecone_skipped(query)
+    if skipped:
+        return skipped
+    
+    index_name = "documents"
+    try:
+        embedding_response = await async_embed_query(query, api_key=OPENAI_API_KEY)
+        _track_embedding_cost(embedding_response, query)
+        search_results = await async_query_pinecone(
+            embedding_response.data[0].embedding,
+            index_name=index_name,
+            top_k=5,
+            api_key=PINECONE_API_KEY
+        )
+        if search_results is None:
+            negative_cache.record_failure("pinecone", error_class="not_found", message=f"index '{index_name}' not found")
+            return mock_document_search(query, note=f"⚠️ Index '{index_name}' not found (mock data shown)")
+        negative_cache.record_success("pinecone")
+        return _document_result(query, search_results)
+    except Exception as e:
+        negative_cache.record_failure("pinecone", e)
+        return mock_document_search(query, note=f"⚠️ Document search error: {str(e)} (mock data shown)")
 
 # ============================================================================
 # SPECIALIZED AGENT EXECUTORS
@@ -393,22 +449,27 @@ class ResearchExecutor(Executor):
             # Execute search with error handling
             try:
                 if self.use_real_apis:
-                    results = real_web_search(query)
+                    results = await async_real_web_search(query)
                 else:
-                    results = mock_web_search(query)
+                    # Simulated latency/payload/failures when MOCK_WEB_* is set (mock_backends.py)
+                    results = await get_mock_backend("web").asearch(query, mock_web_search)
                 
-                shared_memory.add_search_result(query, results)
+                shared_memory.add_search_result(query, render_tool_markdown(results))
                 routing["web_search_complete"] = True
-                routing["web_search_results"] = results
+                routing["web_search_results"] = render_tool_markdown(results)
+                routing["web_search_context"] = encode_tool_result(results)
+                routing["web_search_result"] = results
                 shared_memory.update_agent_state('research', 'Complete')
                 
             except Exception as search_error:
                 # Fallback to mock data
                 shared_memory.add_agent_message("Research", f"Search error, using fallback: {str(search_error)}")
                 results = mock_web_search(query)
-                shared_memory.add_search_result(query, results)
+                shared_memory.add_search_result(query, render_tool_markdown(results))
                 routing["web_search_complete"] = True
-                routing["web_search_results"] = results
+                routing["web_search_results"] = render_tool_markdown(results)
+                routing["web_search_context"] = encode_tool_result(results)
+                routing["web_search_result"] = results
                 routing["web_search_error"] = str(search_error)
             
             await ctx.send_message(routing)
@@ -460,22 +521,27 @@ class DocumentExecutor(Executor):
             # Execute search with error handling
             try:
                 if self.use_real_apis:
-                    results = real_document_search(query)
+                    results = await async_real_document_search(query)
                 else:
-                    results = mock_document_search(query)
+                    # Simulated latency/payload/failures when MOCK_DOCS_* is set (mock_backends.py)
+                    results = await get_mock_backend("docs").asearch(query, mock_document_search)
                 
-                shared_memory.add_document_result(query, results)
+                shared_memory.add_document_result(query, render_tool_markdown(results))
                 routing["doc_search_complete"] = True
-                routing["doc_search_results"] = results
+                routing["doc_search_results"] = render_tool_markdown(results)
+                routing["doc_search_context"] = encode_tool_result(results)
+                routing["doc_search_result"] = results
                 shared_memory.update_agent_state('document', 'Complete')
                 
             except Exception as search_error:
                 # Fallback to mock data
                 shared_memory.add_agent_message("Document", f"Search error, using fallback: {str(search_error)}")
                 results = mock_document_search(query)
-                shared_memory.add_document_result(query, results)
+                shared_memory.add_document_result(query, render_tool_markdown(results))
                 routing["doc_search_complete"] = True
-                routing["doc_search_results"] = results
+                routing["doc_search_results"] = render_tool_markdown(results)
+                routing["doc_search_context"] = encode_tool_result(results)
+                routing["doc_search_result"] = results
                 routing["doc_search_error"] = str(search_error)
             
             await ctx.send_message(routing)
@@ -501,7 +567,7 @@ class SummarizerExecutor(Executor):
     
     def __init__(self, openai_api_key: str, id: str = "summarizer"):
         if openai_api_key:
-            self.openai_client = OpenAI(api_key=openai_api_key)
+            self.openai_client = get_openai_client(openai_api_key)
         super().__init__(id=id)
     
     @handler
@@ -523,7 +589,8 @@ class SummarizerExecutor(Executor):
             web_results = routing.get("web_search_results", "")
             doc_results = routing.get("doc_search_results", "")
             
-            # Build context for summarization
+            # Build context for summarization (markdown for the UI fallback,
+            # compact records for the model prompt)
             context_parts = []
             if web_results:
                 context_parts.append(f"Web Search Results:\n{web_results}")
@@ -531,6 +598,22 @@ class SummarizerExecutor(Executor):
                 context_parts.append(f"Document Search Results:\n{doc_results}")
             
             full_context = "\n\n".join(context_parts)
+            model_context = "\n\n".join(
+                routing.get(key) or routing.get(fallback, "")
+                for key, fallback in (("web_search_context", "web_search_results"), ("doc_search_context", "doc_search_results"))
+                if routing.get(key) or routing.get(fallback)
+            )
+
+            # Fit both sources into the summarizer's token budget, best snippets first
+            structured_results = [routing[key] for key in ("web_search_result", "doc_search_result") if routing.get(key)]
+            if structured_results:
+                packed = pack_results(structured_results, SUMMARIZER_CONTEXT_TOKENS)
+                model_context = packed.text
+                shared_memory.add_agent_message(
+                    "Summarizer",
+                    f"Context packed: {packed.kept_tokens} tokens kept, {packed.dropped_tokens} dropped "
+                    f"({packed.dropped_items} results)"
+                )
             
             if not full_context:
                 await ctx.yield_output("I apologize, but I couldn't find any information to help with your request. Please try rephrasing your question.")
@@ -549,14 +632,14 @@ class SummarizerExecutor(Executor):
                                     "content": """You are a helpful assistant synthesizing research findings.
                                 
 Create a clear, comprehensive response based on the search results provided.
-- Cite sources when relevant
+- Cite sources when relevant (records are "W1 title | text | url" for web, "D1 title (score) | text" for documents)
 - Organize information logically
 - Be concise but thorough
 - Use markdown formatting"""
                                 },
                                 {
                                     "role": "user",
-                                    "content": f"User Question: {user_query}\n\nSearch Results:\n{full_context}\n\nPlease provide a well-organized answer."
+                                    "content": f"User Question: {user_query}\n\nSearch Results:\n{model_context}\n\nPlease provide a well-organized answer."
                                 }
                             ],
                             temperature=0.7,
@@ -730,6 +813,28 @@ def render_production_dashboard():
             for api, status in api_status.items():
                 st.write(f"{status} {api}")
 
+            # Shared web-search connection pool
+            pool = get_pool_metrics()
+            if pool['requests']:
+                st.markdown("**Web Search Pool:**")
+                st.write(
+                    f"{pool['requests']} requests • {pool['connections_opened']} connections • "
+                    f"{pool['reuse_ratio']:.0%} reused • {pool['retries']} retries"
+                )
+            web_cache = get_web_cache().get_metrics()
+            if web_cache['memory_hits'] or web_cache['disk_hits'] or web_cache['misses']:
+                st.write(
+                    f"Result cache: {web_cache['hit_rate']:.0%} hit rate • {web_cache['entries']} entries"
+                    + (" • shared on disk" if web_cache['disk_enabled'] else "")
+                )
+                scheduler = get_cse_scheduler().get_metrics()
+                st.write(
+                    f"CSE quota: {scheduler['quota']['used']}/{scheduler['quota']['limit']} used today • "
+                    f"{scheduler['merged']} merged • {scheduler['stale']} stale"
+                )
+            for backend, status in negative_cache.get_status().items():
+                st.write(f"⏸️ {backend}: {status['error_class']} • retry in {status['retry_in']:.0f}s")
+
             # Circuit Breaker Status
             if 'error_handler' in st.session_state:
                 eh = st.session_state.error_handler
@@ -1005,6 +1110,20 @@ The agents will collaborate to find the best answer!
         with st.chat_message("assistant"):
             response_placeholder = st.empty()
             
+            # Frequent questions are served from the precomputed FAQ index
+            # without invoking the coordinator, search or summarizer agents
+            faq_index = load_faq_index()
+            faq_hit = faq_index.match(prompt) if faq_index else None
+            if faq_hit:
+                answer = format_faq_answer(faq_hit)
+                response_placeholder.markdown(answer)
+                st.caption(f"⚡ Answered from FAQ index (matched: \"{faq_hit['question']}\")")
+                st.session_state['messages'].append({
+                    "role": "assistant",
+                    "content": answer
+                })
+                return
+            
             # Use st.status for real-time updates (Streamlit's built-in solution)
             with st.status("🤖 Processing your request...", expanded=True) as status:
                 # Create status display that updates in real-time
@@ -1038,41 +1157,46 @@ The agents will collaborate to find the best answer!
                 async def run_workflow():
                     nonlocal final_response
                     
-                    async for event in workflow.run_stream(initial_message):
-                        if isinstance(event, WorkflowStatusEvent):
-                            # UPDATE AGENT STATUS IN REAL-TIME
-                            shared_mem = get_shared_memory()
+                    try:
+                        async for event in workflow.run_stream(initial_message):
+                            if isinstance(event, WorkflowStatusEvent):
+                                # UPDATE AGENT STATUS IN REAL-TIME
+                                shared_mem = get_shared_memory()
                             
-                            coord_state = shared_mem.agent_states.get('coordinator', 'Idle')
-                            coord_time = shared_mem.agent_state_timestamps.get('coordinator', '')
-                            coord_status.write(f"🎯 Coordinator: {coord_state} `{coord_time}`")
+                                coord_state = shared_mem.agent_states.get('coordinator', 'Idle')
+                                coord_time = shared_mem.agent_state_timestamps.get('coordinator', '')
+                                coord_status.write(f"🎯 Coordinator: {coord_state} `{coord_time}`")
                             
-                            research_state = shared_mem.agent_states.get('research', 'Idle')
-                            research_time = shared_mem.agent_state_timestamps.get('research', '')
-                            research_status.write(f"🌐 Research: {research_state} `{research_time}`")
+                                research_state = shared_mem.agent_states.get('research', 'Idle')
+                                research_time = shared_mem.agent_state_timestamps.get('research', '')
+                                research_status.write(f"🌐 Research: {research_state} `{research_time}`")
                             
-                            doc_state = shared_mem.agent_states.get('document', 'Idle')
-                            doc_time = shared_mem.agent_state_timestamps.get('document', '')
-                            doc_status.write(f"📚 Document: {doc_state} `{doc_time}`")
+                                doc_state = shared_mem.agent_states.get('document', 'Idle')
+                                doc_time = shared_mem.agent_state_timestamps.get('document', '')
+                                doc_status.write(f"📚 Document: {doc_state} `{doc_time}`")
                             
-                            summ_state = shared_mem.agent_states.get('summarizer', 'Idle')
-                            summ_time = shared_mem.agent_state_timestamps.get('summarizer', '')
-                            summ_status.write(f"📝 Summarizer: {summ_state} `{summ_time}`")
+                                summ_state = shared_mem.agent_states.get('summarizer', 'Idle')
+                                summ_time = shared_mem.agent_state_timestamps.get('summarizer', '')
+                                summ_status.write(f"📝 Summarizer: {summ_state} `{summ_time}`")
                             
-                            # Update activity
-                            if shared_mem.agent_messages:
-                                activity_text = ""
-                                for msg in shared_mem.agent_messages[-5:]:
-                                    activity_text += f"• [{msg['timestamp'][-8:]}] {msg['agent']}: {msg['message'][:60]}\n"
-                                activity_content.text(activity_text)
+                                # Update activity
+                                if shared_mem.agent_messages:
+                                    activity_text = ""
+                                    for msg in shared_mem.agent_messages[-5:]:
+                                        activity_text += f"• [{msg['timestamp'][-8:]}] {msg['agent']}: {msg['message'][:60]}\n"
+                                    activity_content.text(activity_text)
                         
-                        elif isinstance(event, WorkflowOutputEvent):
-                            final_response = event.data
-                            status.update(label="✅ Complete!", state="complete")
+                            elif isinstance(event, WorkflowOutputEvent):
+                                final_response = event.data
+                                status.update(label="✅ Complete!", state="complete")
                         
-                        elif isinstance(event, ExecutorFailedEvent):
-                            activity_content.error(f"⚠️ {event.executor_id} failed: {event.details.message}")
+                            elif isinstance(event, ExecutorFailedEvent):
+                                activity_content.error(f"⚠️ {event.executor_id} failed: {event.details.message}")
                     
+                    finally:
+                        # async search clients are bound to this asyncio.run loop
+                        await close_async_clients()
+
                     return final_response
                 
                 # Run the workflow wrapped with production error handling
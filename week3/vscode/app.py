@@ -9,7 +9,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from dotenv import load_dotenv
-from agents import Agent, Runner, function_tool, handoff, RunContextWrapper
+from agents import Agent, Runner, function_tool, handoff, RunContextWrapper, set_default_openai_api, set_tracing_disabled
 
 # ============================================================================
 # CONFIGURATION AND SETUP
@@ -24,6 +24,12 @@ if not OPENAI_API_KEY:
     st.error("OpenAI API Key not configured. Please add it to your .env file.")
     st.stop()
 
+# OpenAI-compatible servers such as fake_openai.py (OPENAI_BASE_URL) speak Chat Completions only;
+# traces would still be exported to OpenAI (with the fake key), so tracing is off too
+if os.getenv("OPENAI_BASE_URL"):
+    set_default_openai_api("chat_completions")
+    set_tracing_disabled(True)
+
 # Email Configuration
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_APP_PASSWORD = os.getenv("EMAIL_APP_PASSWORD")